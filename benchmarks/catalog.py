@@ -0,0 +1,50 @@
+# benchmarks/catalog.py
+"""
+Catalogue synthétique, déjà normalisé comme par services.tools.search_events,
+pour les benchmarks hors ligne.
+"""
+import random
+from datetime import datetime, timedelta
+
+from services.filters import index_text
+from services.formatter import clean_html, excerpt
+
+CITIES = ["Cotonou", "Porto-Novo", "Abomey-Calavi", "Ouidah", "Parakou", "Bohicon", "Natitingou", "Grand-Popo"]
+CATEGORIES = ["Musique", "Festival", "Culture", "Sport", "Business", "Soirée", "Gastronomie", "Cinéma"]
+WORDS = ["concert", "jazz", "afrobeat", "festival", "vodoun", "atelier", "startup", "danse",
+         "exposition", "marché", "théâtre", "gospel", "tournoi", "dégustation", "projection"]
+
+def make_events(n=300, seed=42, start=None):
+    """Génère n événements plausibles (titres, descriptions HTML, dates, prix, images)."""
+    rng = random.Random(seed)
+    start = start or datetime(2026, 1, 1)
+    events = []
+    for i in range(n):
+        d_start = start + timedelta(days=rng.randint(0, 120), hours=rng.choice([10, 18, 20]))
+        d_end = d_start + timedelta(days=rng.choice([0, 0, 0, 1, 2]))
+        words = rng.sample(WORDS, 3)
+        price = rng.choice([0, 0, 2000, 5000, 10000, 25000])
+        city = rng.choice(CITIES)
+        description = (
+            f"<p>Rejoignez-nous à {city} pour une soirée <strong>{words[0]}</strong> &amp; {words[1]}.</p>"
+            f"<p>Au programme : {words[2]}, rencontres et surprises&nbsp;! "
+            "L'événement de l'année au Bénin, à ne pas manquer.</p>"
+        )
+        events.append(index_text({
+            "id": i + 1,
+            "title": f"{words[0].capitalize()} {words[1]} #{i + 1}",
+            "city": city,
+            "description": description,
+            "summary": excerpt(clean_html(description)),
+            "date_start": d_start,
+            "date_end": d_end,
+            "category": rng.choice(CATEGORIES),
+            "price": float(price),
+            "is_free": price == 0,
+            "views": rng.randint(0, 500),
+            "is_featured": rng.random() < 0.1,
+            "venue_name": f"Salle {rng.randint(1, 40)}",
+            "link": f"https://lagenda.bj/events/{i + 1}",
+            "image": f"https://back.lagenda.bj/media/posters/{i + 1}.jpg",
+        }))
+    return events
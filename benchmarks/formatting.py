@@ -0,0 +1,96 @@
+# benchmarks/formatting.py
+"""
+Coût du rendu des événements :
+- format_events pour une réponse de 20 événements, cache de rendu vide
+  contre blocs servis par le cache ;
+- rendu complet (sans cache) de `--render` événements, dates et prix
+  formatés par tables contre l'ancienne méthode strftime, sous fr_FR.UTF-8
+  comme en production (sortie alors identique, vérifiée) ;
+  sans cette locale sur l'hôte, seules les durées sont comparables.
+
+Exemple :
+    python -m benchmarks.formatting --repeat 2000 --render 100000
+"""
+import argparse
+import locale
+import time
+from unittest.mock import patch
+
+from benchmarks.catalog import make_events
+from services import formatter
+
+def timed(fn, repeat, before=None):
+    total = 0.0
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        fn()
+        total += time.perf_counter() - started
+    return total / repeat * 1e6
+
+def legacy_date_label(start, end):
+    """Ancienne implémentation (strftime, dépend de la locale), pour comparaison."""
+    if not start:
+        return "Date à confirmer"
+    if not end or start.date() == end.date():
+        return start.strftime('%d %B %Y')
+    return f"Du {start.strftime('%d %b')} au {end.strftime('%d %b %Y')}"
+
+def legacy_price_label(event):
+    if event.get("is_free"):
+        return "Gratuit"
+    price = event.get("price", 0)
+    if price and price > 0:
+        return f"{int(price):,} FCFA".replace(",", " ")
+    return ""
+
+def set_french_locale():
+    """Locale de l'ancienne production ; faux si l'hôte ne l'a pas."""
+    try:
+        locale.setlocale(locale.LC_TIME, "fr_FR.UTF-8")
+        return True
+    except locale.Error:
+        return False
+
+def render_all(events):
+    started = time.perf_counter()
+    blocks = [formatter.render_event(e) for e in events]
+    return time.perf_counter() - started, blocks
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du rendu des événements")
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--render", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    # Révision posée comme à l'ingestion (tools.normalize_event)
+    events = [dict(e, _rev=str(e["id"])) for e in make_events(args.events)]
+    cold = timed(lambda: formatter.format_events(events), args.repeat, before=formatter.render_cache.clear)
+    formatter.format_events(events)
+    warm = timed(lambda: formatter.format_events(events), args.repeat)
+
+    print(f"format_events ({args.events} événements, {args.repeat} répétitions)")
+    print(f"  cache vide : {cold:8.1f} µs")
+    print(f"  en cache   : {warm:8.1f} µs  (x{cold / warm:.1f})")
+
+    if args.render:
+        catalog = make_events(args.render)
+        french = set_french_locale()
+        with patch.object(formatter, "date_label", legacy_date_label), \
+                patch.object(formatter, "price_label", legacy_price_label):
+            legacy, legacy_blocks = render_all(catalog)
+        tables, blocks = render_all(catalog)
+        if french:
+            assert blocks == legacy_blocks, "rendu différent de l'ancienne implémentation"
+            note = "sortie identique"
+        else:
+            note = "locale fr_FR.UTF-8 absente : sortie non comparée"
+
+        print(f"\nRendu complet de {args.render} événements (sans cache, {note})")
+        print(f"  strftime : {legacy * 1000:8.1f} ms")
+        print(f"  tables   : {tables * 1000:8.1f} ms  (x{legacy / tables:.2f})")
+
+if __name__ == "__main__":
+    main()
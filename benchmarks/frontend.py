@@ -0,0 +1,295 @@
+# benchmarks/frontend.py
+"""
+Performance de la page de chat dans un vrai navigateur (Chromium piloté par
+Playwright, paquet `playwright` + `playwright install chromium`), avec un
+processeur ralenti pour approcher un Android d'entrée de gamme.
+Avec --cdp-url, un Chromium déjà lancé est piloté par le protocole DevTools
+(paquet `websockets`), par exemple un vrai téléphone :
+    adb forward tcp:9222 localabstract:chrome_devtools_remote
+    adb reverse tcp:8765 tcp:8765
+    python -m benchmarks.frontend --cdp-url http://127.0.0.1:9222 --port 8765
+
+L'application tourne localement avec le moteur LLM `fake` et un catalogue
+synthétique ; les affiches sont servies par le navigateur lui-même (image
+fixe), sans réseau. Pour chaque réponse de 20 événements, on mesure :
+- le temps de blocage du fil principal (somme des tâches longues au-delà de 50 ms) ;
+- le décalage de mise en page cumulé (CLS) ;
+- le nombre d'affiches demandées pendant la réponse ;
+puis, en fin de scénario, le nombre de nœuds du DOM.
+
+Comparaison avec une version antérieure de la page (gabarit autonome, CSS et
+JS en ligne, servi tel quel à la place de la page d'accueil) :
+    git show <commit>:templates/chat.html > /tmp/chat_avant.html
+    python -m benchmarks.frontend --template /tmp/chat_avant.html
+    python -m benchmarks.frontend
+"""
+import argparse
+import base64
+import contextlib
+import json
+import socket
+import statistics
+import threading
+import time
+import urllib.request
+from datetime import date, datetime
+from pathlib import Path
+
+from benchmarks.catalog import make_events
+
+# JPEG 1x1 gris : le coût mesuré est celui de la page, pas du décodage des affiches
+POSTER = base64.b64decode(
+    "/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAgGBgcGBQgHBwcJCQgKDBQNDAsLDBkSEw8UHRofHh0aHBwgJC4nICIsIxwcKDcpLDAxNDQ0Hyc5PTgyPC4zNDL/"
+    "wAALCAABAAEBAREA/8QAFAABAAAAAAAAAAAAAAAAAAAACf/EABQQAQAAAAAAAAAAAAAAAAAAAAD/2gAIAQEAAD8AKp//2Q=="
+)
+
+# Une semaine entière d'un catalogue de 600 événements : une quarantaine de
+# résultats, dont 20 affichés ("tous")
+MESSAGE = "Tous les événements de la semaine prochaine"
+
+# Observateurs installés avant le chargement de la page
+OBSERVERS = """
+window.__perf = {longtasks: [], cls: 0, replies: 0};
+const fetchPage = window.fetch;
+window.fetch = (...args) => fetchPage(...args).then(response => {
+    if (new URL(response.url).pathname === '/chat/') window.__perf.replies++;
+    return response;
+});
+new PerformanceObserver(list => {
+    for (const entry of list.getEntries()) window.__perf.longtasks.push(entry.duration);
+}).observe({type: 'longtask', buffered: true});
+new PerformanceObserver(list => {
+    for (const entry of list.getEntries()) if (!entry.hadRecentInput) window.__perf.cls += entry.value;
+}).observe({type: 'layout-shift', buffered: true});
+"""
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def make_app(template=None):
+    """Application réelle ; page d'accueil remplacée par `template` s'il est fourni."""
+    from main import app
+    from services import gemini_client, tools
+    from services.llm_backends import FakeBackend
+
+    gemini_client.set_backend(FakeBackend("0.05"))
+    # Catalogue à venir, quel que soit le jour du benchmark
+    today = datetime.combine(date.today(), datetime.min.time())
+    tools.cache["snapshot"] = tools.build_snapshot(make_events(600, start=today))
+    app.state.limiter.enabled = False
+    if template is None:
+        return app
+    page = Path(template).read_bytes()
+
+    async def wrapper(scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/":
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/html; charset=utf-8")]})
+            await send({"type": "http.response.body", "body": page})
+            return
+        await app(scope, receive, send)
+
+    return wrapper
+
+def serve(app, port):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+class PlaywrightPage:
+    """Chromium lancé par Playwright (paquet `playwright` + `playwright install chromium`)."""
+
+    def __init__(self, args):
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError:
+            raise SystemExit("Paquet `playwright` requis : pip install playwright && playwright install chromium")
+        self.posters = []
+        self._playwright = sync_playwright().start()
+        self.browser = self._playwright.chromium.launch()
+        self.page = self.browser.new_page(viewport={"width": 390, "height": 800}, device_scale_factor=2)
+        cdp = self.page.context.new_cdp_session(self.page)
+        cdp.send("Emulation.setCPUThrottlingRate", {"rate": args.cpu_throttle})
+
+        def fulfill(route):
+            self.posters.append(route.request.url)
+            route.fulfill(status=200, content_type="image/jpeg", body=POSTER)
+        self.page.route("**/images/poster*", fulfill)
+        self.page.route("https://back.lagenda.bj/**", fulfill)
+        self.page.route("https://cdnjs.cloudflare.com/**", lambda route: route.fulfill(status=200, body=""))
+        self.page.add_init_script(OBSERVERS)
+
+    def goto(self, url):
+        self.page.goto(url)
+
+    def evaluate(self, expression):
+        return self.page.evaluate(expression)
+
+    def wait_for(self, expression):
+        self.page.wait_for_function(expression)
+
+    def sleep(self, ms):
+        self.page.wait_for_timeout(ms)
+
+    def send(self, text):
+        self.page.fill("#user-input", text)
+        self.page.press("#user-input", "Enter")
+
+    def close(self):
+        self.browser.close()
+        self._playwright.stop()
+
+class CdpPage:
+    """
+    Onglet d'un Chromium déjà lancé, piloté par le protocole DevTools brut
+    (paquet `websockets`) : Chrome sur Android via `adb forward`, QtWebEngine
+    (QTWEBENGINE_REMOTE_DEBUGGING), ou tout navigateur lancé avec --remote-debugging-port.
+    Mêmes réglages que PlaywrightPage : fenêtre 390x800, processeur ralenti,
+    affiches et CDN servis par l'interception Fetch, cache HTTP désactivé.
+    """
+
+    def __init__(self, args):
+        try:
+            from websockets.sync.client import connect
+        except ImportError:
+            raise SystemExit("Paquet `websockets` requis : pip install websockets")
+        with urllib.request.urlopen(args.cdp_url.rstrip("/") + "/json/list") as response:
+            targets = [t for t in json.load(response) if t["type"] == "page"]
+        if not targets:
+            raise SystemExit(f"Aucun onglet ouvert sur {args.cdp_url}")
+        self._stack = contextlib.ExitStack()
+        self.ws = self._stack.enter_context(connect(targets[0]["webSocketDebuggerUrl"], max_size=None))
+        self.posters = []
+        self._id = 0
+        self._poster = base64.b64encode(POSTER).decode("ascii")
+        self.call("Page.enable")
+        self.call("Network.enable")
+        self.call("Network.setCacheDisabled", {"cacheDisabled": True})
+        self.call("Fetch.enable", {"patterns": [
+            {"urlPattern": "*/images/poster*"},
+            {"urlPattern": "https://back.lagenda.bj/*"},
+            {"urlPattern": "https://cdnjs.cloudflare.com/*"},
+        ]})
+        self.call("Emulation.setDeviceMetricsOverride", {"width": 390, "height": 800, "deviceScaleFactor": 2, "mobile": True})
+        self.call("Emulation.setCPUThrottlingRate", {"rate": args.cpu_throttle})
+        self.call("Page.addScriptToEvaluateOnNewDocument", {"source": OBSERVERS})
+
+    def call(self, method, params=None):
+        """Envoie une commande et traite les événements reçus en attendant sa réponse."""
+        self._id += 1
+        command = self._id  # _dispatch peut envoyer d'autres commandes pendant l'attente
+        self.ws.send(json.dumps({"id": command, "method": method, "params": params or {}}))
+        while True:
+            message = json.loads(self.ws.recv())
+            if message.get("id") == command:
+                if "error" in message:
+                    raise RuntimeError(f"{method} : {message['error'].get('message')}")
+                return message.get("result", {})
+            self._dispatch(message)
+
+    def _dispatch(self, message):
+        if message.get("method") != "Fetch.requestPaused":
+            return
+        params = message["params"]
+        url = params["request"]["url"]
+        if url.startswith("https://cdnjs.cloudflare.com/"):
+            body, headers = "", []
+        else:
+            self.posters.append(url)
+            body, headers = self._poster, [{"name": "Content-Type", "value": "image/jpeg"}]
+        self._id += 1
+        self.ws.send(json.dumps({"id": self._id, "method": "Fetch.fulfillRequest", "params": {
+            "requestId": params["requestId"], "responseCode": 200, "responseHeaders": headers, "body": body,
+        }}))
+
+    def goto(self, url):
+        self.call("Page.navigate", {"url": url})
+        self.wait_for(f"location.href === {json.dumps(url)} && document.readyState === 'complete'")
+
+    def evaluate(self, expression):
+        result = self.call("Runtime.evaluate", {"expression": expression, "returnByValue": True, "awaitPromise": True})
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise RuntimeError(details.get("exception", {}).get("description") or details.get("text"))
+        return result["result"].get("value")
+
+    def wait_for(self, expression, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while not self.evaluate(expression):
+            if time.monotonic() > deadline:
+                raise TimeoutError(expression)
+            self.sleep(50)
+
+    def sleep(self, ms):
+        deadline = time.monotonic() + ms / 1000
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                self._dispatch(json.loads(self.ws.recv(timeout=remaining)))
+            except TimeoutError:
+                break
+
+    def send(self, text):
+        # Même chemin que la touche Entrée : l'écouteur `keypress` du champ
+        self.evaluate(
+            "{ const input = document.getElementById('user-input');"
+            f"input.value = {json.dumps(text)};"
+            "input.dispatchEvent(new KeyboardEvent('keypress', {key: 'Enter', bubbles: true})) }"
+        )
+
+    def close(self):
+        self.call("Emulation.setCPUThrottlingRate", {"rate": 1})
+        self.call("Fetch.disable")
+        self._stack.close()
+
+def run(args):
+    port = args.port or free_port()
+    server = serve(make_app(args.template), port)
+    results = []
+    try:
+        page = CdpPage(args) if args.cdp_url else PlaywrightPage(args)
+        try:
+            page.goto(f"http://127.0.0.1:{port}/")
+            for i in range(args.messages):
+                page.evaluate("window.__perf.longtasks = []; window.__perf.cls = 0")
+                page.posters.clear()
+                replies = page.evaluate("window.__perf.replies")
+                page.send(f"{MESSAGE} ({i})")
+                # L'indicateur de saisie disparaît quand la réponse est insérée ;
+                # `settle` laisse le temps au rendu progressif et aux affiches
+                page.wait_for(f"window.__perf.replies > {replies} && !document.getElementById('typing-indicator')")
+                page.sleep(args.settle)
+                perf = page.evaluate("window.__perf")
+                blocking = sum(max(0.0, d - 50) for d in perf["longtasks"])
+                results.append((blocking, perf["cls"], len(page.posters)))
+            dom_nodes = page.evaluate("document.getElementsByTagName('*').length")
+        finally:
+            page.close()
+    finally:
+        server.should_exit = True
+
+    blocking, cls, posters = zip(*results)
+    print(f"Page : {args.template or 'accueil'} ({args.messages} réponses, CPU /{args.cpu_throttle})")
+    print(f"  blocage du fil principal : médiane {statistics.median(blocking):7.1f} ms, max {max(blocking):7.1f} ms")
+    print(f"  décalage de mise en page : médiane {statistics.median(cls):7.3f}")
+    # La première réponse montre l'effet du chargement différé ; ensuite, le saut vers
+    # chaque nouvelle réponse amène les dernières cartes de la précédente dans la marge
+    print(f"  affiches demandées       : médiane {statistics.median(posters):5.0f} par réponse (première : {posters[0]})")
+    print(f"  nœuds du DOM en fin      : {dom_nodes}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de rendu de la page de chat")
+    parser.add_argument("--template", default=None, help="gabarit autonome à servir à la place de /")
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--cpu-throttle", type=float, default=4)
+    parser.add_argument("--settle", type=int, default=1500, help="attente après la réponse, en ms")
+    parser.add_argument("--cdp-url", default=None, help="navigateur déjà lancé (ex. http://127.0.0.1:9222) au lieu de Playwright")
+    parser.add_argument("--port", type=int, default=0, help="port local de l'application (défaut : libre)")
+    run(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/load_chat.py
+"""
+Test de charge hors ligne de POST /chat/ : l'application tourne en processus
+(httpx.ASGITransport), le LLM est remplacé par un moteur local et le
+catalogue par des événements synthétiques.
+
+Exemples :
+    python -m benchmarks.load_chat --latency lognormal:-1.2,0.4
+    python -m benchmarks.load_chat --latency uniform:0.2,0.8 --error-rate 0.05 --concurrency 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.catalog import make_events
+
+MESSAGES = [
+    "Concerts à Cotonou ce week-end",
+    "Quoi de neuf à Parakou ?",
+    "Festivals gratuits",
+    "Soirées à Calavi demain",
+    "Bonjour",
+    "Tous les événements à Ouidah",
+]
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+async def run(args):
+    from main import app
+    from services import gemini_client, tools
+    from services.llm_backends import FakeBackend, create_backend
+
+    if args.backend == "fake":
+        gemini_client.set_backend(FakeBackend(args.latency, args.error_rate, args.seed))
+    else:
+        gemini_client.set_backend(create_backend(args.backend))
+    tools.cache["snapshot"] = tools.build_snapshot(make_events(args.events))
+    app.state.limiter.enabled = False
+
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        message = MESSAGES[i % len(MESSAGES)]
+        # Messages distincts par défaut, sinon la déduplication en vol masque le moteur
+        queue.put_nowait(message if args.repeat else f"{message} ({i})")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                message = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.post("/chat/", json={"message": message, "history": []})
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+
+    print(f"backend={args.backend} latency={args.latency} error_rate={args.error_rate}")
+    print(f"requests={args.requests} concurrency={args.concurrency} statuses={statuses}")
+    print(f"throughput={args.requests / elapsed:.1f} req/s")
+    from services import metrics
+    fallbacks = {
+        reason: int(metrics.get("llm_fallbacks_total", reason=reason))
+        for reason in ("shed_queue_full", "shed_queue_timeout", "timeout", "error", "circuit_open")
+    }
+    print(f"llm fallbacks={ {reason: n for reason, n in fallbacks.items() if n} }")
+    print(
+        f"latency ms: mean={statistics.mean(latencies) * 1000:.1f} "
+        f"p50={percentile(latencies, 50) * 1000:.1f} "
+        f"p95={percentile(latencies, 95) * 1000:.1f} "
+        f"p99={percentile(latencies, 99) * 1000:.1f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="fake", help="fake (défaut) ou gemini")
+    parser.add_argument("--latency", default="lognormal:-1.5,0.5", help="distribution de latence du moteur fake")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--repeat", action="store_true", help="envoyer des messages identiques (déduplication en vol)")
+    parser.add_argument("--events", type=int, default=300, help="taille du catalogue synthétique")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
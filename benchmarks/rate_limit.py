@@ -0,0 +1,38 @@
+# benchmarks/rate_limit.py
+"""
+Coût d'une vérification de limite (seau à jetons) par stockage.
+
+Exemple :
+    python -m benchmarks.rate_limit --checks 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from services.rate_limit import MemoryBucketStore, Rule, SharedBucketStore
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark des vérifications de limite de débit")
+    parser.add_argument("--checks", type=int, default=100000)
+    parser.add_argument("--keys", type=int, default=1000, help="nombre de clients distincts")
+    args = parser.parse_args(argv)
+
+    rule = Rule.parse("10/minute")
+    keys = [f"chat:ip:10.0.{i // 256}.{i % 256}" for i in range(args.keys)]
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {
+            "memory": MemoryBucketStore(),
+            "shared": SharedBucketStore(os.path.join(directory, "buckets")),
+        }
+        print("µs par vérification :")
+        for name, store in stores.items():
+            started = time.perf_counter()
+            now = time.time()
+            for i in range(args.checks):
+                store.take(keys[i % args.keys], rule, now)
+            elapsed = time.perf_counter() - started
+            print(f"  {name:8} {elapsed / args.checks * 1e6:7.2f}")
+
+if __name__ == "__main__":
+    main()
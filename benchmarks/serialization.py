@@ -0,0 +1,61 @@
+# benchmarks/serialization.py
+"""
+Coût de sérialisation et octets transférés pour une réponse /chat/ réaliste :
+20 événements formatés en markdown et 6 tours d'historique.
+
+Exemple :
+    python -m benchmarks.serialization --repeat 2000
+"""
+import argparse
+import gzip
+import json
+import time
+
+from benchmarks.catalog import make_events
+from services import responses
+from services.formatter import format_events
+
+def chat_payload(n_events=20):
+    """Réponse /chat/ en mode historique (le cas le plus lourd)."""
+    reply = "Voici les événements à venir :\n\n" + format_events(make_events(n_events)) + \
+        f"\n\n_({n_events} affichés sur {n_events} trouvés)_"
+    history = []
+    for i in range(3):
+        history += [
+            {"role": "user", "content": f"Tous les concerts à Cotonou, page {i}"},
+            {"role": "assistant", "content": reply},
+        ]
+    return {"reply": reply, "history": history, "state": {"last_filters": {"city": "Cotonou"}}}
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de sérialisation et compression de /chat/")
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    payload = chat_payload(args.events)
+    encoders = {"json": lambda: json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")}
+    if responses.orjson is not None:
+        encoders["orjson"] = lambda: responses.orjson.dumps(payload)
+
+    print(f"Sérialisation ({args.events} événements, µs par réponse) :")
+    for name, encode in encoders.items():
+        print(f"  {name:8} {timed(encode, args.repeat):9.1f}")
+
+    body = encoders["json"]()
+    print("Octets transférés :")
+    print(f"  {'brut':8} {len(body):9d}")
+    for encoding in responses.available_encodings():
+        compressed = responses.compress(body, encoding)
+        cost = timed(lambda: responses.compress(body, encoding), max(1, args.repeat // 10))
+        print(f"  {encoding:8} {len(compressed):9d}  ({len(compressed) / len(body):.0%}, {cost:.0f} µs)")
+    assert gzip.decompress(responses.compress(body, "gzip")) == body
+
+if __name__ == "__main__":
+    main()
@@ -1,119 +1,480 @@
 
 #MAIN.PY
+import time
+IMPORT_STARTED = time.perf_counter()  # Origine du profil de démarrage
+
+import asyncio
+import json
 import logging
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, Request # Importation de Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Query, Request # Importation de Request
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
-# Imports SlowAPI pour le Rate Limit
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi.errors import RateLimitExceeded
+# Configuration (.env) chargée une seule fois, avant les services
+load_dotenv(override=True)
 
 # Vos services optimisés
-from services.gemini_client import chat_with_gemini
-from services.tools import search_events
-from services.filters import filter_events
-from services.formatter import format_events
+from services.gemini_client import chat_with_gemini, get_backend
+from services.tools import search_events, get_snapshot, refresh_snapshot, loaded_snapshot, is_expired, apply_event_change
+from services.refresher import PeriodicRefresher
+from services import webhooks
+from services import thumbnails
+from services import assets
+from services.filters import filter_events, prefilter_by_city, normalize
+from services.formatter import event_cards, format_events
+from services.local_parser import extract_city
+from services.conversation import ConversationState
+from services.sessions import create_store
+from services.search_api import (
+    InvalidFields, compute_etag, etag_matches, paginate, parse_fields, serialize_event
+)
+from services.startup import report as startup_report, FirstRequestMiddleware
+from services.responses import CompressionMiddleware, FastJSONResponse, dumps
+from services import metrics
+from services.profiling import ServerTimingMiddleware, stage_timer
+from services.logging_setup import RequestIdMiddleware, setup_logging
+from services.rate_limit import RateLimiter, create_store as create_rate_limit_store
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO)
+# Configuration du logging (JSON via une file, hors du chemin des requêtes)
+setup_logging()
 logger = logging.getLogger(__name__)
 
-# Initialisation du Limiter
-limiter = Limiter(key_func=get_remote_address)
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Initialisation du worker : moteur LLM, préchauffage du catalogue, puis
+    rafraîchissement périodique en tâche de fond (CATALOG_REFRESH_INTERVAL).
+    """
+    with startup_report.stage("llm_backend"):
+        get_backend()
+    warmed = False
+    if os.getenv("WARMUP_CATALOG", "1") == "1":
+        with startup_report.stage("catalog_warmup"):
+            warmed = not (await refresh_snapshot()).fallback
+    startup_report.mark_ready()
+
+    refresher = None
+    interval = float(os.getenv("CATALOG_REFRESH_INTERVAL", "300"))
+    if interval > 0:
+        async def refresh():
+            return not (await refresh_snapshot(max_age=interval)).fallback
+        refresher = PeriodicRefresher(
+            "catalog", refresh, interval,
+            jitter=float(os.getenv("CATALOG_REFRESH_JITTER", "0.1")),
+        )
+        refresher.start(succeeded=warmed)
+    try:
+        yield
+    finally:
+        if refresher is not None:
+            await refresher.stop()
+
+# Limitation de débit par seau à jetons, partagée entre workers (RATE_LIMIT_BACKEND)
+limiter = RateLimiter(create_rate_limit_store())
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(FirstRequestMiddleware)
+# Server-Timing sur /chat/ et profilage opt-in (PROFILE_TOKEN, PROFILE_SAMPLE_RATE)
+app.add_middleware(ServerTimingMiddleware)
+# gzip/brotli négocié pour /chat/ et /events/ au-delà de COMPRESS_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+# Identifiant de requête (X-Request-Id) repris dans chaque ligne de log
+app.add_middleware(RequestIdMiddleware)
 
 # Configuration des templates
 BASE_DIR = Path(__file__).resolve().parent
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+# CSS et JS de la page, chargés et compressés une fois, servis sous un nom empreinté
+static_assets = assets.AssetManifest(BASE_DIR / "static")
+
+# Fin de l'import de l'application (origine : première ligne de ce module)
+startup_report.origin = IMPORT_STARTED
+startup_report.record("import_main", IMPORT_STARTED)
 
 class ChatRequest(BaseModel):
     message: str
     history: list = [] 
+    state: Optional[dict] = None  # État compact renvoyé par /chat/ au tour précédent
+    session_id: Optional[str] = None  # Mode session : l'historique reste côté serveur
+    format: Literal["markdown", "cards"] = "markdown"  # "cards" : événements en cartes structurées, hors de `reply`
+
+# Conversations côté serveur, partagées par les workers de la machine (SESSION_BACKEND)
+sessions = create_store()
+
+@app.get("/health/startup")
+async def health_startup():
+    """Profil de démarrage du worker (étapes, prêt, première requête, budget)."""
+    return startup_report.to_dict()
+
+@app.get("/health/ready")
+async def health_ready():
+    """
+    Prêt dès qu'un catalogue a été chargé une fois (503 avant) : pendant une
+    panne de l'API, le dernier reste servi, signalé par `stale`.
+    """
+    snapshot = loaded_snapshot()
+    if snapshot is None:
+        return FastJSONResponse(status_code=503, content={"ready": False})
+    return {
+        "ready": True,
+        "version": snapshot.version,
+        "events": len(snapshot.events),
+        "age_seconds": round(time.time() - snapshot.loaded_at, 1),
+        "stale": is_expired(snapshot),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Métriques du worker au format Prometheus (étapes de /chat/, cache, catalogue, LLM)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+home_page = None
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("chat.html", {"request": request})
+    """Page de chat rendue une seule fois par worker ; 304 si le navigateur l'a déjà."""
+    global home_page
+    if home_page is None:
+        home_page = assets.render_page(templates, "chat.html", static_assets)
+    return assets.payload_response(home_page, request, assets.REVALIDATE)
+
+@app.get("/static/{filename:path}")
+async def static_file(filename: str, request: Request):
+    payload = static_assets.get(filename)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return assets.payload_response(payload, request, assets.IMMUTABLE)
+
+async def prefetch_catalog(message):
+    """
+    Charge le catalogue pendant que Gemini réfléchit.
+    Si l'analyse locale trouve une ville, pré-filtre déjà les candidats.
+    Retourne (tous_les_événements, ville_locale, candidats).
+    """
+    all_events = await search_events()
+    local_city = extract_city(message)
+    if not local_city:
+        return all_events, None, all_events
+    return all_events, local_city, prefilter_by_city(all_events, local_city)
+
+def build_search_reply(message, reply, search_filters, events, cards=False):
+    """
+    Filtre les événements et complète la réponse de l'IA (liste ou message contextuel).
+    Avec `cards`, la liste n'est pas rendue en Markdown : l'appelant renvoie event_cards().
+    Retourne (réponse, événements_affichés, nombre_trouvés).
+    """
+    with stage_timer("filter"):
+        filtered = filter_events(events, search_filters)
+    metrics.observe("chat_results_matched", len(filtered), buckets=metrics.COUNT_BUCKETS)
+
+    if not filtered:
+        # Message contextuel selon les filtres utilisés
+        context_parts = []
+        if search_filters.get('city'):
+            context_parts.append(f"à **{search_filters['city']}**")
+        if search_filters.get('category'):
+            context_parts.append(f"dans la catégorie **{search_filters['category']}**")
+        if search_filters.get('search_query'):
+            context_parts.append(f"pour **{search_filters['search_query']}**")
+        if search_filters.get('is_free'):
+            context_parts.append("**gratuits**")
+        
+        context_str = " ".join(context_parts) if context_parts else "correspondant à vos critères"
+        reply = f"{reply}\n\n📍 *Note :* Je n'ai trouvé aucun événement {context_str}. Essayez d'élargir votre recherche !"
+        metrics.observe("chat_results_returned", 0, buckets=metrics.COUNT_BUCKETS)
+        return reply, [], 0
+
+    # --- LOGIQUE DE LIMITE DYNAMIQUE ---
+    msg_lower = message.lower()
+    keywords_all = ["tout", "tous", "liste", "énumère", "disponible", "complet", "entier"]
+    
+    # On affiche 20 résultats si l'utilisateur veut "tout", sinon 5
+    limit = 20 if any(word in msg_lower for word in keywords_all) else 5
+    
+    top_results = filtered[:limit]
+    metrics.observe("chat_results_returned", len(top_results), buckets=metrics.COUNT_BUCKETS)
+    
+    # Ajout du compteur pour la transparence
+    count_info = f"\n\n_({len(top_results)} affichés sur {len(filtered)} trouvés)_"
+    if cards:
+        return f"{reply}{count_info}", top_results, len(filtered)
+    with stage_timer("format"):
+        events_formatted = format_events(top_results)
+    return f"{reply}\n\n{events_formatted}{count_info}", top_results, len(filtered)
 
 # --- FONCTION CHAT CORRIGÉE ---
+CHAT_RATE_LIMIT = "10/minute"  # Par IP et par session ; partagé avec /chat/batch (un jeton par message)
+
 @app.post("/chat/")
-@limiter.limit("10/minute")
-async def chat(request: Request, req: ChatRequest): # 'request' ajouté ici pour SlowAPI
+@limiter.limit(CHAT_RATE_LIMIT, per_session=CHAT_RATE_LIMIT)
+async def chat(request: Request, req: ChatRequest): # 'request' requis par le limiteur
+    # 0. PRÉCHARGEMENT SPÉCULATIF (en parallèle de l'appel IA)
+    prefetch = asyncio.create_task(prefetch_catalog(req.message))
+    # État compact de la conversation : côté serveur en mode session,
+    # sinon envoyé par le client (ou déduit de l'historique pour les anciens clients)
+    session_id = None
+    history = req.history
+    if req.session_id is not None:
+        session_id = req.session_id if sessions.is_valid_id(req.session_id) else sessions.new_session_id()
+        state, history = await sessions.load(session_id)
+    elif req.state is not None:
+        state = ConversationState.from_dict(req.state)
+    else:
+        state = ConversationState.from_history(req.history)
     try:
         # 1. ANALYSE IA
-        ai_data = await chat_with_gemini(req.message, req.history)
+        with stage_timer("llm"):
+            ai_data = await chat_with_gemini(req.message, state=state)
         
         reply = ai_data.get("ai_reply", "Je traite votre demande...")
         intent = ai_data.get("intent")
         filters = ai_data.get("filters", {})
+        metrics.inc("chat_intents_total", intent=intent or "unknown")
         
-        # Log des filtres extraits pour debug
-        logger.info(f"Filtres extraits: {filters}")
+        # Log des filtres extraits pour debug (échantillonné, formaté seulement si émis)
+        logger.debug("Filtres extraits: %s", filters)
 
         # 2. LOGIQUE DE RECHERCHE
+        top_results = []
         if intent == "search":
-            all_events = await search_events()
+            # Attente résiduelle du catalogue (préchargé pendant l'appel IA)
+            with stage_timer("fetch"):
+                all_events, local_city, candidates = await prefetch
             search_filters = filters if filters else {}
-            filtered = filter_events(all_events, search_filters)
+            # Le pré-filtre n'est réutilisable que si Gemini a retenu la même ville
+            if not local_city or normalize(search_filters.get("city")) != normalize(local_city):
+                candidates = all_events
+            reply, top_results, total = build_search_reply(
+                req.message, reply, search_filters, candidates, cards=req.format == "cards"
+            )
             
             # Log du nombre de résultats
-            logger.info(f"Événements trouvés: {len(filtered)} sur {len(all_events)}")
-
-            if not filtered:
-                # Message contextuel selon les filtres utilisés
-                context_parts = []
-                if search_filters.get('city'):
-                    context_parts.append(f"à **{search_filters['city']}**")
-                if search_filters.get('category'):
-                    context_parts.append(f"dans la catégorie **{search_filters['category']}**")
-                if search_filters.get('search_query'):
-                    context_parts.append(f"pour **{search_filters['search_query']}**")
-                if search_filters.get('is_free'):
-                    context_parts.append("**gratuits**")
-                
-                context_str = " ".join(context_parts) if context_parts else "correspondant à vos critères"
-                reply = f"{reply}\n\n📍 *Note :* Je n'ai trouvé aucun événement {context_str}. Essayez d'élargir votre recherche !"
-            else:
-                # --- LOGIQUE DE LIMITE DYNAMIQUE ---
-                msg_lower = req.message.lower()
-                keywords_all = ["tout", "tous", "liste", "énumère", "disponible", "complet", "entier"]
-                
-                # On affiche 20 résultats si l'utilisateur veut "tout", sinon 5
-                limit = 20 if any(word in msg_lower for word in keywords_all) else 5
-                
-                top_results = filtered[:limit]
-                events_formatted = format_events(top_results)
-                
-                # Ajout du compteur pour la transparence
-                count_info = f"\n\n_({len(top_results)} affichés sur {len(filtered)} trouvés)_"
-                reply = f"{reply}\n\n{events_formatted}{count_info}"
+            logger.info("Événements trouvés: %d sur %d", total, len(all_events), extra={"intent": intent})
+
+        else:
+            prefetch.cancel()
 
         # 3. GESTION DE L'HISTORIQUE
-        new_history = req.history + [
+        new_history = history + [
             {"role": "user", "content": req.message},
             {"role": "assistant", "content": reply}
         ]
+        state.update(req.message, intent, filters, top_results)
+
+        # Mode cartes : l'historique ne garde que la réponse courte
+        extra = {}
+        if req.format == "cards":
+            with stage_timer("format"):
+                extra["cards"] = event_cards(top_results)
+
+        if session_id:
+            # Seul le nouveau tour transite : l'historique reste sur le serveur
+            await sessions.save(session_id, state, new_history)
+            return FastJSONResponse(content={"reply": reply, "session_id": session_id, **extra})
         
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "reply": reply, 
-            "history": new_history[-6:] 
+            "history": new_history[-6:],
+            "state": state.to_dict(),
+            **extra
         })
 
     except Exception as e:
-        logger.error(f"Erreur critique dans /chat/ : {str(e)}")
-        return JSONResponse(content={
-            "reply": "⚠️ Désolé, je rencontre une petite difficulté technique. Réessayez dans un instant.",
-            "history": req.history
+        prefetch.cancel()
+        logger.error("Erreur critique dans /chat/ : %s", e, exc_info=True)
+        error_reply = "⚠️ Désolé, je rencontre une petite difficulté technique. Réessayez dans un instant."
+        if session_id:
+            return FastJSONResponse(content={"reply": error_reply, "session_id": session_id})
+        return FastJSONResponse(content={
+            "reply": error_reply,
+            "history": req.history,
+            "state": req.state
         })
 
+# --- TRAITEMENT PAR LOTS (intégrations partenaires) ---
+# Chaque message coûte un jeton du seau de /chat/ : au-delà de sa capacité (10),
+# un lot serait toujours refusé
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+class ChatBatchRequest(BaseModel):
+    messages: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    stream: bool = False  # NDJSON, une ligne par message, dans l'ordre d'entrée
+
+async def process_batch_item(index, message, snapshot_task, semaphore):
+    """Un message du lot : extraction IA (concurrence bornée) puis recherche sur l'instantané commun."""
+    try:
+        async with semaphore:
+            ai_data = await chat_with_gemini(message, state=ConversationState())
+        reply = ai_data.get("ai_reply", "Je traite votre demande...")
+        intent = ai_data.get("intent")
+        filters = ai_data.get("filters") or {}
+        top_results, total = [], 0
+        if intent == "search":
+            snapshot = await asyncio.shield(snapshot_task)
+            reply, top_results, total = build_search_reply(message, reply, filters, snapshot.events)
+        return {"index": index, "intent": intent, "filters": filters, "reply": reply,
+                "returned": len(top_results), "total": total}
+    except Exception as e:
+        logger.error("Erreur dans /chat/batch (élément %d) : %s", index, e)
+        return {"index": index, "error": "Traitement impossible pour ce message."}
+
+@app.post("/chat/batch")
+@limiter.limit("5/minute")
+@limiter.limit(CHAT_RATE_LIMIT, scope="chat", cost=lambda req: len(req.messages))
+async def chat_batch(request: Request, req: ChatBatchRequest):
+    """
+    Plusieurs messages en une requête : extractions concurrentes (BATCH_CONCURRENCY),
+    toutes les recherches sur un même instantané du catalogue, résultats dans l'ordre
+    d'entrée ; l'échec d'un élément n'interrompt pas le lot. Chaque message consomme
+    un jeton de la limite de /chat/ : le lot ne permet pas de la contourner.
+    """
+    snapshot_task = asyncio.create_task(get_snapshot())
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(process_batch_item(i, message, snapshot_task, semaphore))
+        for i, message in enumerate(req.messages)
+    ]
+
+    def cancel_all():
+        for task in tasks + [snapshot_task]:
+            task.cancel()
+
+    if not req.stream:
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            cancel_all()
+        return FastJSONResponse(content={"results": results})
+
+    async def lines():
+        try:
+            for task in tasks:
+                yield dumps(await task) + b"\n"
+        finally:
+            # Client déconnecté : on arrête les extractions restantes
+            cancel_all()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+# --- RECHERCHE STRUCTURÉE (sans LLM) ---
+@app.get("/events/search")
+@limiter.limit("120/minute")
+async def events_search(
+    request: Request,
+    city: Optional[str] = None,
+    date_start: Optional[str] = Query(None, pattern=DATE_PATTERN),
+    date_end: Optional[str] = Query(None, pattern=DATE_PATTERN),
+    category: Optional[str] = None,
+    q: Optional[str] = None,
+    is_free: Optional[bool] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = None,
+):
+    """
+    Recherche pour les applications et partenaires qui connaissent déjà leurs
+    filtres : même pipeline que /chat/ (search_events -> filter_events), sans Gemini.
+    """
+    try:
+        selected = parse_fields(fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=422, detail=f"Champs inconnus : {e}")
+
+    snapshot = await get_snapshot()
+    params = {
+        "city": city, "date_start": date_start, "date_end": date_end, "category": category,
+        "q": q, "is_free": is_free, "page": page, "page_size": page_size, "fields": ",".join(selected),
+    }
+    etag = compute_etag(snapshot.version, params)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    filtered = filter_events(snapshot.events, {
+        "city": city,
+        "date_start": date_start,
+        "date_end": date_end,
+        "category": category,
+        "search_query": q,
+        "is_free": is_free,
+    })
+    return FastJSONResponse(content={
+        "version": snapshot.version,
+        "total": len(filtered),
+        "page": page,
+        "page_size": page_size,
+        "results": [serialize_event(e, selected) for e in paginate(filtered, page, page_size)],
+    }, headers=headers)
+
+# --- WEBHOOK DU BACKEND (invalidation poussée) ---
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+@app.post("/webhooks/events", status_code=202)
+async def events_webhook(request: Request):
+    """
+    Appelé par back.lagenda.bj à la création, la modification ou la suppression
+    d'un événement : l'instantané en cache est corrigé pour cet événement seul,
+    sans attendre l'expiration ni recharger tout le catalogue.
+    """
+    if not WEBHOOK_SECRET:
+        raise HTTPException(status_code=404, detail="Not Found")
+    body = await request.body()
+    try:
+        webhooks.verify(
+            WEBHOOK_SECRET,
+            request.headers.get("x-lagenda-timestamp"),
+            body,
+            request.headers.get("x-lagenda-signature"),
+        )
+    except webhooks.InvalidWebhook as e:
+        logger.warning("Webhook refusé : %s", e)
+        raise HTTPException(status_code=401, detail="Signature invalide")
+    try:
+        action, event_id, raw_event = webhooks.parse_change(json.loads(body))
+    except (ValueError, webhooks.InvalidWebhook) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        snapshot = await apply_event_change(action, event_id, raw_event)
+    except TimeoutError:
+        # Correction non appliquée : le backend doit la renvoyer
+        logger.warning("Webhook : %s %s non appliqué (catalogue partagé verrouillé)", action, event_id)
+        raise HTTPException(status_code=503, detail="Catalogue occupé, réessayer", headers={"Retry-After": "5"})
+    logger.info("Webhook : %s %s", action, event_id)
+    if snapshot is None:
+        return {"applied": False}
+    return {"applied": True, "version": snapshot.version, "events": len(snapshot.events)}
+
+# --- MINIATURES DES AFFICHES ---
+thumbnailer = thumbnails.Thumbnailer()
+
+@app.get("/images/poster")
+async def poster_thumbnail(src: str = Query(..., max_length=2048), w: int = thumbnails.DEFAULT_WIDTH):
+    """
+    Affiche réduite et recompressée, mise en cache sur disque puis dans le
+    navigateur. En cas d'échec (ou sans Pillow), redirection vers l'original.
+    """
+    if w not in thumbnails.WIDTHS or not thumbnails.is_allowed(src, thumbnailer.allowed_hosts):
+        raise HTTPException(status_code=400, detail="Affiche ou largeur non prise en charge")
+    if not thumbnails.pillow_available():
+        return RedirectResponse(src, status_code=307)
+    try:
+        path = await thumbnailer.get(src, w)
+    except thumbnails.ThumbnailError as e:
+        logger.warning("Miniature impossible : %s", e)
+        metrics.inc("thumbnails_total", outcome="error")
+        return RedirectResponse(src, status_code=307)
+    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": thumbnails.CACHE_CONTROL})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
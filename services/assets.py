@@ -0,0 +1,109 @@
+#ASSETS.PY
+"""
+Fichiers statiques et page d'accueil servis depuis la mémoire.
+
+- static/ : chaque fichier est chargé au démarrage, nommé d'après son
+  contenu (chat.css -> chat.<empreinte>.css) et compressé une fois pour
+  toutes (gzip niveau 9, br qualité 11 si `brotli` est installé). Une URL
+  empreintée ne change jamais de contenu : Cache-Control immutable, un an.
+- page d'accueil : gabarit Jinja2 rendu une seule fois (avec les URL
+  empreintées), servie avec un ETag ; une visite répétée coûte un 304.
+"""
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fastapi import Response
+
+from services import responses
+from services.search_api import etag_matches
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"  # En cache, mais revalidé (ETag) à chaque visite
+PRECOMPRESS_MIN_SIZE = 256
+
+@dataclass
+class Payload:
+    """Contenu prêt à servir : corps brut, variantes compressées, ETag."""
+    body: bytes
+    media_type: str
+    etag: str
+    variants: dict = field(default_factory=dict)  # codage -> corps compressé
+
+    def select(self, accept_encoding):
+        """(corps, codage) selon Accept-Encoding ; codage None = corps brut."""
+        if self.variants:
+            encoding = responses.negotiate_encoding(accept_encoding)
+            if encoding in self.variants:
+                return self.variants[encoding], encoding
+        return self.body, None
+
+def precompress(body):
+    """Variantes compressées au plus fort niveau (coût payé une fois, au chargement)."""
+    if len(body) < PRECOMPRESS_MIN_SIZE:
+        return {}
+    variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if responses.brotli is not None:
+        variants["br"] = responses.brotli.compress(body, quality=11)
+    # Une variante plus lourde que l'original n'a pas d'intérêt
+    return {enc: data for enc, data in variants.items() if len(data) < len(body)}
+
+def make_payload(body, media_type):
+    digest = hashlib.sha256(body).hexdigest()
+    return Payload(body=body, media_type=media_type, etag=f'W/"{digest[:20]}"', variants=precompress(body))
+
+def media_type_for(name):
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+def fingerprint(name, body, length=10):
+    """chat.css -> chat.<empreinte>.css"""
+    stem, dot, suffix = name.rpartition(".")
+    digest = hashlib.sha256(body).hexdigest()[:length]
+    return f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+
+class AssetManifest:
+    """Fichiers d'un répertoire, servis sous `prefix` avec un nom empreinté."""
+
+    def __init__(self, directory, prefix="/static"):
+        self.directory = Path(directory)
+        self.prefix = prefix.rstrip("/")
+        self.files = {}  # nom empreinté -> Payload
+        self.urls = {}   # nom d'origine -> URL empreintée
+        if self.directory.is_dir():
+            for path in sorted(self.directory.rglob("*")):
+                if path.is_file():
+                    self.add(path.relative_to(self.directory).as_posix(), path.read_bytes())
+
+    def add(self, name, body):
+        fingerprinted = fingerprint(name, body)
+        self.files[fingerprinted] = make_payload(body, media_type_for(name))
+        self.urls[name] = f"{self.prefix}/{fingerprinted}"
+
+    def url(self, name):
+        """URL empreintée d'un fichier (KeyError si absent : erreur visible au rendu du gabarit)."""
+        return self.urls[name]
+
+    def get(self, fingerprinted):
+        return self.files.get(fingerprinted)
+
+def render_page(templates, name, manifest, **context):
+    """Rend un gabarit une seule fois, avec `asset_url()` pour référencer les fichiers statiques."""
+    html = templates.get_template(name).render(asset_url=manifest.url, **context)
+    return make_payload(html.encode("utf-8"), "text/html; charset=utf-8")
+
+def payload_response(payload, request, cache_control):
+    """Réponse 200 (variante négociée) ou 304 si le client a déjà cette version."""
+    headers = {"ETag": payload.etag, "Cache-Control": cache_control}
+    if payload.variants:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), payload.etag):
+        return Response(status_code=304, headers=headers)
+    body, encoding = payload.select(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=payload.media_type, headers=headers)
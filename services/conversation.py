@@ -0,0 +1,94 @@
+#CONVERSATION.PY
+import json
+from dataclasses import dataclass, field
+
+# Bornes de l'état : la taille du prompt ne dépend plus de la longueur de la conversation
+MAX_TURNS = 4
+MAX_TURN_CHARS = 160
+MAX_EVENT_IDS = 20
+PROMPT_EVENT_IDS = 5
+FILTER_KEYS = ("city", "date_start", "date_end", "category", "search_query", "is_free")
+
+def event_id(event):
+    """Identifiant stable d'un événement (id API, sinon slug, sinon lien)."""
+    for key in ("id", "slug", "link"):
+        value = event.get(key)
+        if value:
+            return str(value)
+    return None
+
+def _short(text):
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= MAX_TURN_CHARS else text[:MAX_TURN_CHARS - 1] + "…"
+
+def _clean_filters(filters):
+    """Ne garde que les filtres connus, non nuls, aux valeurs simples."""
+    clean = {}
+    for key in FILTER_KEYS:
+        value = (filters or {}).get(key)
+        if isinstance(value, bool):
+            clean[key] = value
+        elif isinstance(value, str) and value:
+            clean[key] = _short(value)
+    return clean
+
+@dataclass
+class ConversationState:
+    """
+    État compact d'une conversation : derniers filtres extraits, derniers
+    événements affichés et quelques messages utilisateur raccourcis.
+    Remplace l'historique brut (avec le markdown des listes) dans le prompt.
+    """
+    last_filters: dict = field(default_factory=dict)
+    last_event_ids: list = field(default_factory=list)
+    turns: list = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruit l'état envoyé par le client, en ignorant le superflu."""
+        if not isinstance(data, dict):
+            return cls()
+        filters = data.get("last_filters")
+        ids = data.get("last_event_ids")
+        turns = data.get("turns")
+        return cls(
+            last_filters=_clean_filters(filters) if isinstance(filters, dict) else {},
+            last_event_ids=[str(i)[:MAX_TURN_CHARS] for i in ids][:MAX_EVENT_IDS] if isinstance(ids, list) else [],
+            turns=[_short(t) for t in turns][-MAX_TURNS:] if isinstance(turns, list) else [],
+        )
+
+    @classmethod
+    def from_history(cls, history):
+        """Compatibilité : état minimal déduit d'un ancien historique (messages utilisateur seuls)."""
+        turns = [
+            _short(m.get("content"))
+            for m in (history or [])
+            if isinstance(m, dict) and m.get("role") == "user"
+        ]
+        return cls(turns=turns[-MAX_TURNS:])
+
+    def to_dict(self):
+        return {
+            "last_filters": self.last_filters,
+            "last_event_ids": self.last_event_ids,
+            "turns": self.turns,
+        }
+
+    def update(self, message, intent=None, filters=None, events=None):
+        """Enregistre un tour : le message, et pour une recherche ses filtres et résultats."""
+        self.turns = (self.turns + [_short(message)])[-MAX_TURNS:]
+        if intent == "search":
+            self.last_filters = _clean_filters(filters)
+            ids = [event_id(e) for e in (events or [])]
+            self.last_event_ids = [i for i in ids if i][:MAX_EVENT_IDS]
+
+    def to_prompt(self):
+        """Représentation JSON compacte, bornée, destinée au LLM."""
+        if not (self.turns or self.last_filters):
+            return "aucun"
+        payload = {"messages_precedents": self.turns}
+        if self.last_filters:
+            payload["derniers_filtres"] = self.last_filters
+        if self.last_event_ids:
+            payload["derniers_evenements_affiches"] = self.last_event_ids[:PROMPT_EVENT_IDS]
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
@@ -2,6 +2,7 @@
 import unicodedata
 from datetime import datetime
 from difflib import SequenceMatcher
+from functools import lru_cache
 
 # Dictionnaire de synonymes pour améliorer la recherche
 SYNONYMES = {
@@ -52,6 +53,21 @@ def normalize(text):
                   if unicodedata.category(c) != 'Mn')
     return text
 
+# Champs texte comparés par filter_events, normalisés une fois à l'ingestion
+# (tools.normalize_event) plutôt qu'à chaque recherche
+NORMALIZED_KEYS = {"city": "_city_norm", "title": "_title_norm", "description": "_description_norm"}
+
+def index_text(e):
+    """Stocke dans l'événement la forme normalisée de ses champs texte. Modifie et retourne le dictionnaire."""
+    for name, key in NORMALIZED_KEYS.items():
+        e[key] = normalize(e.get(name, ""))
+    return e
+
+def normalized(e, name):
+    """Forme normalisée d'un champ : celle stockée à l'ingestion, sinon calculée."""
+    value = e.get(NORMALIZED_KEYS[name])
+    return normalize(e.get(name, "")) if value is None else value
+
 def get_synonyms(word):
     """Retourne les synonymes d'un mot."""
     word_norm = normalize(word)
@@ -73,6 +89,11 @@ def fuzzy_match(text, target, threshold=0.75):
         return False
     return SequenceMatcher(None, normalize(text), normalize(target)).ratio() >= threshold
 
+@lru_cache(maxsize=4096)
+def similarity(a, b):
+    """Ratio de similarité de deux textes déjà normalisés (peu de villes distinctes : mis en cache)."""
+    return SequenceMatcher(None, a, b).ratio()
+
 def detect_category(text):
     """Détecte la catégorie d'un événement basé sur son titre/description."""
     text_norm = normalize(text)
@@ -90,6 +111,36 @@ def detect_category(text):
         return max(scores, key=scores.get)
     return None
 
+def match_city(target_city, city_norm, desc_norm):
+    """
+    Évalue la correspondance de ville (entrées déjà normalisées).
+    Retourne (score, raison) ou None si la ville n'est pas trouvée.
+    """
+    # Correspondance exacte dans le champ city
+    if target_city in city_norm:
+        return 60, f"ville_exacte:{target_city}"
+    # Correspondance dans la description
+    if target_city in desc_norm:
+        return 25, f"ville_desc:{target_city}"
+    # Fuzzy matching pour les variantes (ex: "Calavi" vs "Abomey-Calavi")
+    if target_city and city_norm and similarity(target_city, city_norm) >= 0.6:
+        return 40, f"ville_fuzzy:{target_city}"
+    return None
+
+def prefilter_by_city(events, city):
+    """
+    Pré-filtre bon marché sur la ville, avec exactement la même règle que
+    filter_events : filter_events(prefilter_by_city(ev, c), f) donne le même
+    résultat que filter_events(ev, f) lorsque f["city"] vaut c.
+    """
+    target_city = normalize(city)
+    if not target_city:
+        return list(events)
+    return [
+        e for e in events
+        if match_city(target_city, normalized(e, "city"), normalized(e, "description"))
+    ]
+
 def filter_events(events, filters):
     """
     Filtre et score les événements selon les critères fournis.
@@ -125,9 +176,9 @@ def filter_events(events, filters):
         match_reasons = []  # Pour le debug
         
         # Données de l'événement normalisées
-        title_norm = normalize(event.get("title", ""))
-        desc_norm = normalize(event.get("description", ""))
-        city_norm = normalize(event.get("city", ""))
+        title_norm = normalized(event, "title")
+        desc_norm = normalized(event, "description")
+        city_norm = normalized(event, "city")
         event_category = normalize(event.get("category", ""))
         
         # Dates de l'événement
@@ -138,26 +189,11 @@ def filter_events(events, filters):
 
         # 1. Filtre de Ville (Semi-bloquant)
         if target_city:
-            city_found = False
-            
-            # Correspondance exacte dans le champ city
-            if target_city in city_norm:
-                score += 60
-                city_found = True
-                match_reasons.append(f"ville_exacte:{target_city}")
-            # Correspondance dans la description
-            elif target_city in desc_norm:
-                score += 25
-                city_found = True
-                match_reasons.append(f"ville_desc:{target_city}")
-            # Fuzzy matching pour les variantes (ex: "Calavi" vs "Abomey-Calavi")
-            elif fuzzy_match(target_city, city_norm, 0.6):
-                score += 40
-                city_found = True
-                match_reasons.append(f"ville_fuzzy:{target_city}")
-            
-            if not city_found:
+            city_match = match_city(target_city, city_norm, desc_norm)
+            if not city_match:
                 continue  # Ville demandée non trouvée, on ignore
+            score += city_match[0]
+            match_reasons.append(city_match[1])
 
         # 2. Filtre de Date (Bloquant si spécifié)
         if f_start and ev_start:
@@ -1,77 +1,125 @@
 #FORMATTER.PY
+import html
+import os
 import re
+from functools import lru_cache
 
-month_full = {
-    'January': 'Janvier',
-    'February': 'Février',
-    'March': 'Mars',
-    'April': 'Avril',
-    'May': 'Mai',
-    'June': 'Juin',
-    'July': 'Juillet',
-    'August': 'Août',
-    'September': 'Septembre',
-    'October': 'Octobre',
-    'November': 'Novembre',
-    'December': 'Décembre'
-}
-
-month_abbr = {
-    'Jan': 'Jan',
-    'Feb': 'Fév',
-    'Mar': 'Mar',
-    'Apr': 'Avr',
-    'May': 'Mai',
-    'Jun': 'Jun',
-    'Jul': 'Jul',
-    'Aug': 'Aoû',
-    'Sep': 'Sep',
-    'Oct': 'Oct',
-    'Nov': 'Nov',
-    'Dec': 'Déc'
-}
-
-def translate_months(text, month_dict):
-    for eng, fr in month_dict.items():
-        text = text.replace(eng, fr)
-    return text
+from cachetools import LRUCache
+
+from services import metrics
+from services.conversation import event_id
+from services.thumbnails import poster_url
+
+# Blocs Markdown déjà rendus, par (id, révision, variante) : les événements
+# populaires reviennent dans la plupart des réponses
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "2048"))
+render_cache = LRUCache(maxsize=RENDER_CACHE_SIZE)
+
+# Tables compilées à l'import : dates et prix en français sans strftime ni
+# locale (global au processus, non sûr entre threads, dépendant de l'hôte).
+# Elles reprennent la sortie de strftime sous fr_FR.UTF-8 (glibc), celle des
+# serveurs où gemini_client fixait cette locale : "15 mars 2026",
+# "Du 10 févr. au 12 mars 2026", sur tous les hôtes désormais.
+MONTHS_FULL = ("janvier", "février", "mars", "avril", "mai", "juin",
+               "juillet", "août", "septembre", "octobre", "novembre", "décembre")
+MONTHS_ABBR = ("janv.", "févr.", "mars", "avr.", "mai", "juin",
+               "juil.", "août", "sept.", "oct.", "nov.", "déc.")
+DAYS = tuple(f"{d:02d}" for d in range(32))  # "%d" : jour sur deux chiffres
+
+# Balises de bloc (remplacées par un espace pour ne pas coller deux paragraphes)
+# ou de texte (supprimées), commentaires compris
+_TAG = re.compile(r"<!--.*?-->|<(/?(?:p|br|div|li|ul|ol|h[1-6]|tr|td|th|table|blockquote|section|article|hr)\b)?[^>]*>", re.S | re.I)
+
+def _replace_tag(match):
+    return " " if match.group(1) else ""
 
 def clean_html(raw_html):
-    """Nettoie le HTML et les entités bizarres des descriptions."""
+    """
+    Texte brut d'une description HTML : balises retirées en une passe,
+    toutes les entités décodées (&eacute;, &#39;, &nbsp;…), espaces normalisés.
+    Les chevrons restants (&lt;img …&gt; décodé, « < » isolé) sont ré-échappés :
+    le texte finit dans la réponse Markdown, insérée via innerHTML par la page.
+    """
     if not raw_html:
         return ""
-    # Supprime les balises
-    text = re.sub(r"<.*?>", "", raw_html)
-    # Nettoie les espaces et entités
-    text = text.replace("&nbsp;", " ").replace("&amp;", "&").replace("\r\n", " ")
-    return text.strip()
+    text = _TAG.sub(_replace_tag, raw_html)
+    if "&" in text:
+        text = html.unescape(text)
+    if "<" in text or ">" in text:
+        text = text.replace("<", "&lt;").replace(">", "&gt;")
+    # split() découpe aussi sur les espaces insécables issus de &nbsp;
+    return " ".join(text.split())
 
-def format_date_short(start, end):
-    """Formate la date de manière élégante et courte."""
+EXCERPT_LENGTH = 120
+
+def excerpt(text, length=EXCERPT_LENGTH):
+    """Extrait d'au plus `length` caractères (mobile), coupé entre deux mots."""
+    if len(text) <= length:
+        return text
+    cut = text[:length - 3]
+    if text[length - 3] != " ":
+        # Recul jusqu'au dernier espace, sauf mot démesuré (URL…)
+        head = cut.rsplit(" ", 1)[0]
+        if len(head) >= length // 2:
+            cut = head
+    return cut.rstrip(" ,;:.-–") + "..."
+
+def event_summary(e):
+    """Extrait de la description, calculé à l'ingestion (tools.normalize_event) si possible."""
+    summary = e.get("summary")
+    if summary is None:
+        summary = excerpt(clean_html(e.get("description", "")))
+    return summary
+
+def date_label(start, end):
+    """Date ou plage de dates, sans emoji (cartes et format_date_short)."""
     if not start:
-        return "📅 Date à confirmer"
+        return "Date à confirmer"
 
     # Si c'est le même jour
     if not end or start.date() == end.date():
-        date_str = start.strftime('%d %B %Y')
-        return f"📅 {translate_months(date_str, month_full)}"
+        return _day_label(start.year, start.month, start.day)
 
     # Si c'est une plage (ex: Festival)
-    start_str = start.strftime('%d %b')
-    end_str = end.strftime('%d %b %Y')
-    return f"📅 Du {translate_months(start_str, month_abbr)} au {translate_months(end_str, month_abbr)}"
+    return _range_label(start.month, start.day, end.year, end.month, end.day)
 
-def format_price(event):
-    """Formate le prix de l'événement."""
+@lru_cache(maxsize=4096)
+def _day_label(year, month, day):
+    """"15 mars 2026" (équivalent de strftime('%d %B %Y') sous fr_FR)."""
+    return f"{DAYS[day]} {MONTHS_FULL[month - 1]} {year}"
+
+@lru_cache(maxsize=4096)
+def _range_label(start_month, start_day, year, month, day):
+    """"Du 10 févr. au 12 mars 2026" (l'année de début n'est pas affichée)."""
+    return f"Du {DAYS[start_day]} {MONTHS_ABBR[start_month - 1]} au {DAYS[day]} {MONTHS_ABBR[month - 1]} {year}"
+
+@lru_cache(maxsize=1024)
+def fcfa(amount):
+    """Montant entier avec espace comme séparateur de milliers : "25 000 FCFA"."""
+    return f"{amount:,} FCFA".replace(",", " ")
+
+def format_date_short(start, end):
+    """Formate la date de manière élégante et courte."""
+    return f"📅 {date_label(start, end)}"
+
+def price_label(event):
+    """Prix sans emoji : "Gratuit", "5 000 FCFA", ou "" si inconnu."""
     if event.get("is_free"):
-        return "🆓 Gratuit"
+        return "Gratuit"
     
     price = event.get("price", 0)
     if price and price > 0:
-        return f"💰 {int(price):,} FCFA".replace(",", " ")
+        return fcfa(int(price))
     
     return ""
 
+def format_price(event):
+    """Formate le prix de l'événement."""
+    label = price_label(event)
+    if not label:
+        return ""
+    return f"🆓 {label}" if event.get("is_free") else f"💰 {label}"
+
 def format_category(category):
     """Formate la catégorie avec un emoji approprié."""
     if not category:
@@ -111,60 +159,109 @@ def format_category(category):
     
     return f"{emoji} {category.capitalize()}"
 
+def render_event(e):
+    """Bloc Markdown d'un événement."""
+    # 1. Préparation des données
+    title = (e.get("title") or "Événement").upper()
+    city = e.get("city") or "Bénin"
+    link = e.get("link") or "https://lagenda.bj"
+    img = poster_url(e.get("image"))  # Miniature servie par /images/poster
+    category = e.get("category")
+    venue = e.get("venue_name", "")
+    
+    # 2. Description courte (max 120 caractères pour le mobile)
+    desc_short = event_summary(e)
+
+    # 3. Construction du bloc Markdown
+    # On met le titre en gras et en lien
+    block = f"⭐ **[{title}]({link})**\n"
+    
+    # Ligne lieu et date
+    location_parts = [city]
+    if venue and venue != city:
+        location_parts.append(venue)
+    block += f"📍 {' - '.join(location_parts)} | {format_date_short(e.get('date_start'), e.get('date_end'))}\n"
+    
+    # Ligne catégorie et prix
+    meta_parts = []
+    if category:
+        cat_formatted = format_category(category)
+        if cat_formatted:
+            meta_parts.append(cat_formatted)
+    
+    price_formatted = format_price(e)
+    if price_formatted:
+        meta_parts.append(price_formatted)
+    
+    if meta_parts:
+        block += f"{' | '.join(meta_parts)}\n"
+    
+    # 4. Image (Syntaxe Markdown gérée par ton JS)
+    if img:
+        block += f"![affiche]({img})\n"
+        
+    if desc_short:
+        block += f"📝 _{desc_short}_\n"
+        
+    block += f"🔗 [Plus d'infos]({link})"
+    return block
+
+def cached_block(e, variant="markdown", render=render_event):
+    """
+    Bloc rendu via le cache LRU. La clé porte la révision posée à l'ingestion
+    (tools.normalize_event) : un événement modifié est rendu à nouveau.
+    Sans identifiant ni révision, le bloc est rendu sans cache.
+    Retourne (bloc, trouvé_en_cache).
+    """
+    revision = e.get("_rev")
+    eid = event_id(e)
+    if revision is None or eid is None:
+        return render(e), False
+    key = (eid, revision, variant)
+    block = render_cache.get(key)
+    if block is not None:
+        return block, True
+    block = render_cache[key] = render(e)
+    return block, False
+
+def event_card(e):
+    """
+    Carte compacte d'un événement pour le mode `format="cards"` de /chat/ :
+    le client l'affiche directement, sans analyser de Markdown. Les champs
+    vides sont omis.
+    """
+    venue = e.get("venue_name") or ""
+    city = e.get("city") or "Bénin"
+    card = {
+        "id": event_id(e),
+        "title": e.get("title") or "Événement",
+        "city": city,
+        "venue": venue if venue != city else "",
+        "dates": date_label(e.get("date_start"), e.get("date_end")),
+        "price": price_label(e),
+        "category": e.get("category") or "",
+        "image": poster_url(e.get("image")) or "",
+        "link": e.get("link") or "https://lagenda.bj",
+    }
+    return {k: v for k, v in card.items() if v}
+
+def event_cards(events):
+    """Cartes des événements affichés, via le même cache que les blocs Markdown."""
+    return [cached_block(e, variant="card", render=event_card)[0] for e in events]
+
 def format_events(events):
     """Transforme les dictionnaires d'événements en messages élégants."""
     if not events:
         return "📍 *Note :* Aucun événement trouvé pour ces critères."
 
     formatted_blocks = []
-
+    hits = 0
     for e in events:
-        # 1. Préparation des données
-        title = (e.get("title") or "Événement").upper()
-        city = e.get("city") or "Bénin"
-        link = e.get("link") or "https://lagenda.bj"
-        img = e.get("image")
-        category = e.get("category")
-        venue = e.get("venue_name", "")
-        
-        # 2. Description courte (max 120 caractères pour le mobile)
-        desc = clean_html(e.get("description", ""))
-        desc_short = (desc[:117] + "...") if len(desc) > 120 else desc
-
-        # 3. Construction du bloc Markdown
-        # On met le titre en gras et en lien
-        block = f"⭐ **[{title}]({link})**\n"
-        
-        # Ligne lieu et date
-        location_parts = [city]
-        if venue and venue != city:
-            location_parts.append(venue)
-        block += f"📍 {' - '.join(location_parts)} | {format_date_short(e.get('date_start'), e.get('date_end'))}\n"
-        
-        # Ligne catégorie et prix
-        meta_parts = []
-        if category:
-            cat_formatted = format_category(category)
-            if cat_formatted:
-                meta_parts.append(cat_formatted)
-        
-        price_formatted = format_price(e)
-        if price_formatted:
-            meta_parts.append(price_formatted)
-        
-        if meta_parts:
-            block += f"{' | '.join(meta_parts)}\n"
-        
-        # 4. Image (Syntaxe Markdown gérée par ton JS)
-        if img:
-            block += f"![affiche]({img})\n"
-            
-        if desc_short:
-            block += f"📝 _{desc_short}_\n"
-            
-        block += f"🔗 [Plus d'infos]({link})"
-        
+        block, hit = cached_block(e)
         formatted_blocks.append(block)
+        hits += hit
+    metrics.inc("render_cache_total", hits, outcome="hit")
+    metrics.inc("render_cache_total", len(events) - hits, outcome="miss")
 
     # Séparateur visuel entre les événements
-    return "\n\n---\n\n".join(formatted_blocks)
\ No newline at end of file
+    return "\n\n---\n\n".join(formatted_blocks)
@@ -1,26 +1,71 @@
 #GEMINI.PY
-import google.generativeai as genai
+import asyncio
 import os
-import json
 import logging
-import locale
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 
-load_dotenv(override=True)
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from services import metrics
+from services.conversation import ConversationState
+from services.filters import normalize
+from services.llm_backends import create_backend
+from services.local_parser import fallback_response
+from services.resilience import (
+    AdmissionController, AdmissionRejected, ResilientCaller, CircuitBreaker, CircuitOpenError, RequestCoalescer
+)
 
-# Configuration locale française pour les dates
-try:
-    locale.setlocale(locale.LC_TIME, 'fr_FR.UTF-8')
-except:
-    try:
-        locale.setlocale(locale.LC_TIME, 'French_France.1252')  # Windows
-    except:
-        pass  # Fallback si locale non disponible
+# Noms français des jours et des mois pour le contexte temporel du prompt
+# (tables fixes plutôt que locale.setlocale, global au processus et lent à l'import)
+JOURS = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+MOIS = ["janvier", "février", "mars", "avril", "mai", "juin",
+        "juillet", "août", "septembre", "octobre", "novembre", "décembre"]
+
+# Moteur d'extraction (Gemini par défaut, choisi par LLM_BACKEND), créé au premier appel
+backend = None
+
+def get_backend():
+    global backend
+    if backend is None:
+        backend = create_backend()
+    return backend
+
+def set_backend(new_backend):
+    """Remplace le moteur courant (tests, tests de charge)."""
+    global backend
+    backend = new_backend
+
+# Couche de résilience : échéance par appel, requête de couverture
+# au-delà du percentile de latence, disjoncteur vers l'analyse locale
+resilience = ResilientCaller(
+    "llm",
+    deadline=float(os.getenv("GEMINI_TIMEOUT", "8")),
+    hedge_percentile=float(os.getenv("GEMINI_HEDGE_PERCENTILE", "0")) or None,
+    breaker=CircuitBreaker(
+        "llm",
+        failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET", "30")),
+    ),
+)
+
+# Contrôle d'admission : appels simultanés au modèle, file d'attente bornée,
+# temps d'attente maximal ; au-delà, repli immédiat sur l'analyse locale
+admission = AdmissionController(
+    "llm",
+    max_concurrent=int(os.getenv("LLM_MAX_CONCURRENT", "16")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "64")),
+    max_wait=float(os.getenv("LLM_MAX_QUEUE_WAIT", "2")),
+)
+
+async def admitted_call(prompt):
+    """Un appel au modèle, après admission, avec la couche de résilience."""
+    async with admission.admit():
+        return await resilience.call(lambda: generate_json(prompt))
 
-# Utilisation du modèle flash pour la rapidité
-model = genai.GenerativeModel("gemini-2.5-flash")
+coalescer = RequestCoalescer("llm")
+
+def coalescing_key(message: str, state: ConversationState):
+    """Clé de déduplication : message normalisé, état de la conversation et jour courant."""
+    text = " ".join(normalize(message).split())
+    return f"{datetime.now().date().isoformat()}|{state.to_prompt()}|{text}"
 
 # Catégories d'événements reconnues
 CATEGORIES = [
@@ -36,10 +81,18 @@ CATEGORIES = [
     "mode", "beauté", "lifestyle", "bien-être", "yoga", "fitness"
 ]
 
-async def chat_with_gemini(message: str, history: list = None):
+async def generate_json(prompt: str):
+    """Un appel brut au moteur d'extraction, décodé en JSON."""
+    return await get_backend().generate_json(prompt)
+
+async def chat_with_gemini(message: str, history: list = None, state: ConversationState = None):
+    # L'état compact remplace l'historique brut ; l'historique n'est plus qu'une compatibilité
+    if state is None:
+        state = ConversationState.from_history(history)
+
     now = datetime.now()
     # Contexte temporel dynamique : indispensable pour "demain", "ce week-end", etc.
-    date_context = f"Aujourd'hui nous sommes le {now.strftime('%A %d %B %Y')}. Heure actuelle : {now.strftime('%H:%M')}."
+    date_context = f"Aujourd'hui nous sommes le {JOURS[now.weekday()]} {now.day:02d} {MOIS[now.month - 1]} {now.year}. Heure actuelle : {now.strftime('%H:%M')}."
     
     # Calcul des dates utiles pour le prompt
     tomorrow = now + timedelta(days=1)
@@ -97,6 +150,11 @@ async def chat_with_gemini(message: str, history: list = None):
          - Si l'utilisateur mentionne "payant" : is_free = false
          - Sinon : is_free = null
          
+         RÈGLES DE CONTINUITÉ :
+         - Le contexte de la conversation donne les derniers filtres utilisés et les messages précédents.
+         - Si le message est une suite (ex: "et à Parakou ?", "et demain ?"), reprends les derniers filtres
+           et ne remplace que ce que l'utilisateur précise.
+         
          RÉPONDS UNIQUEMENT EN JSON VALIDE :
          {{
            "intent": "search" | "chat",
@@ -112,25 +170,29 @@ async def chat_with_gemini(message: str, history: list = None):
          }}
          """
     
-    # On intègre l'historique pour la continuité
-    full_prompt = f"{system_prompt}\n\nHistorique récent: {history}\nUtilisateur: {message}"
+    # On intègre l'état de la conversation pour la continuité
+    full_prompt = f"{system_prompt}\n\nContexte de la conversation: {state.to_prompt()}\nUtilisateur: {message}"
     
     try:
-        response = await model.generate_content_async(
-            full_prompt,
-            generation_config={
-                "response_mime_type": "application/json",
-                "temperature": 0.1 # Rigueur maximale sur le format JSON
-            }
+        # Les messages identiques en vol partagent un seul appel au modèle (et une place)
+        return await coalescer.run(
+            coalescing_key(message, state),
+            lambda: admitted_call(full_prompt),
         )
         
-        # Parsing du JSON renvoyé par Gemini
-        return json.loads(response.text)
-        
+    except AdmissionRejected as e:
+        # Surcharge : réponse dégradée plutôt qu'une attente sans fin
+        logging.warning("Gemini: requête délestée (%s)", e.reason)
+        reason = f"shed_{e.reason}"
+    except CircuitOpenError:
+        reason = "circuit_open"
+    except asyncio.TimeoutError:
+        logging.error("Gemini: échéance dépassée")
+        reason = "timeout"
     except Exception as e:
-        logging.error(f"Erreur Gemini: {e}")
-        return {
-            "intent": "chat",
-            "filters": {},
-            "ai_reply": "Je suis prêt à vous aider ! Que cherchez-vous au Bénin ?"
-        }
\ No newline at end of file
+        logging.error("Erreur Gemini: %s", e)
+        reason = "error"
+
+    # Repli sur l'analyse locale, sans LLM
+    metrics.inc("llm_fallbacks_total", reason=reason)
+    return fallback_response(message, previous_filters=state.last_filters)
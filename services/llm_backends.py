@@ -0,0 +1,109 @@
+#LLM_BACKENDS.PY
+import asyncio
+import json
+import os
+import random
+from abc import ABC, abstractmethod
+
+from services.local_parser import fallback_response
+
+class ExtractionBackend(ABC):
+    """
+    Interface d'un moteur d'extraction : reçoit le prompt complet et
+    retourne le JSON {intent, filters, ai_reply} décodé.
+    """
+    name = "abstract"
+
+    @abstractmethod
+    async def generate_json(self, prompt: str) -> dict:
+        ...
+
+def load_gemini_sdk():
+    """
+    Import tardif du SDK Gemini : il coûte près d'une seconde et n'est
+    nécessaire qu'à la création du moteur, pas à l'import de l'application.
+    """
+    import google.generativeai as genai
+    return genai
+
+class GeminiBackend(ExtractionBackend):
+    """Moteur Gemini (google-generativeai)."""
+    name = "gemini"
+
+    def __init__(self, model_name=None, api_key=None):
+        genai = load_gemini_sdk()
+        genai.configure(api_key=api_key or os.getenv("GEMINI_API_KEY"))
+        # Utilisation du modèle flash pour la rapidité
+        self.model = genai.GenerativeModel(model_name or os.getenv("GEMINI_MODEL", "gemini-2.5-flash"))
+
+    async def generate_json(self, prompt: str) -> dict:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config={
+                "response_mime_type": "application/json",
+                "temperature": 0.1 # Rigueur maximale sur le format JSON
+            }
+        )
+        # Parsing du JSON renvoyé par Gemini
+        return json.loads(response.text)
+
+def parse_latency(spec):
+    """
+    Décode une distribution de latence (en secondes) :
+    "0.2" ou "constant:0.2", "uniform:0.1,0.5", "normal:0.3,0.05", "lognormal:-1.5,0.5".
+    Retourne une fonction rng -> latence.
+    """
+    spec = (spec or "0").strip()
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "constant", kind
+    try:
+        values = [float(v) for v in args.split(",")]
+        if kind == "constant" and len(values) == 1:
+            return lambda rng: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(*values)
+        if kind == "normal" and len(values) == 2:
+            return lambda rng: max(0.0, rng.gauss(*values))
+        if kind == "lognormal" and len(values) == 2:
+            return lambda rng: rng.lognormvariate(*values)
+    except ValueError:
+        pass
+    raise ValueError(f"Distribution de latence invalide : {spec!r}")
+
+class FakeBackend(ExtractionBackend):
+    """
+    Moteur local déterministe, sans réseau, pour les tests de charge :
+    la réponse vient de l'analyse locale du dernier message utilisateur,
+    la latence et les erreurs suivent un générateur aléatoire à graine fixe.
+    """
+    name = "fake"
+
+    def __init__(self, latency="0", error_rate=0.0, seed=0):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def generate_json(self, prompt: str) -> dict:
+        self.calls += 1
+        delay = self.latency(self.rng)
+        fail = self.rng.random() < self.error_rate
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("Erreur simulée du moteur fake")
+        message = prompt.rsplit("Utilisateur:", 1)[-1].strip()
+        return fallback_response(message)
+
+def create_backend(name=None):
+    """Construit le moteur choisi par LLM_BACKEND (gemini par défaut)."""
+    name = (name or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "fake":
+        return FakeBackend(
+            latency=os.getenv("FAKE_LLM_LATENCY", "0"),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+        )
+    raise ValueError(f"Moteur LLM inconnu : {name!r}")
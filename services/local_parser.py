@@ -0,0 +1,139 @@
+#LOCAL_PARSER.PY
+import re
+from datetime import datetime, timedelta
+
+from services.filters import normalize, detect_category
+
+# Communes du Bénin (mêmes listes que le prompt Gemini)
+COMMUNES = [
+    "Cotonou",
+    "Abomey-Calavi", "Allada", "Kpomassè", "Ouidah", "Pahou", "Sô-Ava", "Toffo", "Tori-Bossito", "Zè",
+    "Porto-Novo", "Adjarra", "Adjohoun", "Aguégués", "Akpro-Missérété", "Avrankou", "Bonou", "Dangbo", "Sèmè-Kpodji",
+    "Adja-Ouèrè", "Ifangni", "Kétou", "Pobè", "Sakété",
+    "Athiémé", "Bopa", "Comè", "Grand-Popo", "Houéyogbé", "Lokossa",
+    "Aplahoué", "Djakotomey", "Dogbo", "Klouékanmè", "Lalo", "Toviklin",
+    "Abomey", "Agbangnizoun", "Bohicon", "Covè", "Djidja", "Ouinhi", "Zagnanado", "Za-Kpota", "Zogbodomey",
+    "Bantè", "Dassa-Zoumé", "Glazoué", "Ouèssè", "Savalou", "Savè",
+    "Bembèrèkè", "Kalalé", "N'Dali", "Nikki", "Parakou", "Pèrèrè", "Sinendé", "Tchaourou",
+    "Banikoara", "Gogounou", "Kandi", "Karimama", "Malanville", "Ségbana",
+    "Boukoumbé", "Cobly", "Kérou", "Kouandé", "Matéri", "Natitingou", "Péhunco", "Tanguiéta", "Toucountouna",
+    "Bassila", "Copargo", "Djougou", "Ouaké",
+]
+
+# Variantes courantes (ex: "Calavi" = "Abomey-Calavi", "PK" = "Porto-Novo")
+CITY_ALIASES = {
+    "calavi": "Abomey-Calavi",
+    "pk": "Porto-Novo",
+    "porto novo": "Porto-Novo",
+    "grand popo": "Grand-Popo",
+    "seme": "Sèmè-Kpodji",
+    "dassa": "Dassa-Zoumé",
+    "natti": "Natitingou",
+}
+
+# Index normalisé -> nom officiel, les noms les plus longs d'abord
+# pour que "Abomey-Calavi" l'emporte sur "Abomey".
+_CITY_INDEX = sorted(
+    [(normalize(c), c) for c in COMMUNES] + [(k, v) for k, v in CITY_ALIASES.items()],
+    key=lambda item: len(item[0]),
+    reverse=True,
+)
+
+FREE_WORDS = ["gratuit", "gratuite", "gratuits", "gratuites", "free", "entree libre"]
+PAID_WORDS = ["payant", "payants", "payante"]
+
+def _contains_word(text, word):
+    """Recherche d'un mot entier dans un texte normalisé."""
+    return re.search(rf"(?<![\w-]){re.escape(word)}(?![\w-])", text) is not None
+
+def extract_city(message):
+    """Retourne le nom officiel de la commune citée dans le message, ou None."""
+    text = normalize(message)
+    for key, city in _CITY_INDEX:
+        if _contains_word(text, key):
+            return city
+    return None
+
+def extract_dates(message, now=None):
+    """Applique les règles temporelles simples du prompt (aujourd'hui, demain, week-end)."""
+    now = now or datetime.now()
+    text = normalize(message)
+    today = now.date()
+
+    if "demain" in text:
+        day = today + timedelta(days=1)
+        return day.isoformat(), day.isoformat()
+    if "aujourd" in text or "ce soir" in text or "ce jour" in text:
+        return today.isoformat(), today.isoformat()
+    if "week-end" in text or "weekend" in text or "week end" in text:
+        # Vendredi -> Dimanche de cette semaine (ou de la suivante si "prochain")
+        friday = today + timedelta(days=(4 - today.weekday()))
+        if "prochain" in text:
+            friday += timedelta(days=7)
+        sunday = friday + timedelta(days=2)
+        return max(friday, today).isoformat(), sunday.isoformat()
+    if "semaine prochaine" in text:
+        monday = today + timedelta(days=(7 - today.weekday()))
+        return monday.isoformat(), (monday + timedelta(days=6)).isoformat()
+
+    # Aucune date mentionnée : événements à venir
+    return today.isoformat(), None
+
+def extract_filters(message, now=None):
+    """
+    Analyse locale, sans LLM, d'un message utilisateur.
+    Retourne un dictionnaire de filtres au même format que celui de Gemini.
+    """
+    text = normalize(message)
+    date_start, date_end = extract_dates(message, now)
+
+    is_free = None
+    if any(_contains_word(text, w) for w in FREE_WORDS):
+        is_free = True
+    elif any(_contains_word(text, w) for w in PAID_WORDS):
+        is_free = False
+
+    return {
+        "city": extract_city(message),
+        "date_start": date_start,
+        "date_end": date_end,
+        "category": detect_category(text),
+        "search_query": None,
+        "is_free": is_free,
+    }
+
+# Mots qui indiquent une recherche même sans critère précis
+SEARCH_WORDS = ["evenement", "evenements", "sortir", "sortie", "quoi de neuf", "que faire", "agenda", "programme"]
+
+def fallback_response(message, now=None, previous_filters=None):
+    """
+    Réponse de secours quand le LLM est indisponible : même structure que
+    la réponse de Gemini, construite uniquement à partir de l'analyse locale.
+    `previous_filters` (état de la conversation) complète les suites du type
+    "et à Parakou ?".
+    """
+    filters = extract_filters(message, now)
+    text = normalize(message)
+    has_criteria = filters["city"] or filters["category"] or filters["is_free"] is not None
+    explicit_date = filters["date_end"] is not None
+
+    if previous_filters and (has_criteria or explicit_date):
+        merged = dict(previous_filters)
+        for key, value in filters.items():
+            if value is None or (key in ("date_start", "date_end") and not explicit_date):
+                continue
+            merged[key] = value
+        merged.setdefault("date_start", filters["date_start"])
+        filters = {key: merged.get(key) for key in filters}
+
+    if has_criteria or explicit_date or any(w in text for w in SEARCH_WORDS):
+        return {
+            "intent": "search",
+            "filters": filters,
+            "ai_reply": "Voici ce que j'ai trouvé dans l'agenda :"
+        }
+    return {
+        "intent": "chat",
+        "filters": {},
+        "ai_reply": "Je suis prêt à vous aider ! Que cherchez-vous au Bénin ?"
+    }
@@ -0,0 +1,159 @@
+#LOGGING_SETUP.PY
+"""
+Journalisation non bloquante : les appels de log ne font que déposer
+l'enregistrement dans une file (QueueHandler) ; un thread (QueueListener)
+formate en JSON et écrit sur la sortie standard.
+
+Chaque ligne porte l'identifiant de la requête (en-tête X-Request-Id, ou
+généré) et les durées des étapes de /chat/ déjà mesurées. Les lignes DEBUG
+sont échantillonnées par requête (LOG_DEBUG_SAMPLE_RATE) : une requête
+retenue garde toutes ses lignes DEBUG.
+
+Variables : LOG_LEVEL (INFO), LOG_FORMAT (json ou text), LOG_DEBUG_SAMPLE_RATE (0.1).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import secrets
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from services.profiling import current_timings
+
+_request_id = ContextVar("request_id", default=None)
+
+# Attributs standard d'un LogRecord : tout le reste vient de `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "timings_ms"}
+
+def current_request_id():
+    return _request_id.get()
+
+class RequestContextFilter(logging.Filter):
+    """
+    Copie le contexte de la requête dans l'enregistrement. Doit s'exécuter dans
+    le thread appelant (filtre du QueueHandler) : le thread d'écriture n'a pas
+    accès aux variables de contexte de la requête.
+    """
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        timings = current_timings()
+        record.timings_ms = {k: round(v, 1) for k, v in timings.items()} if timings else None
+        return True
+
+class DebugSamplingFilter(logging.Filter):
+    """Garde toutes les lignes au-dessus de DEBUG ; les lignes DEBUG d'une fraction `rate` des requêtes."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.threshold = int(max(0.0, min(1.0, rate)) * 0xFFFFFFFF)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id is None:
+            return self.threshold > 0
+        return zlib.crc32(request_id.encode("utf-8")) <= self.threshold
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement, champs `extra=` inclus."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "timings_ms", None):
+            entry["timings_ms"] = record.timings_ms
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler qui ne formate pas dans le thread appelant : le message
+    (%-arguments, trace d'exception) est construit par le thread d'écriture.
+    Les arguments passés au log ne doivent donc pas être modifiés ensuite.
+    """
+
+    def prepare(self, record):
+        return record
+
+class RequestIdMiddleware:
+    """Middleware ASGI : identifiant de requête (X-Request-Id reçu ou généré), renvoyé dans la réponse."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"x-request-id"), "")
+        # On ne reprend qu'un identifiant raisonnable (pas d'injection dans les logs)
+        request_id = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else secrets.token_hex(8)
+        token = _request_id.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
+
+listener = None
+
+def setup_logging(level=None, fmt=None, debug_sample_rate=None, stream=None):
+    """
+    Installe la file de logs sur le logger racine (une seule fois par processus).
+    Retourne le QueueListener (arrêté automatiquement à la sortie).
+    """
+    global listener
+    if listener is not None:
+        return listener
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+    rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1") if debug_sample_rate is None else debug_sample_rate)
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+    ))
+
+    handler = DeferredQueueHandler(queue.SimpleQueue())
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(DebugSamplingFilter(rate))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+
+    listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logging)
+    return listener
+
+def stop_logging():
+    """Vide la file et arrête le thread d'écriture."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
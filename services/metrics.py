@@ -0,0 +1,122 @@
+#METRICS.PY
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Compteurs, jauges et histogrammes en mémoire du processus, indexés par (nom, labels)
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_histograms = {}
+_collectors = []
+
+# Bornes en secondes, des étapes locales (ms) jusqu'à l'échéance Gemini
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Bornes en nombre d'événements
+COUNT_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500)
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def inc(name, value=1, **labels):
+    """Incrémente un compteur."""
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+def set_gauge(name, value, **labels):
+    """Fixe la valeur d'une jauge."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    """Ajoute une observation à un histogramme (bornes fixées à la première observation)."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": tuple(buckets), "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        index = bisect_left(histogram["buckets"], value)
+        if index < len(histogram["counts"]):
+            histogram["counts"][index] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+@contextmanager
+def timer(name, **labels):
+    """Observe la durée du bloc, en secondes."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+def get(name, **labels):
+    """Valeur courante d'un compteur ou d'une jauge (0 si absent)."""
+    key = _key(name, labels)
+    with _lock:
+        if key in _gauges:
+            return _gauges[key]
+        return _counters.get(key, 0)
+
+def get_histogram(name, **labels):
+    """(nombre, somme) des observations d'un histogramme ((0, 0.0) si absent)."""
+    with _lock:
+        histogram = _histograms.get(_key(name, labels))
+        return (histogram["count"], histogram["sum"]) if histogram else (0, 0.0)
+
+def register_collector(collector):
+    """Fonction appelée avant chaque export (jauges calculées à la lecture, ex. âge du catalogue)."""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+def reset():
+    """Remet toutes les métriques à zéro (tests)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _series(name, labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    return name + "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+def render():
+    """Export au format texte Prometheus (version 0.0.4)."""
+    for collector in list(_collectors):
+        collector()
+
+    lines = []
+    with _lock:
+        for kind, store in (("counter", _counters), ("gauge", _gauges)):
+            by_name = defaultdict(list)
+            for (name, labels), value in store.items():
+                by_name[name].append((labels, value))
+            for name in sorted(by_name):
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(by_name[name], key=lambda item: str(item[0])):
+                    lines.append(f"{_series(name, labels)} {_number(value)}")
+
+        by_name = defaultdict(list)
+        for (name, labels), histogram in _histograms.items():
+            by_name[name].append((labels, histogram))
+        for name in sorted(by_name):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(by_name[name], key=lambda item: str(item[0])):
+                cumulative = 0
+                for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                    cumulative += count
+                    lines.append(f"{_series(name + '_bucket', labels, [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{_series(name + '_bucket', labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{_series(name + '_sum', labels)} {_number(histogram['sum'])}")
+                lines.append(f"{_series(name + '_count', labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
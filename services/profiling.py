@@ -0,0 +1,143 @@
+#PROFILING.PY
+"""
+Diagnostic d'une requête lente :
+- en-tête Server-Timing (llm, fetch, filter, format, total) sur /chat/ ;
+- profil cProfile opt-in (en-tête X-Profile égal à PROFILE_TOKEN, ou
+  échantillonnage PROFILE_SAMPLE_RATE), écrit dans PROFILE_DIR au format
+  pstats (snakeviz, flameprof, gprof2dot).
+"""
+import cProfile
+import hmac
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from services import metrics
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+# Durées (ms) des étapes de la requête en cours, par nom d'étape
+_timings = ContextVar("request_timings", default=None)
+
+@contextmanager
+def stage_timer(stage):
+    """Mesure une étape de /chat/ : histogramme Prometheus et en-tête Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("chat_stage_seconds", elapsed, stage=stage)
+        timings = _timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+def current_timings():
+    """Durées (ms) déjà mesurées pour la requête en cours, ou None hors requête."""
+    return _timings.get()
+
+def server_timing_header(timings):
+    return ", ".join(f"{stage};dur={duration:.1f}" for stage, duration in timings.items())
+
+class Profiler:
+    """Décide quelles requêtes profiler et range les profils (au plus `max_files`)."""
+
+    def __init__(self, token=PROFILE_TOKEN, sample_rate=PROFILE_SAMPLE_RATE,
+                 directory=PROFILE_DIR, max_files=PROFILE_MAX_FILES, rng=None):
+        self.token = token
+        self.sample_rate = sample_rate
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.rng = rng or random.Random()
+        self.active = False  # Un seul profileur à la fois par processus
+
+    def wants(self, header_value):
+        if self.active:
+            return False
+        if self.token and header_value and hmac.compare_digest(header_value, self.token):
+            return True
+        return self.sample_rate > 0 and self.rng.random() < self.sample_rate
+
+    def save(self, profile, path):
+        """Écrit le profil et supprime les plus anciens au-delà de `max_files`."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name = f"{stamp}-{path.strip('/').replace('/', '_') or 'root'}-{os.getpid()}-{self.rng.randrange(16**6):06x}.prof"
+        profile.dump_stats(self.directory / name)
+        existing = sorted(self.directory.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+        for old in existing[:max(0, len(existing) - self.max_files)]:
+            old.unlink(missing_ok=True)
+        return name
+
+profiler = Profiler()
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI : ajoute Server-Timing aux réponses de `paths` et profile
+    les requêtes choisies par `profiler`. Le profil couvre tout le processus
+    pendant la requête (boucle asyncio partagée) : à lire sous faible charge.
+    """
+
+    def __init__(self, app, paths=("/chat/",), request_profiler=None):
+        self.app = app
+        self.paths = set(paths)
+        self.profiler = request_profiler or profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        timings = {}
+        token = _timings.set(timings)
+        header_value = next(
+            (value.decode("latin-1") for key, value in scope["headers"] if key == b"x-profile"), None
+        )
+        profile = None
+        if self.profiler.wants(header_value):
+            profile = cProfile.Profile()
+            self.profiler.active = True
+        profile_name = None
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                total = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                value = server_timing_header({**timings, "total": total})
+                headers.append((b"server-timing", value.encode("latin-1")))
+                if profile_name:
+                    headers.append((b"x-profile-id", profile_name.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if profile is None:
+                return await self.app(scope, receive, send_wrapper)
+            # La réponse est retenue pour ajouter X-Profile-Id une fois le profil écrit
+            messages = []
+
+            async def buffer(message):
+                messages.append(message)
+
+            profile.enable()
+            try:
+                await self.app(scope, receive, buffer)
+            finally:
+                profile.disable()
+                self.profiler.active = False
+            try:
+                profile_name = self.profiler.save(profile, scope["path"])
+                logging.info("Profil écrit : %s", profile_name)
+            except OSError as e:
+                logging.error("Écriture du profil impossible : %s", e)
+            for message in messages:
+                await send_wrapper(message)
+        finally:
+            _timings.reset(token)
@@ -0,0 +1,269 @@
+#RATE_LIMIT.PY
+"""
+Limitation de débit par seau à jetons (token bucket), partagée entre les
+workers d'une machine.
+
+Stockages (RATE_LIMIT_BACKEND) :
+- memory : dictionnaire du processus (un seul worker, ou tests) ;
+- shared : fichier mmap de cases fixes, verrouillé (fcntl.flock) le temps
+  d'une mise à jour, commun à tous les workers et conservé au redémarrage (défaut) ;
+- redis  : script Lua atomique, partagé entre machines (paquet `redis`).
+"""
+import functools
+import inspect
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+import time
+import zlib
+
+from cachetools import LRUCache
+from fastapi import HTTPException, Request
+
+from services import metrics
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_SPEC = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+class Rule:
+    """`limit` requêtes par `period` secondes : capacité `limit`, remplissage continu."""
+
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+        self.capacity = float(limit)
+        self.rate = limit / period  # Jetons par seconde
+
+    @classmethod
+    def parse(cls, spec):
+        """Décode "10/minute", "5/second", "100/2 hours"…"""
+        match = _SPEC.match(spec)
+        if not match:
+            raise ValueError(f"Limite invalide : {spec!r}")
+        count, multiplier, unit = match.groups()
+        return cls(int(count), PERIODS[unit] * int(multiplier or 1))
+
+    def __str__(self):
+        return f"{self.limit} per {self.period} seconds"
+
+def refill(tokens, last, now, rule):
+    """Jetons disponibles à `now` pour un seau laissé à `tokens` à l'instant `last`."""
+    return min(rule.capacity, tokens + max(0.0, now - last) * rule.rate)
+
+def take_token(tokens, last, now, rule, cost=1):
+    """
+    Retourne (autorisé, jetons restants, attente avant les `cost` jetons en secondes).
+    Un coût négatif rend des jetons, sans dépasser la capacité.
+    """
+    tokens = refill(tokens, last, now, rule)
+    if tokens >= cost:
+        return True, min(rule.capacity, tokens - cost), 0.0
+    return False, tokens, (cost - tokens) / rule.rate
+
+class MemoryBucketStore:
+    """
+    Seaux en mémoire du processus, au plus `maxsize` (les moins récemment
+    utilisés sont oubliés, comme les cases reprises du stockage partagé).
+    """
+
+    def __init__(self, maxsize=8192):
+        self._buckets = LRUCache(maxsize=maxsize)
+
+    def take(self, key, rule, now, cost=1):
+        tokens, last = self._buckets.get(key, (rule.capacity, now))
+        allowed, tokens, retry_after = take_token(tokens, last, now, rule, cost)
+        self._buckets[key] = (tokens, now)
+        return allowed, retry_after
+
+    def reset(self):
+        self._buckets.clear()
+
+class SharedBucketStore:
+    """
+    Seaux dans un fichier mmap commun aux workers : `slots` cases de 24 octets
+    (empreinte de la clé, jetons, dernier accès), regroupées par `ways`.
+    Le fichier est verrouillé (fcntl.flock) pendant la mise à jour d'un groupe,
+    quelques centaines de nanosecondes : un verrou global coûte deux appels
+    système de moins qu'un verrou par plage (lockf) et la contention reste
+    négligeable. Si le groupe est plein, la case la plus ancienne est reprise.
+    Le fichier n'est ouvert (et créé) qu'à la première requête limitée.
+    """
+    SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, path, slots=8192, ways=4):
+        import fcntl  # POSIX uniquement
+        self._fcntl = fcntl
+        self.path = path
+        self.ways = ways
+        self.groups = max(1, slots // ways)
+        self.size = self.groups * ways * self.SLOT.size
+        self.fd = None
+        self.mm = None
+        self.group_size = ways * self.SLOT.size
+        self.group = struct.Struct("<" + "Qdd" * ways)
+
+    def _open(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < self.size:
+            os.ftruncate(self.fd, self.size)
+        self.mm = mmap.mmap(self.fd, self.size, access=mmap.ACCESS_WRITE)
+
+    @staticmethod
+    def key_hash(key):
+        """Empreinte 64 bits stable entre processus (hash() dépend de PYTHONHASHSEED)."""
+        raw = key.encode("utf-8")
+        return (zlib.crc32(raw) << 32 | zlib.adler32(raw)) | 1  # 0 = case libre
+
+    def take(self, key, rule, now, cost=1):
+        if self.mm is None:
+            self._open()
+        h = self.key_hash(key)
+        start = (h % self.groups) * self.group_size
+        fcntl = self._fcntl
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            group = self.group.unpack_from(self.mm, start)  # Une seule lecture pour tout le groupe
+            hashes = group[0::3]
+            if h in hashes:
+                way = hashes.index(h)
+                tokens, last = group[3 * way + 1], group[3 * way + 2]
+            else:
+                # Case libre (dernier accès 0) ou la plus ancienne
+                way = min(range(self.ways), key=lambda w: group[3 * w + 2] if hashes[w] else -1.0)
+                tokens, last = rule.capacity, now
+            allowed, tokens, retry_after = take_token(tokens, last, now, rule, cost)
+            self.SLOT.pack_into(self.mm, start + way * self.SLOT.size, h, tokens, now)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        return allowed, retry_after
+
+    def reset(self):
+        if self.mm is None:
+            self._open()
+        self.mm[:] = bytes(len(self.mm))
+
+class RedisBucketStore:
+    """Seaux dans Redis (script Lua atomique), partagés entre machines."""
+    SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+local capacity, rate, now, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens, last = tonumber(bucket[1]) or capacity, tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+local allowed = 0
+if tokens >= cost then tokens = math.min(capacity, tokens - cost); allowed = 1 end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'last', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url, prefix="lagenda:ratelimit:"):
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self.script = self.client.register_script(self.SCRIPT)
+
+    async def take(self, key, rule, now, cost=1):
+        allowed, tokens = await self.script(keys=[self.prefix + key], args=[rule.capacity, rule.rate, now, cost])
+        if allowed:
+            return True, 0.0
+        return False, (cost - float(tokens)) / rule.rate
+
+    def reset(self):
+        pass  # Les clés expirent d'elles-mêmes
+
+def client_ip(request):
+    return request.client.host if request.client else "127.0.0.1"
+
+class RateLimiter:
+    """
+    Décorateur d'endpoint : `@limiter.limit("10/minute", per_session="20/minute")`.
+    Clé par route et par IP ; la limite par session s'applique en plus quand la
+    requête porte un session_id (corps `req.session_id` ou en-tête X-Session-Id).
+    L'identifiant est choisi par le client : changer d'identifiant contourne la
+    limite par session, jamais celle par IP, toujours vérifiée.
+    `scope` partage les seaux d'une autre route ; `cost(req)` fixe le nombre de
+    jetons consommés par requête (un par message d'un lot, par exemple).
+    """
+
+    def __init__(self, store=None, key_func=client_ip, clock=time.time):
+        self.store = store or MemoryBucketStore()
+        self.key_func = key_func
+        self.clock = clock
+        self.enabled = True
+
+    async def check(self, key, rule, cost=1):
+        """Consomme `cost` jetons ou lève une erreur 429 avec Retry-After."""
+        if cost > rule.capacity:
+            # Jamais satisfaisable : inutile de faire patienter le client
+            metrics.inc("rate_limited_total", route=key.split(":", 1)[0])
+            raise HTTPException(status_code=429, detail=f"Rate limit exceeded: {cost} requests > {rule}")
+        allowed, retry_after = await self._take(key, rule, cost)
+        if not allowed:
+            metrics.inc("rate_limited_total", route=key.split(":", 1)[0])
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded: {rule}",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    async def _take(self, key, rule, cost):
+        result = self.store.take(key, rule, self.clock(), cost)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def refund(self, key, rule, cost=1):
+        """Rend `cost` jetons consommés par une requête finalement refusée."""
+        await self._take(key, rule, -cost)
+
+    def limit(self, spec, per_session=None, scope=None, cost=None):
+        rule = Rule.parse(spec)
+        session_rule = Rule.parse(per_session) if per_session else None
+
+        def decorator(endpoint):
+            route = scope or endpoint.__name__
+
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                if self.enabled:
+                    request = kwargs.get("request")
+                    if not isinstance(request, Request):
+                        raise TypeError(f"{route} : paramètre `request: Request` requis pour la limitation")
+                    tokens = cost(kwargs.get("req")) if cost else 1
+                    # Session d'abord : un refus par session ne consomme pas le jeton de l'IP,
+                    # et un refus par IP rend celui de la session
+                    session_key = None
+                    if session_rule is not None:
+                        session_id = getattr(kwargs.get("req"), "session_id", None) or request.headers.get("x-session-id")
+                        if session_id:
+                            session_key = f"{route}:session:{session_id}"
+                            await self.check(session_key, session_rule, tokens)
+                    try:
+                        await self.check(f"{route}:ip:{self.key_func(request)}", rule, tokens)
+                    except HTTPException:
+                        if session_key is not None:
+                            await self.refund(session_key, session_rule, tokens)
+                        raise
+                return await endpoint(*args, **kwargs)
+
+            return wrapper
+        return decorator
+
+    def reset(self):
+        self.store.reset()
+
+def create_store():
+    """Stockage choisi par RATE_LIMIT_BACKEND (shared par défaut, memory ou redis)."""
+    name = os.getenv("RATE_LIMIT_BACKEND", "shared").lower()
+    if name == "shared":
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        path = os.getenv("RATE_LIMIT_FILE", os.path.join(directory, "lagenda-ratelimit"))
+        return SharedBucketStore(path, slots=int(os.getenv("RATE_LIMIT_SLOTS", "8192")))
+    if name == "memory":
+        return MemoryBucketStore(int(os.getenv("RATE_LIMIT_SLOTS", "8192")))
+    if name == "redis":
+        return RedisBucketStore(os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Stockage de limitation inconnu : {name!r}")
@@ -0,0 +1,49 @@
+#REFRESHER.PY
+import asyncio
+import logging
+import random
+
+class PeriodicRefresher:
+    """
+    Tâche de fond qui rappelle `refresh()` toutes les `interval` secondes,
+    avec une gigue de ±`jitter` (fraction) pour que les workers ne frappent
+    pas l'API au même instant. Après un échec, nouvel essai plus tôt
+    (`retry_interval`). `refresh()` retourne True si le rafraîchissement a réussi.
+    """
+
+    def __init__(self, name, refresh, interval, jitter=0.1, retry_interval=30.0, rng=None, sleep=asyncio.sleep):
+        self.name = name
+        self.refresh = refresh
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_interval = retry_interval
+        self.rng = rng or random.Random()
+        self.sleep = sleep
+        self.task = None
+
+    def next_delay(self, succeeded):
+        base = self.interval if succeeded else min(self.retry_interval, self.interval)
+        return base * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    async def run(self, succeeded=True):
+        while True:
+            await self.sleep(self.next_delay(succeeded))
+            try:
+                succeeded = bool(await self.refresh())
+            except Exception as e:
+                logging.error("Rafraîchissement %s en échec : %s", self.name, e)
+                succeeded = False
+
+    def start(self, succeeded=True):
+        self.task = asyncio.create_task(self.run(succeeded))
+        return self.task
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
@@ -0,0 +1,266 @@
+#RESILIENCE.PY
+import asyncio
+import copy
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from services import metrics
+
+# États du disjoncteur (valeur exportée dans la jauge <nom>_breaker_state)
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Levée quand le disjoncteur est ouvert : on n'appelle pas le service."""
+
+class AdmissionRejected(Exception):
+    """Requête refusée par le contrôle d'admission (file pleine ou attente trop longue)."""
+
+    def __init__(self, name, reason):
+        super().__init__(f"{name}: {reason}")
+        self.reason = reason
+
+class LatencyTracker:
+    """Fenêtre glissante des latences réussies, pour calculer un percentile."""
+
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        """Percentile p (0-100), ou None tant que la fenêtre est trop courte."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+class CircuitBreaker:
+    """
+    Disjoncteur classique : après `failure_threshold` échecs consécutifs il
+    s'ouvre pendant `reset_timeout` secondes, puis laisse passer un seul appel
+    d'essai (half_open) qui le referme ou le rouvre.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._set_state(CLOSED)
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.set_gauge(f"{self.name}_breaker_state", STATE_VALUES[state])
+
+    def allow(self):
+        """Indique si un appel peut partir maintenant."""
+        if self.state == OPEN:
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.trial_in_flight = False
+        if self.state != CLOSED:
+            logging.info("Disjoncteur %s refermé", self.name)
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logging.warning("Disjoncteur %s ouvert après %d échec(s)", self.name, self.failures)
+                metrics.inc(f"{self.name}_breaker_opened_total")
+            self.opened_at = self.clock()
+            self._set_state(OPEN)
+
+class ResilientCaller:
+    """
+    Enveloppe un appel asynchrone avec :
+    - une échéance par appel (`deadline`, en secondes) ;
+    - une requête de couverture (hedging) lancée si la première dépasse le
+      percentile `hedge_percentile` des latences observées ;
+    - un disjoncteur qui court-circuite l'appel tant que le service est malade ;
+    - des métriques pour chaque issue.
+    """
+
+    def __init__(self, name, deadline=8.0, hedge_percentile=None, breaker=None, tracker=None):
+        self.name = name
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker(name)
+        self.tracker = tracker or LatencyTracker()
+
+    def hedge_delay(self):
+        if not self.hedge_percentile:
+            return None
+        return self.tracker.percentile(self.hedge_percentile)
+
+    async def call(self, factory):
+        """
+        Exécute `factory()` (qui retourne une coroutine neuve à chaque appel).
+        Lève CircuitOpenError, asyncio.TimeoutError ou l'erreur du service.
+        """
+        if not self.breaker.allow():
+            metrics.inc(f"{self.name}_calls_total", outcome="short_circuit")
+            raise CircuitOpenError(self.name)
+
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._hedged(factory), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            metrics.inc(f"{self.name}_calls_total", outcome="timeout")
+            raise
+        except asyncio.CancelledError:
+            # Annulation par l'appelant : ni succès ni échec du service
+            self.breaker.trial_in_flight = False
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            metrics.inc(f"{self.name}_calls_total", outcome="error")
+            raise
+
+        self.tracker.record(time.monotonic() - started)
+        self.breaker.record_success()
+        metrics.inc(f"{self.name}_calls_total", outcome="success")
+        return result
+
+    async def _hedged(self, factory):
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(factory())
+        if delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                metrics.inc(f"{self.name}_hedges_total", outcome="launched")
+                tasks.add(asyncio.ensure_future(factory()))
+
+            # Premier succès gagnant ; on n'échoue que si toutes les requêtes échouent
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            metrics.inc(f"{self.name}_hedges_total", outcome="won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+class AdmissionController:
+    """
+    Contrôle d'admission devant un service lent : au plus `max_concurrent`
+    appels simultanés, au plus `max_queue` requêtes en attente, et une attente
+    bornée par `max_wait` secondes (objectif de temps en file). Au-delà, la
+    requête est refusée tout de suite (AdmissionRejected) plutôt que d'allonger
+    la latence de toutes les autres.
+    """
+
+    def __init__(self, name, max_concurrent=16, max_queue=64, max_wait=2.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    def _publish(self):
+        metrics.set_gauge(f"{self.name}_admission_active", self.active)
+        metrics.set_gauge(f"{self.name}_admission_queue_depth", self.waiting)
+
+    def _reject(self, reason):
+        metrics.inc(f"{self.name}_admission_total", outcome=reason)
+        raise AdmissionRejected(self.name, reason)
+
+    @asynccontextmanager
+    async def admit(self):
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self._reject("queue_full")
+
+        started = time.perf_counter()
+        if self._slots.locked():
+            self.waiting += 1
+            self._publish()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                self._reject("queue_timeout")
+            finally:
+                self.waiting -= 1
+                self._publish()
+                metrics.observe(f"{self.name}_admission_wait_seconds", time.perf_counter() - started)
+        else:
+            await self._slots.acquire()
+            metrics.observe(f"{self.name}_admission_wait_seconds", 0.0)
+
+        self.active += 1
+        self._publish()
+        metrics.inc(f"{self.name}_admission_total", outcome="admitted")
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+            self._publish()
+
+class RequestCoalescer:
+    """
+    Déduplication des appels en vol : les appels concurrents avec la même clé
+    partagent une seule tâche. Chaque appelant reçoit sa propre copie du
+    résultat, ou la même exception. L'annulation d'un appelant n'annule pas
+    les autres ; la tâche partagée n'est annulée que si plus personne ne l'attend.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}
+
+    async def run(self, key, factory):
+        entry = self._inflight.get(key)
+        if entry is None:
+            entry = {"task": asyncio.ensure_future(factory()), "waiters": 0}
+            self._inflight[key] = entry
+            entry["task"].add_done_callback(lambda _: self._forget(key, entry))
+        else:
+            metrics.inc(f"{self.name}_coalesced_total")
+
+        entry["waiters"] += 1
+        try:
+            result = await asyncio.shield(entry["task"])
+        finally:
+            entry["waiters"] -= 1
+            if entry["waiters"] == 0 and not entry["task"].done():
+                # Dernier appelant annulé : plus personne n'attend le résultat
+                self._forget(key, entry)
+                entry["task"].cancel()
+        return copy.deepcopy(result)
+
+    def _forget(self, key, entry):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
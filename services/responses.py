@@ -0,0 +1,131 @@
+#RESPONSES.PY
+"""
+Sérialisation JSON rapide (orjson si installé) et compression négociée
+(brotli si installé, sinon gzip) des réponses de /chat/ et des recherches.
+"""
+import gzip
+import json
+import os
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Dépendance optionnelle
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle
+    brotli = None
+
+JSON_ENCODER = os.getenv("JSON_ENCODER", "orjson" if orjson else "json").lower()
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_PATHS = ("/chat/", "/events/")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Bon compromis CPU / taille pour des réponses dynamiques
+
+def dumps(content):
+    """Encode en JSON compact UTF-8 ; même octets que JSONResponse, plus vite avec orjson."""
+    if JSON_ENCODER == "orjson" and orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse avec l'encodeur choisi par JSON_ENCODER."""
+
+    def render(self, content):
+        return dumps(content)
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate_encoding(accept_encoding):
+    """
+    Choisit le codage à partir de l'en-tête Accept-Encoding (br préféré à gzip).
+    Les valeurs q=0 sont refusées ; retourne None si rien ne convient.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    candidates = [
+        enc for enc in available_encodings()
+        if accepted.get(enc, accepted.get("*", 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda enc: accepted.get(enc, accepted.get("*", 0.0)))
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI : compresse les réponses complètes au-delà de `minimum_size`
+    sur les chemins `paths`. Les réponses en flux (NDJSON) passent telles quelles.
+    """
+
+    def __init__(self, app, minimum_size=None, paths=COMPRESS_PATHS):
+        self.app = app
+        self.minimum_size = COMPRESS_MIN_SIZE if minimum_size is None else minimum_size
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            return await self.app(scope, receive, send)
+
+        headers = dict(
+            (key.decode("latin-1"), value.decode("latin-1")) for key, value in scope["headers"]
+        )
+        encoding = negotiate_encoding(headers.get("accept-encoding"))
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # Retenu jusqu'au premier morceau du corps
+                return
+            if start is None:
+                return await send(message)
+
+            response_start, start = start, None
+            response_headers = list(response_start.get("headers", []))
+            body = message.get("body", b"")
+            has_vary = any(key.lower() == b"vary" for key, _ in response_headers)
+            if not has_vary:
+                response_headers.append((b"vary", b"Accept-Encoding"))
+            already_encoded = any(key.lower() == b"content-encoding" for key, _ in response_headers)
+
+            if (
+                encoding is None
+                or already_encoded
+                or message.get("more_body", False)
+                or len(body) < self.minimum_size
+            ):
+                await send({**response_start, "headers": response_headers})
+                return await send(message)
+
+            compressed = compress(body, encoding)
+            response_headers = [
+                (key, value) for key, value in response_headers if key.lower() != b"content-length"
+            ]
+            response_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ]
+            await send({**response_start, "headers": response_headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
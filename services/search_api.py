@@ -0,0 +1,49 @@
+#SEARCH_API.PY
+import hashlib
+from datetime import datetime
+
+# Champs exposés par /events/search (les champs internes comme _match_reasons restent privés)
+PUBLIC_FIELDS = [
+    "id", "title", "city", "venue_name", "category", "date_start", "date_end",
+    "price", "is_free", "image", "link", "description", "relevance_score",
+]
+
+class InvalidFields(ValueError):
+    """Champ demandé inconnu dans le paramètre `fields`."""
+
+def parse_fields(fields):
+    """Décode `fields=title,city,...` ; None ou vide = tous les champs publics."""
+    if not fields:
+        return PUBLIC_FIELDS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in PUBLIC_FIELDS]
+    if unknown:
+        raise InvalidFields(", ".join(unknown))
+    return requested
+
+def serialize_event(event, fields=PUBLIC_FIELDS):
+    """Projection JSON d'un événement normalisé (dates en ISO 8601)."""
+    item = {}
+    for name in fields:
+        value = event.get(name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        item[name] = value
+    return item
+
+def paginate(items, page, page_size):
+    start = (page - 1) * page_size
+    return items[start:start + page_size]
+
+def compute_etag(version, params):
+    """ETag faible : version du catalogue + paramètres de la requête, dans un ordre canonique."""
+    canonical = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+    digest = hashlib.sha1(f"{version}|{canonical}".encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match, etag):
+    """Compare l'en-tête If-None-Match (liste ou *) à l'ETag courant."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
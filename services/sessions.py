@@ -0,0 +1,213 @@
+#SESSIONS.PY
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from services.conversation import ConversationState
+
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+MAX_HISTORY = 6
+
+class SessionBackend(ABC):
+    """Stockage clé -> dictionnaire JSON, avec expiration."""
+
+    @abstractmethod
+    async def get(self, session_id):
+        ...
+
+    @abstractmethod
+    async def set(self, session_id, data, ttl):
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id):
+        ...
+
+class MemorySessionBackend(SessionBackend):
+    """LRU borné en mémoire du processus, avec expiration (TTL) par entrée."""
+
+    def __init__(self, maxsize=10000, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    async def get(self, session_id):
+        entry = self._data.get(session_id)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at <= self.clock():
+            del self._data[session_id]
+            return None
+        self._data.move_to_end(session_id)
+        return data
+
+    async def set(self, session_id, data, ttl):
+        self._data[session_id] = (self.clock() + ttl, data)
+        self._data.move_to_end(session_id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)  # Moins récemment utilisée
+
+    async def delete(self, session_id):
+        self._data.pop(session_id, None)
+
+class FileSessionBackend(SessionBackend):
+    """
+    Un fichier JSON par session dans un répertoire commun aux workers de la
+    machine (/dev/shm par défaut : en mémoire), pour que les messages d'une
+    même conversation puissent arriver sur n'importe quel worker.
+    Écriture atomique (os.replace) ; la date de modification du fichier porte
+    son expiration. Les sessions expirées, puis les plus anciennes au-delà de
+    `maxsize`, sont purgées au plus une fois par `sweep_interval` secondes.
+    """
+
+    def __init__(self, directory, maxsize=10000, sweep_interval=60.0, clock=time.time):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._next_sweep = 0.0
+        self._created = False  # Répertoire créé à la première écriture, pas à l'import
+
+    def _path(self, session_id):
+        # Nom dérivé de l'identifiant : jamais de chemin fourni par le client
+        name = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.json")
+
+    async def get(self, session_id):
+        path = self._path(session_id)
+        try:
+            if os.stat(path).st_mtime <= self.clock():
+                os.unlink(path)
+                return None
+            with open(path, "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    async def set(self, session_id, data, ttl):
+        if not self._created:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            self._created = True
+        path = self._path(session_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        expires_at = self.clock() + ttl
+        os.utime(tmp_path, (expires_at, expires_at))
+        os.replace(tmp_path, path)
+        if self.clock() >= self._next_sweep:
+            self.sweep()
+
+    async def delete(self, session_id):
+        try:
+            os.unlink(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def sweep(self):
+        """Supprime les sessions expirées, puis les plus proches de l'expiration au-delà de `maxsize`."""
+        now = self.clock()
+        self._next_sweep = now + self.sweep_interval
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except FileNotFoundError:  # Supprimée par un autre worker
+                        pass
+        except FileNotFoundError:  # Aucune session encore écrite
+            return
+        entries.sort()
+        excess = len(entries) - self.maxsize
+        for i, (expires_at, path) in enumerate(entries):
+            if expires_at > now and i >= excess:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+class RedisSessionBackend(SessionBackend):
+    """Stockage partagé entre workers et machines (dépendance optionnelle `redis`)."""
+
+    def __init__(self, url, prefix="lagenda:session:"):
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, session_id):
+        raw = await self.client.get(self.prefix + session_id)
+        return json.loads(raw) if raw else None
+
+    async def set(self, session_id, data, ttl):
+        await self.client.set(self.prefix + session_id, json.dumps(data, ensure_ascii=False), ex=int(ttl))
+
+    async def delete(self, session_id):
+        await self.client.delete(self.prefix + session_id)
+
+class SessionStore:
+    """Conversations côté serveur : état compact et derniers tours, par identifiant de session."""
+
+    def __init__(self, backend=None, ttl=1800):
+        self.backend = backend or MemorySessionBackend()
+        self.ttl = ttl
+
+    @staticmethod
+    def new_session_id():
+        return secrets.token_urlsafe(16)
+
+    @staticmethod
+    def is_valid_id(session_id):
+        return bool(session_id) and SESSION_ID_PATTERN.match(session_id) is not None
+
+    async def load(self, session_id):
+        """Retourne (état, historique) ; une session inconnue ou expirée repart de zéro."""
+        data = None
+        try:
+            data = await self.backend.get(session_id)
+        except Exception as e:
+            logging.error("Erreur lecture session: %s", e)
+        if not data:
+            return ConversationState(), []
+        return ConversationState.from_dict(data.get("state")), list(data.get("history") or [])
+
+    async def save(self, session_id, state, history):
+        try:
+            await self.backend.set(
+                session_id,
+                {"state": state.to_dict(), "history": history[-MAX_HISTORY:]},
+                self.ttl,
+            )
+        except Exception as e:
+            logging.error("Erreur écriture session: %s", e)
+
+    async def delete(self, session_id):
+        await self.backend.delete(session_id)
+
+def create_store():
+    """Construit le store choisi par SESSION_BACKEND (shared par défaut, memory ou redis)."""
+    ttl = float(os.getenv("SESSION_TTL", "1800"))
+    name = os.getenv("SESSION_BACKEND", "shared").lower()
+    if name == "shared":
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        path = os.getenv("SESSION_DIR", os.path.join(directory, "lagenda-sessions"))
+        return SessionStore(FileSessionBackend(path, int(os.getenv("SESSION_MAX", "10000"))), ttl)
+    if name == "redis":
+        return SessionStore(RedisSessionBackend(os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")), ttl)
+    if name == "memory":
+        return SessionStore(MemorySessionBackend(int(os.getenv("SESSION_MAX", "10000"))), ttl)
+    raise ValueError(f"Stockage de session inconnu : {name!r}")
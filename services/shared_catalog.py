@@ -0,0 +1,216 @@
+#SHARED_CATALOG.PY
+"""
+Catalogue partagé entre les workers d'une même machine (uvicorn --workers N),
+actif par défaut (CATALOG_BACKEND=shared).
+
+Un seul worker (verrou fcntl) récupère et normalise le catalogue, puis le
+publie dans SHARED_CATALOG_DIR/catalog.json par remplacement atomique
+(os.replace). Les autres lisent ce fichier via mmap, en lecture seule, tant
+qu'il est plus récent que `max_age`. Résultat : une récupération par
+rafraîchissement quel que soit le nombre de workers, et une seule copie
+sérialisée en mémoire (cache de pages du noyau). Chaque worker garde
+toutefois sa propre vue décodée, nécessaire à filter_events.
+
+Les corrections d'un seul événement (webhook) passent par update() : sous le
+même verrou, sur la dernière version publiée, sans repousser la date de
+publication (donc le prochain rechargement complet).
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from services import metrics
+
+try:
+    import orjson
+except ImportError:  # Dépendance optionnelle
+    orjson = None
+
+DATE_FIELDS = ("date_start", "date_end")
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+def encode_snapshot(snapshot):
+    payload = {"version": snapshot.version, "loaded_at": snapshot.loaded_at, "events": snapshot.events}
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, ensure_ascii=False).encode("utf-8")
+
+def decode_snapshot(raw):
+    """Inverse de encode_snapshot : les dates redeviennent des datetime."""
+    from services.tools import CatalogSnapshot
+    payload = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    for event in payload["events"]:
+        for name in DATE_FIELDS:
+            if event.get(name):
+                event[name] = datetime.fromisoformat(event[name])
+    return CatalogSnapshot(events=payload["events"], version=payload["version"], loaded_at=payload["loaded_at"])
+
+class SharedCatalog:
+    """Fichier catalogue partagé, publié par un seul worker à la fois."""
+
+    def __init__(self, directory, max_age=600, lock_timeout=20.0, poll_interval=0.1, clock=time.time):
+        self.directory = Path(directory)
+        self.path = self.directory / "catalog.json"
+        self.lock_path = self.directory / "catalog.lock"
+        self.max_age = max_age
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self._decoded = None  # (identité du fichier, instantané décodé)
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def is_fresh(self, stat, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        return stat is not None and self.clock() - stat.st_mtime < max_age
+
+    @staticmethod
+    def _identity(stat):
+        # ctime change à chaque remplacement, même si mtime est restaurée par update()
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size)
+
+    def read(self):
+        """Instantané publié (None si absent) ; décodé une seule fois par version du fichier."""
+        stat = self._stat()
+        if stat is None:
+            return None
+        identity = self._identity(stat)
+        if self._decoded and self._decoded[0] == identity:
+            return self._decoded[1]
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if orjson is not None:
+                    with memoryview(mm) as view:  # Décodage sans copie intermédiaire
+                        snapshot = decode_snapshot(view)
+                else:
+                    snapshot = decode_snapshot(mm[:])
+        except (OSError, ValueError, KeyError) as e:
+            logging.error("Lecture du catalogue partagé impossible : %s", e)
+            return None
+        self._decoded = (identity, snapshot)
+        metrics.inc("shared_catalog_reads_total")
+        return snapshot
+
+    def publish(self, snapshot):
+        """Écrit l'instantané puis remplace atomiquement le fichier publié."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"catalog.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(encode_snapshot(snapshot))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        metrics.inc("shared_catalog_publishes_total")
+
+    def _try_lock(self):
+        import fcntl  # POSIX uniquement
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            os.close(fd)
+            return None
+
+    @staticmethod
+    def _unlock(fd):
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    async def _lock(self):
+        """Attend le verrou de publication ; None s'il est encore tenu après `lock_timeout`."""
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            fd = self._try_lock()
+            if fd is not None or time.monotonic() >= deadline:
+                return fd
+            await asyncio.sleep(self.poll_interval)
+
+    def _remember(self, snapshot):
+        self._decoded = (self._identity(self._stat()), snapshot)
+
+    async def get(self, fetch, max_age=None):
+        """
+        Instantané frais (moins de `max_age` secondes, par défaut celui du
+        catalogue) : lu dans le fichier partagé, ou récupéré via `fetch()`
+        par le worker qui obtient le verrou. Les autres attendent sa publication.
+        Retourne None si rien n'est disponible.
+        """
+        if self.is_fresh(self._stat(), max_age):
+            return self.read()
+
+        fd = await self._lock()
+        if fd is None:
+            logging.warning("Catalogue partagé : verrou toujours tenu, lecture de la dernière version")
+            return self.read()
+        try:
+            # Un autre worker a peut-être publié pendant l'attente du verrou
+            if self.is_fresh(self._stat(), max_age):
+                return self.read()
+            snapshot = await fetch()
+            if snapshot is not None and not snapshot.fallback:
+                self.publish(snapshot)
+                self._remember(snapshot)
+                return snapshot
+            # Échec de récupération : l'ancien fichier reste préférable à rien
+            return self.read() or snapshot
+        finally:
+            self._unlock(fd)
+
+    async def update(self, change):
+        """
+        Remplace l'instantané publié par `change(instantané)`, sous le verrou de
+        publication et à partir du fichier (pas de la copie, peut-être périmée,
+        de ce worker) : deux corrections ou une correction et un rechargement
+        simultanés ne s'écrasent pas. La date du fichier est conservée.
+        Retourne le nouvel instantané, ou None si rien n'est publié (le prochain
+        chargement sera complet). Lève TimeoutError si le verrou reste tenu au-delà
+        de `lock_timeout` : la correction n'est pas appliquée, à renvoyer plus tard.
+        """
+        fd = await self._lock()
+        if fd is None:
+            logging.warning("Catalogue partagé : verrou toujours tenu, correction refusée")
+            raise TimeoutError("verrou du catalogue partagé toujours tenu")
+        try:
+            stat = self._stat()
+            snapshot = self.read() if stat is not None else None
+            if snapshot is None:
+                return None
+            patched = change(snapshot)
+            self.publish(patched)
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self._remember(patched)
+            return patched
+        finally:
+            self._unlock(fd)
+
+def create_shared_catalog(max_age=600):
+    """
+    Catalogue choisi par CATALOG_BACKEND : shared (défaut) dans SHARED_CATALOG_DIR,
+    ou memory (None : cache propre à chaque worker, réservé à un seul worker, car
+    un webhook ne corrigerait que le worker qui le reçoit).
+    """
+    name = os.getenv("CATALOG_BACKEND", "shared").lower()
+    if name == "memory":
+        return None
+    if name != "shared":
+        raise ValueError(f"Stockage du catalogue inconnu : {name!r}")
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    directory = os.getenv("SHARED_CATALOG_DIR") or os.path.join(base, "lagenda-catalog")
+    return SharedCatalog(directory, max_age=max_age)
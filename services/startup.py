@@ -0,0 +1,140 @@
+#STARTUP.PY
+"""
+Profil de démarrage : temps d'import par module, étapes du lifespan
+(moteur LLM, préchauffage du catalogue), délai avant la première requête,
+comparés à un budget (STARTUP_BUDGET_MS).
+
+Rapport complet en ligne de commande :
+    python -m services.startup [--top 15]
+"""
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+class StartupReport:
+    """Chronologie du démarrage d'un worker, en millisecondes depuis `origin`."""
+
+    def __init__(self, budget_ms=None, origin=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.budget_ms = budget_ms
+        self.stages = {}
+        self.ready_ms = None
+        self.first_request_ms = None
+
+    def _since_origin(self):
+        return round((time.perf_counter() - self.origin) * 1000, 1)
+
+    def record(self, name, started):
+        """Enregistre la durée d'une étape commencée à `started` (perf_counter)."""
+        self.stages[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started)
+
+    def mark_ready(self):
+        self.ready_ms = self._since_origin()
+        if self.over_budget():
+            logging.warning("Démarrage hors budget : prêt en %s ms (budget %s ms)", self.ready_ms, self.budget_ms)
+        else:
+            logging.info("Worker prêt en %s ms", self.ready_ms)
+
+    def mark_first_request(self):
+        if self.first_request_ms is None:
+            self.first_request_ms = self._since_origin()
+
+    def over_budget(self):
+        return bool(self.budget_ms and self.ready_ms is not None and self.ready_ms > self.budget_ms)
+
+    def to_dict(self):
+        return {
+            "stages_ms": dict(self.stages),
+            "ready_ms": self.ready_ms,
+            "first_request_ms": self.first_request_ms,
+            "budget_ms": self.budget_ms,
+            "over_budget": self.over_budget(),
+        }
+
+report = StartupReport(budget_ms=float(os.getenv("STARTUP_BUDGET_MS", "0")) or None)
+
+class FirstRequestMiddleware:
+    """Middleware ASGI : note l'instant où la première réponse HTTP part."""
+
+    def __init__(self, app, startup_report=None):
+        self.app = app
+        self.report = startup_report or report
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.report.first_request_ms is not None:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                self.report.mark_first_request()
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+def parse_importtime(output):
+    """
+    Décode la sortie de `python -X importtime`.
+    Retourne [(module, self_ms, cumulé_ms)] trié par temps cumulé décroissant.
+    """
+    rows = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, module = match.groups()
+            rows.append((module, int(self_us) / 1000, int(cumulative_us) / 1000))
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+def profile_imports(module="main", cwd=None):
+    """Temps d'import par module de `module`, mesuré dans un interpréteur neuf."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=cwd,
+    )
+    return parse_importtime(result.stderr)
+
+def main(argv=None):
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Profil de démarrage de l'application")
+    parser.add_argument("--top", type=int, default=15, help="nombre de modules à afficher")
+    args = parser.parse_args(argv)
+
+    rows = profile_imports("main")
+    print("Imports (ms, cumulé / propre) :")
+    for module, self_ms, cumulative_ms in rows[:args.top]:
+        print(f"  {cumulative_ms:9.1f} {self_ms:9.1f}  {module}")
+
+    from main import app
+    import httpx
+    # Sous "python -m", ce module est __main__ : on lit le rapport de l'application
+    from services.startup import report as app_report
+
+    async def boot():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+                await client.get("/health/startup")
+
+    asyncio.run(boot())
+    print("Démarrage (ms depuis l'import de main) :")
+    for key, value in app_report.to_dict().items():
+        print(f"  {key}: {value}")
+    return 1 if app_report.over_budget() else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#THUMBNAILS.PY
+"""
+Miniatures des affiches d'événements, servies par GET /images/poster.
+
+Chaque affiche (URL d'origine, largeur) est téléchargée une seule fois,
+réduite et recompressée en JPEG (paquet `Pillow`, requirements.txt) puis rangée
+dans THUMBNAIL_DIR. Le répertoire est borné à THUMBNAIL_MAX_MB : les
+miniatures les moins récemment servies sont supprimées en premier. Les
+réponses portent un Cache-Control long : le navigateur ne redemande pas
+une affiche déjà vue.
+
+Seules les affiches des hôtes THUMBNAIL_ALLOWED_HOSTS sont prises en charge
+(l'endpoint ne doit pas servir de relais vers n'importe quelle URL).
+Sans Pillow (mode dégradé), les réponses gardent l'URL d'origine des
+affiches (pas de redirection inutile) et l'endpoint redirige vers l'original.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import time
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+import httpx
+
+from services import metrics
+from services.resilience import RequestCoalescer
+
+THUMBNAILS_ENABLED = os.getenv("THUMBNAILS", "1") == "1"
+THUMBNAIL_DIR = os.getenv("THUMBNAIL_DIR", "thumbnails")
+THUMBNAIL_MAX_BYTES = int(float(os.getenv("THUMBNAIL_MAX_MB", "200")) * 1024 * 1024)
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "70"))
+THUMBNAIL_ALLOWED_HOSTS = frozenset(
+    h.strip().lower() for h in os.getenv("THUMBNAIL_ALLOWED_HOSTS", "back.lagenda.bj,lagenda.bj").split(",") if h.strip()
+)
+# Préfixe des URL de miniatures (ex. https://chat.lagenda.bj) pour les clients d'une autre origine
+THUMBNAIL_BASE_URL = os.getenv("THUMBNAIL_BASE_URL", "").rstrip("/")
+
+ENDPOINT = "/images/poster"
+WIDTHS = (320, 480, 720)  # Largeurs autorisées : borne le nombre de variantes en cache
+DEFAULT_WIDTH = 480
+SOURCE_MAX_BYTES = 15 * 1024 * 1024
+CACHE_CONTROL = "public, max-age=2592000"  # 30 jours
+TOUCH_INTERVAL = 3600  # Mise à jour de la date d'accès (LRU) au plus une fois par heure
+
+class ThumbnailError(Exception):
+    """Affiche impossible à récupérer ou à convertir."""
+
+def is_allowed(url, hosts=THUMBNAIL_ALLOWED_HOSTS):
+    """URL http(s) d'un hôte autorisé."""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    return parts.scheme in ("http", "https") and (parts.hostname or "").lower() in hosts
+
+_pillow = None
+
+def pillow_available():
+    global _pillow
+    if _pillow is None:
+        try:
+            import PIL  # noqa: F401  (requirements.txt ; sans lui, mode dégradé)
+            _pillow = True
+        except ImportError:
+            logging.warning("Pillow absent (voir requirements.txt) : mode dégradé, affiches servies en taille d'origine")
+            _pillow = False
+    return _pillow
+
+def poster_url(url, width=DEFAULT_WIDTH):
+    """URL de la miniature d'une affiche, ou l'URL d'origine si elle n'est pas prise en charge."""
+    if not url or not THUMBNAILS_ENABLED or not is_allowed(url) or not pillow_available():
+        return url
+    return f"{THUMBNAIL_BASE_URL}{ENDPOINT}?w={width}&src={quote(url, safe=':/')}"
+
+def resize(data, width, quality=THUMBNAIL_QUALITY):
+    """Réduit une image à `width` pixels de large au plus (jamais agrandie), en JPEG progressif."""
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", (width, width * 3))  # Décodage JPEG directement à taille réduite
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((width, width * 3))
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ThumbnailError(f"Image illisible : {e}") from e
+    return out.getvalue()
+
+class ThumbnailCache:
+    """Répertoire de miniatures borné à `max_bytes`, éviction des moins récemment servies (mtime)."""
+
+    def __init__(self, directory, max_bytes=THUMBNAIL_MAX_BYTES, clock=time.time):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._size = None  # Taille totale, calculée au premier ajout
+
+    def path_for(self, url, width):
+        key = hashlib.sha1(f"{width}:{url}".encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.jpg"
+
+    def lookup(self, path):
+        """Vrai si la miniature existe ; rafraîchit sa date d'accès pour l'éviction."""
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        now = self.clock()
+        if now - mtime > TOUCH_INTERVAL:
+            os.utime(path, (now, now))
+        return True
+
+    def _files(self):
+        return [p for p in self.directory.glob("*.jpg") if p.is_file()]
+
+    def put(self, path, data):
+        """Écrit la miniature (remplacement atomique) puis évince si le répertoire dépasse la limite."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self._files())
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Supprime les miniatures les plus anciennes jusqu'à 90 % de la limite."""
+        entries = []
+        for p in self._files():
+            try:
+                stat = p.stat()
+            except FileNotFoundError:  # Supprimée par un autre worker
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        target = self.max_bytes * 0.9
+        for _, file_size, p in entries:
+            if size <= target:
+                break
+            try:
+                p.unlink()
+                metrics.inc("thumbnails_evicted_total")
+            except FileNotFoundError:
+                pass
+            size -= file_size
+        self._size = size
+
+class Thumbnailer:
+    """Récupère, réduit et met en cache les affiches ; une seule conversion par affiche en vol."""
+
+    def __init__(self, cache=None, allowed_hosts=THUMBNAIL_ALLOWED_HOSTS, quality=THUMBNAIL_QUALITY,
+                 transform=resize, timeout=10.0):
+        self.cache = cache or ThumbnailCache(THUMBNAIL_DIR)
+        self.allowed_hosts = allowed_hosts
+        self.quality = quality
+        self.transform = transform
+        self.timeout = timeout
+        self.coalescer = RequestCoalescer("thumbnail")
+
+    async def get(self, url, width):
+        """Chemin de la miniature, créée si besoin. Lève ThumbnailError en cas d'échec."""
+        if not is_allowed(url, self.allowed_hosts):
+            raise ThumbnailError(f"Hôte non autorisé : {url}")
+        path = self.cache.path_for(url, width)
+        if self.cache.lookup(path):
+            metrics.inc("thumbnails_total", outcome="hit")
+            return path
+        return await self.coalescer.run(str(path), lambda: self._build(url, width, path))
+
+    async def _build(self, url, width, path):
+        data = await self.fetch(url)
+        # Décodage et compression hors de la boucle d'événements
+        thumb = await asyncio.to_thread(self.transform, data, width, self.quality)
+        self.cache.put(path, thumb)
+        metrics.inc("thumbnails_total", outcome="miss")
+        metrics.inc("thumbnails_bytes_saved_total", max(0, len(data) - len(thumb)))
+        return path
+
+    async def fetch(self, url):
+        """Télécharge l'affiche d'origine (taille bornée, sans suivre les redirections)."""
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    chunks, size = [], 0
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > SOURCE_MAX_BYTES:
+                            raise ThumbnailError(f"Affiche trop lourde : {url}")
+                        chunks.append(chunk)
+        except httpx.HTTPError as e:
+            raise ThumbnailError(f"Téléchargement impossible : {e}") from e
+        return b"".join(chunks)
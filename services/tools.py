@@ -1,126 +1,317 @@
 #TOOLS.PY
+import hashlib
 import httpx
+import json
 import logging
+import math
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Optional
 
-from cachetools import TTLCache
+from cachetools import TLRUCache
+
+from services import metrics
+from services.conversation import event_id as identify
+from services.filters import index_text
+from services.formatter import clean_html, excerpt
+from services.shared_catalog import create_shared_catalog
 
 # URL de ton API
 API_URL = "https://back.lagenda.bj/events/"
 
-# Cache avec TTL de 10 minutes
-cache = TTLCache(maxsize=1, ttl=600)
+# Cache de 10 minutes, comptées depuis le chargement complet (`loaded_at`) : une
+# correction par webhook ne les relance pas. Deux entrées : l'instantané courant
+# ('snapshot') et le dernier chargé ('last'), sans expiration, servi tant que l'API
+# est indisponible (`expires_at` prolonge alors l'instantané courant)
+CATALOG_TTL = 600
+
+def snapshot_expiry(key, snapshot, now):
+    if key != 'snapshot':
+        return math.inf
+    return snapshot.expires_at or snapshot.loaded_at + CATALOG_TTL
+
+cache = TLRUCache(maxsize=2, ttu=snapshot_expiry, timer=time.time)
+
+@dataclass
+class CatalogSnapshot:
+    """Catalogue normalisé à un instant donné, avec une version stable (ETag)."""
+    events: list
+    version: str
+    loaded_at: float = field(default_factory=time.time)
+    fallback: bool = False  # Vrai pour l'instantané vide de secours (API indisponible)
+    expires_at: Optional[float] = None  # Fin de validité prolongée après un échec de récupération
+
+def catalog_version(events):
+    """Empreinte du contenu du catalogue : change dès qu'un événement change."""
+    payload = json.dumps(events, default=str, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+# Fichier partagé entre workers (CATALOG_BACKEND=shared, défaut), None avec memory
+shared_catalog = create_shared_catalog(max_age=CATALOG_TTL)
+
+def build_snapshot(events):
+    return CatalogSnapshot(events=events, version=catalog_version(events))
+
+def empty_snapshot():
+    """Instantané vide renvoyé quand l'API est indisponible."""
+    return CatalogSnapshot(events=[], version="empty", loaded_at=0.0, fallback=True)
+
+def is_expired(snapshot, now=None):
+    """Chargé depuis plus de CATALOG_TTL secondes (prolongation `expires_at` non comprise)."""
+    return snapshot.loaded_at + CATALOG_TTL <= (now or time.time())
+
+def store(snapshot):
+    """Met l'instantané en cache et le retient comme dernier catalogue chargé."""
+    cache['snapshot'] = cache['last'] = snapshot
+
+def keep_stale(stale=None):
+    """
+    Récupération impossible : le plus récent des instantanés connus (en cache,
+    `stale` relu dans le fichier partagé, dernier chargé) reste servi et en cache
+    CATALOG_TTL secondes de plus, pour que les requêtes n'attendent pas chacune
+    l'API. None si aucun catalogue n'a jamais été chargé.
+    """
+    known = [s for s in (cache.get('snapshot'), stale, cache.get('last')) if s is not None]
+    if not known:
+        return None
+    snapshot = max(known, key=lambda s: s.loaded_at)
+    snapshot.expires_at = time.time() + CATALOG_TTL
+    store(snapshot)
+    return snapshot
 
 async def search_events():
     """
     Récupère et normalise les événements depuis l'API.
     Utilise un cache pour éviter les appels répétitifs.
     """
-    if 'events' in cache:
-        logging.info("Événements récupérés depuis le cache")
-        return cache['events']
+    return (await get_snapshot()).events
+
+async def get_snapshot():
+    """
+    Instantané courant du catalogue (événements normalisés + version).
+    En cas d'erreur API, retourne un instantané vide, non mis en cache.
+    """
+    if 'snapshot' in cache:
+        logging.debug("Événements récupérés depuis le cache")
+        metrics.inc("catalog_cache_total", outcome="hit")
+        if shared_catalog is not None:
+            # Un autre worker a pu publier une mise à jour (webhook, rafraîchissement) :
+            # un stat() par requête, décodage seulement si le fichier a changé
+            snapshot = cache['snapshot']
+            published = shared_catalog.read()
+            if published is not None and published.version != snapshot.version:
+                published.expires_at = published.expires_at or snapshot.expires_at
+                store(published)
+                snapshot = published
+            return snapshot
+        return cache['snapshot']
     
+    metrics.inc("catalog_cache_total", outcome="miss")
+    if shared_catalog is not None:
+        # Plusieurs workers : un seul récupère, les autres lisent le fichier publié
+        snapshot = await shared_catalog.get(fetch_snapshot) or empty_snapshot()
+    else:
+        snapshot = await fetch_snapshot()
+    if snapshot.fallback or is_expired(snapshot):
+        # API indisponible (fichier partagé périmé relu, ou rien) : dernier catalogue chargé
+        return keep_stale(None if snapshot.fallback else snapshot) or snapshot
+    store(snapshot)
+    return snapshot
+
+async def refresh_snapshot(max_age=None):
+    """
+    Recharge le catalogue sans attendre l'expiration du cache (préchauffage,
+    rafraîchissement périodique). Avec le catalogue partagé, un fichier publié
+    depuis moins de `max_age` secondes par un autre worker suffit.
+    En cas d'échec, le dernier instantané chargé reste servi, même au-delà
+    de CATALOG_TTL (voir keep_stale).
+    """
+    if shared_catalog is not None:
+        snapshot = await shared_catalog.get(fetch_snapshot, max_age=max_age) or empty_snapshot()
+    else:
+        snapshot = await fetch_snapshot()
+    if snapshot.fallback or is_expired(snapshot):
+        metrics.inc("catalog_refresh_total", outcome="error")
+        return keep_stale(None if snapshot.fallback else snapshot) or snapshot
+    store(snapshot)
+    metrics.inc("catalog_refresh_total", outcome="success")
+    return snapshot
+
+def patch_snapshot(snapshot, action, event_id, raw_event=None):
+    """
+    Nouvel instantané après la création, la modification ou la suppression
+    d'un seul événement (identifié comme dans conversation.event_id).
+    L'instantané d'origine n'est pas modifié : les requêtes en cours le gardent.
+    Sa date de chargement et sa prolongation sont conservées (expiration inchangée).
+    """
+    event_id = str(event_id)
+    events = [e for e in snapshot.events if identify(e) != event_id]
+    if action in ("created", "updated"):
+        events.append(normalize_event(dict(raw_event)))
+    return CatalogSnapshot(events=events, version=catalog_version(events),
+                           loaded_at=snapshot.loaded_at, expires_at=snapshot.expires_at)
+
+async def apply_event_change(action, event_id, raw_event=None):
+    """
+    Applique un changement poussé par le backend à l'instantané en cache.
+    Entre workers, la correction porte sur la dernière version publiée, sous
+    le verrou du fichier partagé. Retourne le nouvel instantané, ou None si
+    aucun catalogue n'est chargé : le prochain chargement sera complet.
+    Lève TimeoutError si le verrou partagé n'a pas pu être obtenu.
+    """
+    def change(snapshot):
+        return patch_snapshot(snapshot, action, event_id, raw_event)
+
+    if shared_catalog is not None:
+        patched = await shared_catalog.update(change)
+    else:
+        snapshot = current_snapshot()
+        patched = change(snapshot) if snapshot is not None else None
+    if patched is None:
+        return None
+    store(patched)
+    metrics.inc("catalog_patches_total", action=action)
+    return patched
+
+def current_snapshot():
+    """Instantané en cache, sans déclencher de récupération (None si absent ou expiré)."""
+    return cache.get('snapshot')
+
+def loaded_snapshot():
+    """Dernier instantané chargé, même expiré (None si aucun chargement n'a réussi)."""
+    return cache.get('snapshot') or cache.get('last')
+
+def event_revision(raw_event):
+    """Empreinte courte du contenu brut d'un événement."""
+    payload = json.dumps(raw_event, default=str, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+def normalize_event(e):
+    """
+    Normalise un événement brut de l'API (dates, catégorie, prix, gratuité,
+    lieu) pour le filtrage. Modifie et retourne le dictionnaire.
+    La révision `_rev` (empreinte de l'événement brut) sert de clé au cache
+    de rendu du formatter ; `summary`, l'extrait texte de la description, évite
+    de nettoyer le HTML à chaque rendu ; les champs `_*_norm` (filters.index_text),
+    de normaliser la ville et la description à chaque recherche.
+    """
+    e["_rev"] = event_revision(e)
+    text = clean_html(str(e.get("description") or ""))
+    e["summary"] = excerpt(text)
+    try:
+        # --- EXTRACTION INTELLIGENTE DES DATES ---
+        start_dt = None
+        end_dt = None
+        
+        # Cas 1 : Dates simples (ex: WÀKÀJO)
+        dates_list = e.get("dates", [])
+        if dates_list and len(dates_list) > 0:
+            raw_date = dates_list[0].get("date")
+            if raw_date:
+                start_dt = datetime.fromisoformat(raw_date.replace("Z", "+00:00"))
+                end_dt = start_dt
+        
+        # Cas 2 : Dates récurrentes / Plages (ex: Festival Lopo Lopo)
+        recurring_list = e.get("recurring_dates", [])
+        if not start_dt and recurring_list and len(recurring_list) > 0:
+            rec = recurring_list[0]
+            if rec.get("start_date"):
+                start_dt = datetime.strptime(rec["start_date"], "%Y-%m-%d")
+            if rec.get("end_date"):
+                end_dt = datetime.strptime(rec["end_date"], "%Y-%m-%d")
+            else:
+                end_dt = start_dt
+        
+        # --- EXTRACTION DES MÉTADONNÉES ---
+        
+        # Catégorie
+        category = None
+        if e.get("category"):
+            if isinstance(e["category"], dict):
+                category = e["category"].get("name", "")
+            else:
+                category = str(e["category"])
+        
+        # Prix et gratuité
+        price = 0
+        is_free = False
+        if e.get("price"):
+            try:
+                price = float(e["price"])
+            except (ValueError, TypeError):
+                price = 0
+        
+        if e.get("is_free") or price == 0:
+            is_free = True
+        
+        # Vérification dans la description pour "gratuit"
+        desc = text.lower()  # Entités décodées : "entr&eacute;e libre" est reconnu
+        if "gratuit" in desc or "entrée libre" in desc or "free" in desc:
+            is_free = True
+        
+        # Popularité
+        views = e.get("views", 0) or 0
+        is_featured = e.get("is_featured", False) or e.get("featured", False)
+        
+        # Lieu
+        venue = e.get("venue", {})
+        if isinstance(venue, dict):
+            venue_name = venue.get("name", "")
+        else:
+            venue_name = str(venue) if venue else ""
+        
+        # Normalisation pour le filtrage
+        e["date_start"] = start_dt
+        e["date_end"] = end_dt
+        e["category"] = category
+        e["price"] = price
+        e["is_free"] = is_free
+        e["views"] = views
+        e["is_featured"] = is_featured
+        e["venue_name"] = venue_name
+    except Exception as parse_error:
+        logging.warning("Erreur parsing événement: %s", parse_error)
+        # On garde quand même l'événement avec des valeurs par défaut
+        e["date_start"] = None
+        e["date_end"] = None
+    return index_text(e)
+
+async def fetch_snapshot():
+    """
+    Récupère et normalise le catalogue depuis l'API.
+    En cas d'erreur, retourne un instantané vide.
+    """
     try:
         async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(API_URL)
-            response.raise_for_status()
-            data = response.json()
+            with metrics.timer("catalog_fetch_seconds"):
+                response = await client.get(API_URL)
+                response.raise_for_status()
+                data = response.json()
             events = data.get("results", [])
             
-            logging.info(f"API: {len(events)} événements récupérés")
+            logging.info("API: %d événements récupérés", len(events))
             
-            processed_events = []
-            for e in events:
-                try:
-                    # --- EXTRACTION INTELLIGENTE DES DATES ---
-                    start_dt = None
-                    end_dt = None
-                    
-                    # Cas 1 : Dates simples (ex: WÀKÀJO)
-                    dates_list = e.get("dates", [])
-                    if dates_list and len(dates_list) > 0:
-                        raw_date = dates_list[0].get("date")
-                        if raw_date:
-                            start_dt = datetime.fromisoformat(raw_date.replace("Z", "+00:00"))
-                            end_dt = start_dt
-                    
-                    # Cas 2 : Dates récurrentes / Plages (ex: Festival Lopo Lopo)
-                    recurring_list = e.get("recurring_dates", [])
-                    if not start_dt and recurring_list and len(recurring_list) > 0:
-                        rec = recurring_list[0]
-                        if rec.get("start_date"):
-                            start_dt = datetime.strptime(rec["start_date"], "%Y-%m-%d")
-                        if rec.get("end_date"):
-                            end_dt = datetime.strptime(rec["end_date"], "%Y-%m-%d")
-                        else:
-                            end_dt = start_dt
-                    
-                    # --- EXTRACTION DES MÉTADONNÉES ---
-                    
-                    # Catégorie
-                    category = None
-                    if e.get("category"):
-                        if isinstance(e["category"], dict):
-                            category = e["category"].get("name", "")
-                        else:
-                            category = str(e["category"])
-                    
-                    # Prix et gratuité
-                    price = 0
-                    is_free = False
-                    if e.get("price"):
-                        try:
-                            price = float(e["price"])
-                        except (ValueError, TypeError):
-                            price = 0
-                    
-                    if e.get("is_free") or price == 0:
-                        is_free = True
-                    
-                    # Vérification dans la description pour "gratuit"
-                    desc = str(e.get("description", "")).lower()
-                    if "gratuit" in desc or "entrée libre" in desc or "free" in desc:
-                        is_free = True
-                    
-                    # Popularité
-                    views = e.get("views", 0) or 0
-                    is_featured = e.get("is_featured", False) or e.get("featured", False)
-                    
-                    # Lieu
-                    venue = e.get("venue", {})
-                    if isinstance(venue, dict):
-                        venue_name = venue.get("name", "")
-                    else:
-                        venue_name = str(venue) if venue else ""
-                    
-                    # Normalisation pour le filtrage
-                    e["date_start"] = start_dt
-                    e["date_end"] = end_dt
-                    e["category"] = category
-                    e["price"] = price
-                    e["is_free"] = is_free
-                    e["views"] = views
-                    e["is_featured"] = is_featured
-                    e["venue_name"] = venue_name
-                    
-                    processed_events.append(e)
-                    
-                except Exception as parse_error:
-                    logging.warning(f"Erreur parsing événement: {parse_error}")
-                    # On ajoute quand même l'événement avec des valeurs par défaut
-                    e["date_start"] = None
-                    e["date_end"] = None
-                    processed_events.append(e)
-                
-            cache['events'] = processed_events
-            return processed_events
+            processed_events = [normalize_event(e) for e in events]
+            return build_snapshot(processed_events)
             
     except httpx.TimeoutException:
         logging.error("Timeout lors de l'appel API")
-        return []
+        metrics.inc("catalog_fetch_errors_total", reason="timeout")
+        return empty_snapshot()
     except httpx.HTTPStatusError as e:
-        logging.error(f"Erreur HTTP API: {e.response.status_code}")
-        return []
+        logging.error("Erreur HTTP API: %d", e.response.status_code)
+        metrics.inc("catalog_fetch_errors_total", reason="http")
+        return empty_snapshot()
     except Exception as e:
-        logging.error(f"Erreur API inattendue: {e}")
-        return []
\ No newline at end of file
+        logging.error("Erreur API inattendue: %s", e)
+        metrics.inc("catalog_fetch_errors_total", reason="other")
+        return empty_snapshot()
+
+def collect_catalog_metrics():
+    """Taille et âge du dernier instantané chargé, calculés au moment de l'export."""
+    snapshot = loaded_snapshot()
+    metrics.set_gauge("catalog_events", len(snapshot.events) if snapshot else 0)
+    metrics.set_gauge("catalog_snapshot_age_seconds", round(time.time() - snapshot.loaded_at, 3) if snapshot else -1)
+
+metrics.register_collector(collect_catalog_metrics)
\ No newline at end of file
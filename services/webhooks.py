@@ -0,0 +1,55 @@
+#WEBHOOKS.PY
+"""
+Webhook du backend lagenda.bj : création, modification ou suppression d'un
+événement, signé en HMAC-SHA256.
+
+En-têtes attendus :
+    X-Lagenda-Timestamp : secondes Unix de l'envoi
+    X-Lagenda-Signature : sha256=<hex de HMAC(secret, "<timestamp>.<corps brut>")>
+"""
+import hashlib
+import hmac
+import time
+
+ACTIONS = ("created", "updated", "deleted")
+DEFAULT_TOLERANCE = 300  # Secondes : au-delà, la requête est considérée rejouée
+
+class InvalidWebhook(ValueError):
+    """Signature, horodatage ou contenu invalide."""
+
+def sign(secret, timestamp, body):
+    """Signature attendue pour `body` (octets) envoyé à `timestamp`."""
+    message = f"{timestamp}.".encode("utf-8") + body
+    return "sha256=" + hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+def verify(secret, timestamp, body, signature, now=None, tolerance=DEFAULT_TOLERANCE):
+    """Lève InvalidWebhook si la signature ou l'horodatage ne conviennent pas."""
+    if not timestamp or not signature:
+        raise InvalidWebhook("en-têtes de signature manquants")
+    try:
+        sent_at = int(timestamp)
+    except ValueError:
+        raise InvalidWebhook("horodatage invalide")
+    now = time.time() if now is None else now
+    if abs(now - sent_at) > tolerance:
+        raise InvalidWebhook("horodatage hors tolérance")
+    if not hmac.compare_digest(sign(secret, timestamp, body), signature):
+        raise InvalidWebhook("signature invalide")
+
+def parse_change(payload):
+    """
+    Décode {"action": ..., "event": {...}} (ou {"action": "deleted", "id": ...}).
+    Retourne (action, identifiant, événement brut ou None).
+    """
+    if not isinstance(payload, dict):
+        raise InvalidWebhook("corps JSON attendu")
+    action = payload.get("action")
+    if action not in ACTIONS:
+        raise InvalidWebhook(f"action inconnue : {action!r}")
+    event = payload.get("event")
+    if action != "deleted" and not isinstance(event, dict):
+        raise InvalidWebhook("événement manquant")
+    event_id = payload.get("id") or (event or {}).get("id")
+    if not event_id:
+        raise InvalidWebhook("identifiant d'événement manquant")
+    return action, str(event_id), event if action != "deleted" else None
@@ -0,0 +1,229 @@
+// L'historique reste sur le serveur : seul l'identifiant de session circule
+function newSessionId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + Math.random().toString(36).slice(2, 12);
+}
+let sessionId = sessionStorage.getItem('lagenda-session') || newSessionId();
+sessionStorage.setItem('lagenda-session', sessionId);
+document.addEventListener('DOMContentLoaded', () => {
+    const now = new Date();
+    document.getElementById('initial-time').textContent = now.getHours().toString().padStart(2, '0') + ":" + now.getMinutes().toString().padStart(2, '0');
+    document.getElementById('user-input').addEventListener('keypress', (e) => {
+        if (e.key === 'Enter') sendMessage();
+    });
+});
+function formatMarkdown(text) {
+    if (!text) return "";
+    return text
+        .replace(/!\[.*?\]\((.*?)\)/g, '<img src="$1" class="event-img" loading="lazy" decoding="async" width="480" height="320" onerror="this.style.display=\'none\'">')
+        .replace(/\[(.*?)\]\((.*?)\)/g, '<a href="$2" target="_blank">$1</a>')
+        .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')
+        .replace(/_(.*?)_/g, '<em>$1</em>')
+        .replace(/\*(.*?)\*/g, '<em>$1</em>')
+        .replace(/---/g, '<hr style="border: none; border-top: 1px solid #444; margin: 15px 0;">')
+        .replace(/\n/g, '<br>');
+}
+// Cartes construites avec textContent : aucun HTML venant du serveur n'est interprété
+function renderCard(card) {
+    const el = document.createElement('div');
+    el.className = 'event-card';
+    const title = document.createElement('a');
+    title.className = 'event-title';
+    title.href = card.link;
+    title.target = '_blank';
+    title.textContent = '⭐ ' + card.title;
+    el.appendChild(title);
+    const lines = [
+        '📍 ' + [card.city, card.venue].filter(Boolean).join(' - ') + ' | 📅 ' + card.dates,
+        [card.category && '🏷️ ' + card.category, card.price && (card.price === 'Gratuit' ? '🆓 ' : '💰 ') + card.price].filter(Boolean).join(' | ')
+    ];
+    for (const line of lines) {
+        if (!line) continue;
+        const meta = document.createElement('div');
+        meta.className = 'event-meta';
+        meta.textContent = line;
+        el.appendChild(meta);
+    }
+    if (card.image) {
+        const img = document.createElement('img');
+        // Chargement différé, décodage hors du fil principal, taille réservée
+        img.loading = 'lazy';
+        img.decoding = 'async';
+        img.width = 480;
+        img.height = 320;
+        if (card.image.includes('/images/poster?w=480&')) {
+            // Miniature à la largeur de l'écran (320, 480 ou 720 px)
+            img.srcset = [320, 480, 720].map(w => card.image.replace('w=480&', `w=${w}&`) + ` ${w}w`).join(', ');
+            img.sizes = '(max-width: 600px) 85vw, 480px';
+        }
+        img.src = card.image;
+        img.className = 'event-img';
+        img.alt = card.title;
+        img.onerror = () => { img.style.display = 'none'; };
+        el.appendChild(img);
+    }
+    return el;
+}
+// Rendu progressif : quelques cartes par image affichée, pour ne pas bloquer
+// le fil principal sur les téléphones modestes
+const CARDS_PER_FRAME = 4;
+function renderCards(container, cards) {
+    let index = 0;
+    function step() {
+        const fragment = document.createDocumentFragment();
+        const end = Math.min(index + CARDS_PER_FRAME, cards.length);
+        for (; index < end; index++) fragment.appendChild(renderCard(cards[index]));
+        container.appendChild(fragment);
+        if (index < cards.length) requestAnimationFrame(step);
+    }
+    step();
+}
+// Une seule mise en page forcée par image, quel que soit le nombre d'ajouts
+let scrollPending = false;
+function scrollToBottom() {
+    if (scrollPending) return;
+    scrollPending = true;
+    requestAnimationFrame(() => {
+        scrollPending = false;
+        const chatBox = document.getElementById('chat');
+        chatBox.scrollTop = chatBox.scrollHeight;
+    });
+}
+// Réponse avec cartes : on affiche son début une fois, sans suivre les cartes
+// suivantes, dont les affiches ne se chargent qu'au défilement
+function scrollToStart(message) {
+    requestAnimationFrame(() => {
+        const chatBox = document.getElementById('chat');
+        chatBox.scrollTop += message.getBoundingClientRect().top - chatBox.getBoundingClientRect().top;
+    });
+}
+// Au-delà de MAX_MESSAGES, les plus anciens messages sont retirés du DOM
+// (gardés en mémoire) et réaffichés à la demande, par paquets
+const MAX_MESSAGES = 30;
+const RESTORE_BATCH = 10;
+let hiddenMessages = [];
+function pruneMessages() {
+    const chatBox = document.getElementById('chat');
+    const messages = chatBox.querySelectorAll(':scope > .message');
+    const excess = messages.length - MAX_MESSAGES;
+    if (excess <= 0) return;
+    for (let i = 0; i < excess; i++) {
+        messages[i].remove();
+        hiddenMessages.push(messages[i]);
+    }
+    updateOlderButton();
+}
+function updateOlderButton() {
+    const chatBox = document.getElementById('chat');
+    let button = document.getElementById('show-older');
+    if (!hiddenMessages.length) {
+        if (button) button.remove();
+        return;
+    }
+    if (!button) {
+        button = document.createElement('button');
+        button.id = 'show-older';
+        button.className = 'show-older';
+        button.onclick = restoreOlderMessages;
+        chatBox.prepend(button);
+    }
+    button.textContent = `Afficher les messages précédents (${hiddenMessages.length})`;
+}
+function restoreOlderMessages() {
+    const button = document.getElementById('show-older');
+    const fragment = document.createDocumentFragment();
+    for (const message of hiddenMessages.splice(-RESTORE_BATCH)) fragment.appendChild(message);
+    button.after(fragment);
+    updateOlderButton();
+}
+function appendMessage(text, type, cards) {
+    const chatBox = document.getElementById('chat');
+    const msgDiv = document.createElement('div');
+    msgDiv.className = `message ${type === 'user' ? 'user-message' : 'bot-message'}`;
+    const time = new Date().toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'});
+    msgDiv.innerHTML = `
+<div class="message-avatar"><i class="fas ${type === 'user' ? 'fa-user' : 'fa-robot'}"></i></div>
+<div>
+<div class="message-content">${formatMarkdown(text)}</div>
+<div class="message-time">${time}</div>
+</div>
+    `;
+    chatBox.appendChild(msgDiv);
+    pruneMessages();
+    if (cards && cards.length) {
+        renderCards(msgDiv.querySelector('.message-content'), cards);
+        scrollToStart(msgDiv);
+    } else {
+        scrollToBottom();
+    }
+}
+function showTypingIndicator() {
+    const chatBox = document.getElementById('chat');
+    const typingDiv = document.createElement('div');
+    typingDiv.className = 'message bot-message';
+typingDiv.id = 'typing-indicator';
+    typingDiv.innerHTML = `
+<div class="message-avatar"><i class="fas fa-robot"></i></div>
+<div class="typing-indicator">
+<div class="typing-dots">
+<div class="typing-dot"></div><div class="typing-dot"></div><div class="typing-dot"></div>
+</div>
+</div>
+    `;
+    chatBox.appendChild(typingDiv);
+    chatBox.scrollTop = chatBox.scrollHeight;
+}
+function removeTypingIndicator() {
+    const indicator = document.getElementById('typing-indicator');
+    if (indicator) indicator.remove();
+}
+async function sendMessage() {
+    const input = document.getElementById('user-input');
+    const message = input.value.trim();
+    if (!message) return;
+    appendMessage(message, 'user');
+    input.value = '';
+    showTypingIndicator();
+    try {
+        const response = await fetch("/chat/", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({
+                message: message,
+                session_id: sessionId,
+                format: "cards"
+            })
+        });
+        const data = await response.json();
+        removeTypingIndicator();
+        appendMessage(data.reply, 'bot', data.cards);
+        if (data.session_id && data.session_id !== sessionId) {
+            sessionId = data.session_id;
+            sessionStorage.setItem('lagenda-session', sessionId);
+        }
+    } catch (e) {
+        removeTypingIndicator();
+        appendMessage("Désolé, j'ai un problème de connexion. Réessayez plus tard.", 'bot');
+        console.error(e);
+    }
+}
+function quickMsg(text) {
+    document.getElementById('user-input').value = text;
+    sendMessage();
+}
+function clearChat() {
+    document.getElementById('confirm-modal').style.display = 'block';
+}
+function confirmClear(confirmed) {
+    document.getElementById('confirm-modal').style.display = 'none';
+    if (confirmed) {
+        document.getElementById('chat').innerHTML = `
+<div class="message bot-message">
+<div class="message-avatar"><i class="fas fa-robot"></i></div>
+<div class="message-content">Historique effacé. Comment puis-je vous aider à nouveau ?</div>
+</div>`;
+        hiddenMessages = [];
+        sessionId = newSessionId();
+        sessionStorage.setItem('lagenda-session', sessionId);
+    }
+}
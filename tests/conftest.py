@@ -0,0 +1,10 @@
+# tests/conftest.py
+"""
+Configuration commune des tests : limitation de débit, sessions et catalogue en
+mémoire du processus (les stockages partagés par défaut survivraient d'une exécution à l'autre).
+"""
+import os
+
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+os.environ.setdefault("SESSION_BACKEND", "memory")
+os.environ.setdefault("CATALOG_BACKEND", "memory")
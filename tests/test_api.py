@@ -229,6 +229,39 @@ class TestChatEndpoint:
         
         # FastAPI devrait retourner une erreur 422
         assert response.status_code == 422
+    
+    def test_chat_cards_format(self, client, mock_gemini_response, mock_events):
+        """Test du mode cartes : événements structurés, réponse et historique sans Markdown"""
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini, \
+                patch('main.search_events', new_callable=AsyncMock) as mock_search, \
+                patch('services.thumbnails.pillow_available', return_value=True):
+            mock_gemini.return_value = mock_gemini_response
+            mock_search.return_value = mock_events
+            
+            data = client.post("/chat/", json={
+                "message": "Concerts à Cotonou",
+                "format": "cards"
+            }).json()
+        
+        assert data["cards"] == [{
+            "id": "https://lagenda.bj/event/1",
+            "title": "Concert de Jazz",
+            "city": "Cotonou",
+            "venue": "Palais des Congrès",
+            "dates": "20 janvier 2026",
+            "price": "5 000 FCFA",
+            "category": "musique",
+            "image": "/images/poster?w=480&src=https://lagenda.bj/images/1.jpg",
+            "link": "https://lagenda.bj/event/1",
+        }]
+        assert "⭐" not in data["reply"]
+        assert "(1 affichés sur 1 trouvés)" in data["reply"]
+        assert data["history"][-1]["content"] == data["reply"]
+    
+    def test_chat_invalid_format(self, client):
+        """Test format de réponse inconnu"""
+        response = client.post("/chat/", json={"message": "Bonjour", "format": "html"})
+        assert response.status_code == 422
 
 
 class TestRateLimiting:
@@ -256,3 +289,489 @@ class TestRateLimiting:
             # Les headers de rate limit devraient être présents
             # (dépend de la configuration SlowAPI)
             assert response.status_code in [200, 429]
+    
+    def test_chat_limit_and_retry_after(self, client):
+        """Test 11e requête /chat/ dans la minute : 429 avec Retry-After"""
+        app.state.limiter.reset()
+        try:
+            with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+                mock_gemini.return_value = {"intent": "greeting", "filters": {}, "ai_reply": "Bonjour"}
+                statuses = [
+                    client.post("/chat/", json={"message": "Bonjour", "history": []}).status_code
+                    for _ in range(11)
+                ]
+                response = client.post("/chat/", json={"message": "Bonjour", "history": []})
+        finally:
+            app.state.limiter.reset()
+        
+        assert statuses == [200] * 10 + [429]
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+
+
+class TestSpeculativePrefetch:
+    """Tests pour le préchargement du catalogue en parallèle de Gemini"""
+    
+    @pytest.fixture
+    def client(self):
+        """Client de test FastAPI"""
+        return TestClient(app)
+    
+    @pytest.fixture(autouse=True)
+    def reset_limiter(self):
+        """Remise à zéro du rate limit entre les tests"""
+        app.state.limiter.reset()
+        yield
+        app.state.limiter.reset()
+    
+    @pytest.fixture
+    def events(self):
+        """Catalogue simulé"""
+        return [
+            {"title": "Concert à Parakou", "city": "Parakou", "description": "Live",
+             "date_start": datetime(2026, 1, 20), "date_end": datetime(2026, 1, 20)},
+            {"title": "Concert à Cotonou", "city": "Cotonou", "description": "Live",
+             "date_start": datetime(2026, 1, 20), "date_end": datetime(2026, 1, 20)},
+        ]
+    
+    def _search_response(self, city):
+        return {
+            "intent": "search",
+            "filters": {"city": city, "date_start": "2026-01-20", "date_end": "2026-01-20",
+                        "category": None, "search_query": "concert", "is_free": None},
+            "ai_reply": "Je cherche..."
+        }
+    
+    def test_latency_is_max_not_sum(self, client, events):
+        """Test que l'appel IA et le chargement du catalogue se chevauchent"""
+        import asyncio
+        import time
+        
+        async def slow_gemini(*args, **kwargs):
+            await asyncio.sleep(0.3)
+            return self._search_response("Cotonou")
+        
+        async def slow_search():
+            await asyncio.sleep(0.3)
+            return events
+        
+        with patch('main.chat_with_gemini', side_effect=slow_gemini):
+            with patch('main.search_events', side_effect=slow_search):
+                start = time.perf_counter()
+                response = client.post("/chat/", json={"message": "Concerts à Cotonou", "history": []})
+                elapsed = time.perf_counter() - start
+        
+        assert response.status_code == 200
+        assert "COTONOU" in response.json()["reply"]
+        assert elapsed < 0.55
+    
+    def test_prefilter_ignored_when_city_differs(self, client, events):
+        """Test que le pré-filtre local est ignoré si Gemini retient une autre ville"""
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+            with patch('main.search_events', new_callable=AsyncMock) as mock_search:
+                # L'analyse locale voit "Cotonou", Gemini corrige en "Parakou"
+                mock_gemini.return_value = self._search_response("Parakou")
+                mock_search.return_value = events
+                
+                response = client.post("/chat/", json={"message": "Cotonou ? non, plutôt là-bas", "history": []})
+        
+        reply = response.json()["reply"]
+        assert "PARAKOU" in reply
+        assert "1 affichés sur 1" in reply
+    
+    def test_prefetch_cancelled_on_chat_intent(self, client, events):
+        """Test que le préchargement est annulé si l'intention n'est pas une recherche"""
+        import asyncio
+        tasks = []
+        real_create_task = asyncio.create_task
+        
+        def capture_task(coro):
+            task = real_create_task(coro)
+            tasks.append(task)
+            return task
+        
+        async def slow_search():
+            await asyncio.sleep(5)
+            return events
+        
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+            with patch('main.search_events', side_effect=slow_search):
+                with patch('main.asyncio.create_task', side_effect=capture_task):
+                    mock_gemini.return_value = {"intent": "chat", "filters": {}, "ai_reply": "Bonjour !"}
+                    response = client.post("/chat/", json={"message": "Bonjour", "history": []})
+        
+        assert response.status_code == 200
+        assert len(tasks) == 1
+        assert tasks[0].cancelled() or tasks[0].cancelling()
+
+
+class TestConversationStateEndpoint:
+    """Tests pour l'état compact de conversation dans /chat/"""
+    
+    @pytest.fixture
+    def client(self):
+        """Client de test FastAPI"""
+        return TestClient(app)
+    
+    @pytest.fixture(autouse=True)
+    def reset_limiter(self):
+        """Remise à zéro du rate limit entre les tests"""
+        app.state.limiter.reset()
+        yield
+        app.state.limiter.reset()
+    
+    def test_state_returned_and_forwarded(self, client):
+        """Test que l'état est renvoyé puis transmis au LLM au tour suivant"""
+        events = [{"id": 7, "title": "Concert", "city": "Cotonou", "description": "",
+                   "date_start": datetime(2026, 1, 20), "date_end": datetime(2026, 1, 20)}]
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+            with patch('main.search_events', new_callable=AsyncMock) as mock_search:
+                mock_gemini.return_value = {
+                    "intent": "search",
+                    "filters": {"city": "Cotonou", "date_start": "2026-01-20", "date_end": None},
+                    "ai_reply": "Voici"
+                }
+                mock_search.return_value = events
+                
+                first = client.post("/chat/", json={"message": "Concerts à Cotonou", "history": []}).json()
+                assert first["state"]["last_filters"] == {"city": "Cotonou", "date_start": "2026-01-20"}
+                assert first["state"]["last_event_ids"] == ["7"]
+                
+                seen = []
+                mock_gemini.side_effect = lambda message, state=None: seen.append(state.to_dict()) or {
+                    "intent": "chat", "filters": {}, "ai_reply": "ok"
+                }
+                second = client.post("/chat/", json={"message": "et à Parakou ?", "state": first["state"]}).json()
+                assert seen[0]["last_filters"]["city"] == "Cotonou"
+                assert seen[0]["turns"] == ["Concerts à Cotonou"]
+                assert second["state"]["turns"] == ["Concerts à Cotonou", "et à Parakou ?"]
+
+
+class TestSessionMode:
+    """Tests pour le mode session de /chat/ (historique côté serveur)"""
+    
+    @pytest.fixture
+    def client(self):
+        """Client de test FastAPI"""
+        return TestClient(app)
+    
+    @pytest.fixture(autouse=True)
+    def reset_limiter(self):
+        """Remise à zéro du rate limit entre les tests"""
+        app.state.limiter.reset()
+        yield
+        app.state.limiter.reset()
+    
+    def test_session_returns_only_new_turn(self, client):
+        """Test que la réponse ne contient que le nouveau tour"""
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+            mock_gemini.return_value = {"intent": "chat", "filters": {}, "ai_reply": "Bonjour !"}
+            data = client.post("/chat/", json={"message": "Salut", "session_id": "session-abcdef"}).json()
+        
+        assert data == {"reply": "Bonjour !", "session_id": "session-abcdef"}
+    
+    def test_session_keeps_state_server_side(self, client):
+        """Test que l'état de la conversation est conservé par le serveur"""
+        seen = []
+        
+        def fake_gemini(message, state=None):
+            seen.append(state.to_dict())
+            return {"intent": "search", "filters": {"city": "Cotonou"}, "ai_reply": "Voici"}
+        
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+            with patch('main.search_events', new_callable=AsyncMock) as mock_search:
+                mock_gemini.side_effect = fake_gemini
+                mock_search.return_value = []
+                client.post("/chat/", json={"message": "Concerts à Cotonou", "session_id": "session-123456"})
+                client.post("/chat/", json={"message": "et à Parakou ?", "session_id": "session-123456"})
+        
+        assert seen[0]["turns"] == []
+        assert seen[1]["turns"] == ["Concerts à Cotonou"]
+        assert seen[1]["last_filters"] == {"city": "Cotonou"}
+    
+    def test_sessions_are_isolated(self, client):
+        """Test que deux sessions ne partagent rien"""
+        seen = []
+        
+        def fake_gemini(message, state=None):
+            seen.append(state.turns)
+            return {"intent": "chat", "filters": {}, "ai_reply": "ok"}
+        
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+            mock_gemini.side_effect = fake_gemini
+            client.post("/chat/", json={"message": "A", "session_id": "session-aaaaaa"})
+            client.post("/chat/", json={"message": "B", "session_id": "session-bbbbbb"})
+        
+        assert seen == [[], []]
+    
+    def test_invalid_session_id_replaced(self, client):
+        """Test qu'un identifiant invalide est remplacé par un nouveau"""
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+            mock_gemini.return_value = {"intent": "chat", "filters": {}, "ai_reply": "ok"}
+            data = client.post("/chat/", json={"message": "Salut", "session_id": "x"}).json()
+        
+        assert data["session_id"] != "x"
+        assert len(data["session_id"]) >= 8
+
+
+class TestMetricsEndpoint:
+    """Tests pour l'endpoint GET /metrics"""
+    
+    @pytest.fixture
+    def client(self):
+        """Client de test FastAPI"""
+        return TestClient(app)
+    
+    @pytest.fixture(autouse=True)
+    def reset_state(self):
+        """Remise à zéro du rate limit et des métriques"""
+        from services import metrics
+        app.state.limiter.reset()
+        metrics.reset()
+        yield
+        app.state.limiter.reset()
+        metrics.reset()
+    
+    def test_stage_histograms_after_search(self, client):
+        """Test histogrammes par étape, intention et nombre de résultats"""
+        events = [
+            {"id": i, "title": f"Concert {i}", "city": "Cotonou", "description": "Live",
+             "date_start": datetime(2026, 1, 20), "date_end": datetime(2026, 1, 20),
+             "is_free": False, "price": 5000, "link": f"https://lagenda.bj/e/{i}"}
+            for i in range(8)
+        ]
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+            with patch('main.search_events', new_callable=AsyncMock) as mock_search:
+                mock_gemini.return_value = {
+                    "intent": "search",
+                    "filters": {"city": "Cotonou", "date_start": "2026-01-20"},
+                    "ai_reply": "Voici",
+                }
+                mock_search.return_value = events
+                chat_response = client.post("/chat/", json={"message": "Concerts à Cotonou", "history": []})
+        
+        assert "llm;dur=" in chat_response.headers["server-timing"]
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        for stage in ("llm", "fetch", "filter", "format"):
+            assert f'chat_stage_seconds_count{{stage="{stage}"}} 1' in text
+        assert 'chat_intents_total{intent="search"} 1' in text
+        assert "chat_results_matched_sum 8" in text
+        assert "chat_results_returned_sum 5" in text
+        assert "# TYPE catalog_events gauge" in text
+    
+    def test_greeting_skips_search_stages(self, client):
+        """Test qu'une salutation ne mesure que l'étape LLM"""
+        with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+            with patch('main.search_events', new_callable=AsyncMock):
+                mock_gemini.return_value = {"intent": "greeting", "filters": {}, "ai_reply": "Bonjour"}
+                client.post("/chat/", json={"message": "Bonjour", "history": []})
+        
+        text = client.get("/metrics").text
+        assert 'chat_stage_seconds_count{stage="llm"} 1' in text
+        assert 'stage="filter"' not in text
+        assert 'chat_intents_total{intent="greeting"} 1' in text
+
+
+class TestEventsSearchEndpoint:
+    """Tests pour l'endpoint GET /events/search"""
+    
+    @pytest.fixture
+    def client(self):
+        """Client de test FastAPI"""
+        return TestClient(app)
+    
+    @pytest.fixture(autouse=True)
+    def reset_limiter(self):
+        """Remise à zéro du rate limit entre les tests"""
+        app.state.limiter.reset()
+        yield
+        app.state.limiter.reset()
+    
+    @pytest.fixture
+    def snapshot(self):
+        """Instantané de catalogue simulé"""
+        from services.tools import build_snapshot
+        events = [
+            {"id": i, "title": f"Concert {i}", "city": "Cotonou" if i % 2 else "Parakou",
+             "description": "Live", "date_start": datetime(2026, 1, 20), "date_end": datetime(2026, 1, 20),
+             "is_free": i % 3 == 0, "price": 0 if i % 3 == 0 else 5000, "link": f"https://lagenda.bj/e/{i}"}
+            for i in range(1, 31)
+        ]
+        return build_snapshot(events)
+    
+    def test_search_without_llm(self, client, snapshot):
+        """Test recherche filtrée, sans appel à Gemini"""
+        with patch('main.get_snapshot', new_callable=AsyncMock) as mock_snapshot:
+            with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+                mock_snapshot.return_value = snapshot
+                response = client.get("/events/search", params={"city": "Cotonou", "date_start": "2026-01-20"})
+        
+        assert response.status_code == 200
+        mock_gemini.assert_not_called()
+        data = response.json()
+        assert data["total"] == 15
+        assert data["version"] == snapshot.version
+        assert all(item["city"] == "Cotonou" for item in data["results"])
+        assert data["results"][0]["date_start"] == "2026-01-20T00:00:00"
+    
+    def test_pagination_and_fields(self, client, snapshot):
+        """Test pagination et sélection de champs"""
+        with patch('main.get_snapshot', new_callable=AsyncMock) as mock_snapshot:
+            mock_snapshot.return_value = snapshot
+            data = client.get("/events/search", params={"page": 2, "page_size": 10, "fields": "id,title"}).json()
+        
+        assert data["total"] == 30
+        assert data["page"] == 2
+        assert len(data["results"]) == 10
+        assert set(data["results"][0]) == {"id", "title"}
+    
+    def test_etag_304(self, client, snapshot):
+        """Test réponse 304 tant que le catalogue ne change pas"""
+        from services.tools import build_snapshot
+        with patch('main.get_snapshot', new_callable=AsyncMock) as mock_snapshot:
+            mock_snapshot.return_value = snapshot
+            first = client.get("/events/search", params={"city": "Cotonou"})
+            etag = first.headers["etag"]
+            second = client.get("/events/search", params={"city": "Cotonou"}, headers={"If-None-Match": etag})
+            
+            # Nouvel instantané : l'ETag change, la réponse complète revient
+            mock_snapshot.return_value = build_snapshot(snapshot.events[:5])
+            third = client.get("/events/search", params={"city": "Cotonou"}, headers={"If-None-Match": etag})
+        
+        assert second.status_code == 304
+        assert second.content == b""
+        assert third.status_code == 200
+        assert third.headers["etag"] != etag
+    
+    def test_validation(self, client):
+        """Test validation des paramètres"""
+        assert client.get("/events/search", params={"date_start": "20/01/2026"}).status_code == 422
+        assert client.get("/events/search", params={"page_size": 1000}).status_code == 422
+        assert client.get("/events/search", params={"fields": "title,secret"}).status_code == 422
+    
+    def test_higher_rate_limit(self, client, snapshot):
+        """Test que la limite dépasse largement celle de /chat/"""
+        with patch('main.get_snapshot', new_callable=AsyncMock) as mock_snapshot:
+            mock_snapshot.return_value = snapshot
+            statuses = [client.get("/events/search").status_code for _ in range(30)]
+        assert statuses == [200] * 30
+
+
+class TestChatBatchEndpoint:
+    """Tests pour l'endpoint POST /chat/batch"""
+    
+    @pytest.fixture
+    def client(self):
+        """Client de test FastAPI"""
+        return TestClient(app)
+    
+    @pytest.fixture(autouse=True)
+    def reset_limiter(self):
+        """Remise à zéro du rate limit entre les tests"""
+        app.state.limiter.reset()
+        yield
+        app.state.limiter.reset()
+    
+    @pytest.fixture
+    def snapshot(self):
+        """Instantané de catalogue simulé"""
+        from services.tools import build_snapshot
+        return build_snapshot([
+            {"id": 1, "title": "Concert Jazz", "city": "Cotonou", "description": "Live",
+             "date_start": datetime(2026, 1, 20), "date_end": datetime(2026, 1, 20),
+             "is_free": False, "price": 5000, "link": "https://lagenda.bj/e/1"},
+        ])
+    
+    @staticmethod
+    def fake_gemini(message, state=None):
+        """Réponse IA simulée : 'boom' échoue, 'salut' est une salutation"""
+        if message == "boom":
+            raise RuntimeError("erreur")
+        if message == "salut":
+            return {"intent": "greeting", "filters": {}, "ai_reply": "Bonjour !"}
+        return {"intent": "search", "filters": {"city": "Cotonou", "date_start": "2026-01-20"}, "ai_reply": "Voici"}
+    
+    def test_results_in_order_with_item_errors(self, client, snapshot):
+        """Test ordre d'entrée conservé et erreur isolée par élément"""
+        with patch('main.get_snapshot', new_callable=AsyncMock) as mock_snapshot:
+            with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+                mock_snapshot.return_value = snapshot
+                mock_gemini.side_effect = self.fake_gemini
+                response = client.post("/chat/batch", json={"messages": ["concert", "boom", "salut"]})
+        
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert results[0]["intent"] == "search" and results[0]["total"] == 1
+        assert "error" in results[1]
+        assert results[2]["reply"] == "Bonjour !"
+    
+    def test_single_snapshot_fetch(self, client, snapshot):
+        """Test que toutes les recherches du lot partagent un seul instantané"""
+        with patch('main.get_snapshot', new_callable=AsyncMock) as mock_snapshot:
+            with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+                mock_snapshot.return_value = snapshot
+                mock_gemini.side_effect = self.fake_gemini
+                response = client.post("/chat/batch", json={"messages": ["a", "b", "c", "d"]})
+        
+        assert response.status_code == 200
+        assert mock_snapshot.await_count == 1
+        assert mock_gemini.await_count == 4
+    
+    def test_bounded_concurrency(self, client, snapshot):
+        """Test que les extractions simultanées restent sous BATCH_CONCURRENCY"""
+        import asyncio
+        active = {"now": 0, "max": 0}
+        
+        async def slow_gemini(message, state=None):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            return {"intent": "greeting", "filters": {}, "ai_reply": "ok"}
+        
+        with patch('main.BATCH_CONCURRENCY', 2):
+            with patch('main.get_snapshot', new_callable=AsyncMock) as mock_snapshot:
+                with patch('main.chat_with_gemini', side_effect=slow_gemini):
+                    mock_snapshot.return_value = snapshot
+                    response = client.post("/chat/batch", json={"messages": ["x"] * 6})
+        
+        assert response.status_code == 200
+        assert len(response.json()["results"]) == 6
+        assert active["max"] == 2
+    
+    def test_stream_ndjson(self, client, snapshot):
+        """Test du mode flux : une ligne JSON par message, dans l'ordre"""
+        import json
+        with patch('main.get_snapshot', new_callable=AsyncMock) as mock_snapshot:
+            with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+                mock_snapshot.return_value = snapshot
+                mock_gemini.side_effect = self.fake_gemini
+                response = client.post("/chat/batch", json={"messages": ["salut", "boom", "concert"], "stream": True})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["index"] for line in lines] == [0, 1, 2]
+        assert "error" in lines[1]
+    
+    def test_batch_limits(self, client):
+        """Test lot vide ou trop grand refusé"""
+        assert client.post("/chat/batch", json={"messages": []}).status_code == 422
+        too_many = ["x"] * 11
+        assert client.post("/chat/batch", json={"messages": too_many}).status_code == 422
+    
+    def test_shares_chat_rate_limit(self, client, snapshot):
+        """Test un jeton de la limite de /chat/ par message : le lot ne la contourne pas"""
+        with patch('main.get_snapshot', new_callable=AsyncMock) as mock_snapshot:
+            with patch('main.chat_with_gemini', new_callable=AsyncMock) as mock_gemini:
+                mock_snapshot.return_value = snapshot
+                mock_gemini.side_effect = self.fake_gemini
+                assert client.post("/chat/batch", json={"messages": ["salut"] * 8}).status_code == 200
+                assert client.post("/chat/batch", json={"messages": ["salut"] * 3}).status_code == 429
+                statuses = [client.post("/chat/", json={"message": "salut"}).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        assert mock_gemini.await_count == 10
@@ -0,0 +1,76 @@
+# tests/test_assets.py
+"""
+Tests unitaires pour le module assets.py
+"""
+import gzip
+import pytest
+from fastapi.testclient import TestClient
+
+from services.assets import AssetManifest, IMMUTABLE, fingerprint, make_payload
+
+
+class TestAssetManifest:
+    """Tests pour AssetManifest"""
+    
+    def test_fingerprint_follows_content(self, tmp_path):
+        """Test que le nom empreinté change avec le contenu, pas autrement"""
+        assert fingerprint("chat.css", b"a") == fingerprint("chat.css", b"a")
+        assert fingerprint("chat.css", b"a") != fingerprint("chat.css", b"b")
+        assert fingerprint("chat.css", b"a").startswith("chat.") and fingerprint("chat.css", b"a").endswith(".css")
+    
+    def test_load_directory(self, tmp_path):
+        """Test chargement, URL empreintée et type de contenu"""
+        (tmp_path / "js").mkdir()
+        (tmp_path / "js" / "app.js").write_text("console.log('ok');" * 50)
+        manifest = AssetManifest(tmp_path)
+        url = manifest.url("js/app.js")
+        assert url.startswith("/static/js/app.") and url.endswith(".js")
+        payload = manifest.get(url.removeprefix("/static/"))
+        assert payload.media_type == "text/javascript; charset=utf-8"
+        with pytest.raises(KeyError):
+            manifest.url("absent.css")
+    
+    def test_precompressed(self):
+        """Test variante gzip calculée au chargement et choisie selon Accept-Encoding"""
+        body = b"body { color: red; }\n" * 100
+        payload = make_payload(body, "text/css")
+        assert gzip.decompress(payload.variants["gzip"]) == body
+        assert payload.select("gzip")[1] == "gzip"
+        assert payload.select("identity") == (body, None)
+    
+    def test_small_file_not_compressed(self):
+        """Test pas de variante pour un petit fichier"""
+        assert make_payload(b"x", "text/plain").variants == {}
+
+
+class TestStaticEndpoints:
+    """Tests pour GET / et GET /static/..."""
+    
+    @pytest.fixture
+    def client(self):
+        from main import app
+        return TestClient(app)
+    
+    def test_home_references_fingerprinted_assets(self, client):
+        """Test que la page référence les fichiers empreintés, servis immuables"""
+        from main import static_assets
+        html = client.get("/").text
+        for name in ("chat.css", "chat.js"):
+            url = static_assets.url(name)
+            assert url in html
+            response = client.get(url, headers={"Accept-Encoding": "gzip"})
+            assert response.status_code == 200
+            assert response.headers["cache-control"] == IMMUTABLE
+            assert response.headers["content-encoding"] == "gzip"
+    
+    def test_home_etag(self, client):
+        """Test qu'une visite répétée avec If-None-Match coûte un 304 sans corps"""
+        first = client.get("/")
+        assert first.headers["cache-control"] == "no-cache"
+        second = client.get("/", headers={"If-None-Match": first.headers["etag"]})
+        assert second.status_code == 304
+        assert second.content == b""
+    
+    def test_unknown_asset(self, client):
+        """Test fichier ou empreinte inconnus"""
+        assert client.get("/static/chat.0000000000.css").status_code == 404
@@ -0,0 +1,93 @@
+# tests/test_conversation.py
+"""
+Tests unitaires pour le module conversation.py
+"""
+import json
+import pytest
+from services.conversation import (
+    ConversationState,
+    event_id,
+    MAX_TURNS,
+    MAX_TURN_CHARS
+)
+
+
+class TestEventId:
+    """Tests pour la fonction event_id()"""
+    
+    def test_event_id_priority(self):
+        """Test id, puis slug, puis lien"""
+        assert event_id({"id": 12, "slug": "a", "link": "b"}) == "12"
+        assert event_id({"slug": "a", "link": "b"}) == "a"
+        assert event_id({"link": "b"}) == "b"
+        assert event_id({}) is None
+
+
+class TestConversationState:
+    """Tests pour ConversationState"""
+    
+    def test_update_search(self):
+        """Test mise à jour après une recherche"""
+        state = ConversationState()
+        state.update("Concerts à Cotonou", "search",
+                     {"city": "Cotonou", "category": None, "is_free": False},
+                     [{"id": 1}, {"id": 2}])
+        assert state.last_filters == {"city": "Cotonou", "is_free": False}
+        assert state.last_event_ids == ["1", "2"]
+        assert state.turns == ["Concerts à Cotonou"]
+    
+    def test_update_chat_keeps_filters(self):
+        """Test qu'un tour de discussion garde les derniers filtres"""
+        state = ConversationState(last_filters={"city": "Cotonou"})
+        state.update("Merci", "chat", {}, [])
+        assert state.last_filters == {"city": "Cotonou"}
+    
+    def test_turns_bounded(self):
+        """Test que l'état reste borné"""
+        state = ConversationState()
+        for i in range(20):
+            state.update("x" * 1000 + str(i))
+        assert len(state.turns) == MAX_TURNS
+        assert all(len(t) <= MAX_TURN_CHARS for t in state.turns)
+    
+    def test_roundtrip(self):
+        """Test sérialisation aller-retour"""
+        state = ConversationState({"city": "Cotonou"}, ["1"], ["Concerts"])
+        assert ConversationState.from_dict(state.to_dict()) == state
+    
+    def test_from_dict_sanitizes(self):
+        """Test que les données client inattendues sont ignorées"""
+        state = ConversationState.from_dict({
+            "last_filters": {"city": "Cotonou", "evil": "x" * 10000, "is_free": [1, 2]},
+            "last_event_ids": "pas une liste",
+            "turns": ["a"] * 50
+        })
+        assert state.last_filters == {"city": "Cotonou"}
+        assert state.last_event_ids == []
+        assert len(state.turns) == MAX_TURNS
+        assert ConversationState.from_dict(None) == ConversationState()
+    
+    def test_from_history_drops_replies(self):
+        """Test que l'historique legacy ne garde que les messages utilisateur"""
+        history = [
+            {"role": "user", "content": "Concerts à Cotonou"},
+            {"role": "assistant", "content": "⭐ **[CONCERT]** ..." * 100},
+        ]
+        state = ConversationState.from_history(history)
+        assert state.turns == ["Concerts à Cotonou"]
+    
+    def test_prompt_size_bounded(self):
+        """Test que le prompt ne grandit pas avec la conversation"""
+        state = ConversationState()
+        sizes = []
+        for i in range(30):
+            state.update(f"Message numéro {i} " * 20, "search",
+                         {"city": "Cotonou"}, [{"id": n} for n in range(50)])
+            sizes.append(len(state.to_prompt()))
+        assert max(sizes) == sizes[-1] <= 1000
+        payload = json.loads(state.to_prompt())
+        assert payload["derniers_filtres"] == {"city": "Cotonou"}
+    
+    def test_prompt_empty(self):
+        """Test état vide"""
+        assert ConversationState().to_prompt() == "aucun"
@@ -9,7 +9,9 @@ from services.filters import (
     get_synonyms, 
     fuzzy_match, 
     detect_category, 
-    filter_events
+    filter_events,
+    index_text,
+    prefilter_by_city
 )
 
 
@@ -265,3 +267,40 @@ class TestFilterEventsEdgeCases:
         result = filter_events(events, {"city": "Calavi"})
         # Devrait trouver grâce au fuzzy matching
         assert len(result) >= 0  # Dépend du seuil de fuzzy matching
+
+
+class TestPrefilterByCity:
+    """Tests pour la fonction prefilter_by_city()"""
+    
+    @pytest.fixture
+    def events(self):
+        """Événements de test"""
+        return [
+            {"title": "A", "city": "Cotonou", "description": "", "date_start": datetime(2026, 1, 20)},
+            {"title": "B", "city": "Abomey-Calavi", "description": "", "date_start": datetime(2026, 1, 20)},
+            {"title": "C", "city": "Ouidah", "description": "Navette depuis Cotonou", "date_start": datetime(2026, 1, 20)},
+            {"title": "D", "city": "Parakou", "description": "", "date_start": datetime(2026, 1, 20)},
+        ]
+    
+    def test_prefilter_same_result(self, events):
+        """Test que le pré-filtre ne change pas le résultat de filter_events"""
+        for city in ["Cotonou", "Calavi", "Parakou", "Natitingou"]:
+            filters = {"city": city, "date_start": "2026-01-20"}
+            expected = filter_events(events, filters)
+            assert filter_events(prefilter_by_city(events, city), filters) == expected
+    
+    def test_prefilter_without_city(self, events):
+        """Test sans ville : tous les événements"""
+        assert prefilter_by_city(events, None) == events
+    
+    def test_precomputed_fields(self, events):
+        """Test champs normalisés à l'ingestion : mêmes résultats, texte brut non relu"""
+        indexed = [index_text(dict(e)) for e in events]
+        for e in indexed:
+            e["description"] = e["city"] = None  # Seuls les champs précalculés comptent
+        for city in ["Cotonou", "Calavi", "Natitingou"]:
+            filters = {"city": city, "date_start": "2026-01-20"}
+            assert [e["title"] for e in prefilter_by_city(indexed, city)] == \
+                [e["title"] for e in prefilter_by_city(events, city)]
+            assert [e["title"] for e in filter_events(indexed, filters)] == \
+                [e["title"] for e in filter_events(events, filters)]
@@ -5,39 +5,17 @@ Tests unitaires pour le module formatter.py
 import pytest
 from datetime import datetime
 from services.formatter import (
-    translate_months,
     clean_html,
     format_date_short,
     format_price,
     format_category,
     format_events,
-    month_full,
-    month_abbr
+    event_card,
+    date_label,
+    price_label
 )
 
 
-class TestTranslateMonths:
-    """Tests pour la fonction translate_months()"""
-    
-    def test_translate_full_months(self):
-        """Test traduction mois complets"""
-        assert translate_months("January", month_full) == "Janvier"
-        assert translate_months("February", month_full) == "Février"
-        assert translate_months("December", month_full) == "Décembre"
-    
-    def test_translate_abbr_months(self):
-        """Test traduction mois abrégés"""
-        assert translate_months("Jan", month_abbr) == "Jan"
-        assert translate_months("Feb", month_abbr) == "Fév"
-        assert translate_months("Aug", month_abbr) == "Aoû"
-    
-    def test_translate_in_sentence(self):
-        """Test traduction dans une phrase"""
-        result = translate_months("20 January 2026", month_full)
-        assert "Janvier" in result
-        assert "January" not in result
-
-
 class TestCleanHtml:
     """Tests pour la fonction clean_html()"""
     
@@ -62,9 +40,56 @@ class TestCleanHtml:
         assert clean_html(None) == ""
     
     def test_clean_whitespace(self):
-        """Test nettoyage espaces"""
+        """Test nettoyage espaces (normalisés en un seul espace)"""
         result = clean_html("  Hello  World  ")
-        assert result == "Hello  World"
+        assert result == "Hello World"
+        assert clean_html("Ligne 1\r\n\tLigne 2") == "Ligne 1 Ligne 2"
+    
+    def test_clean_all_entities(self):
+        """Test décodage de toutes les entités, nommées et numériques"""
+        assert clean_html("Caf&eacute; l&#39;&eacute;t&eacute; &#x2013; &lt;gratuit&gt;") == "Café l'été – &lt;gratuit&gt;"
+
+    def test_encoded_markup_stays_escaped(self):
+        """Test qu'une balise encodée en entités ne redevient pas du HTML actif"""
+        assert clean_html("Prix &lt;img src=x onerror=alert(1)&gt; ok") == "Prix &lt;img src=x onerror=alert(1)&gt; ok"
+        assert clean_html("<p>Voir &amp;lt;script&amp;gt;</p>") == "Voir &lt;script&gt;"
+        # Balise non fermée : la suite de la réponse (<br>…) ne peut pas la compléter
+        assert "<" not in clean_html("Entrée <img src=x onerror=alert(1)")
+    
+    def test_block_tags_separate_words(self):
+        """Test que les balises de bloc séparent les mots, pas les balises de texte"""
+        assert clean_html("<p>Un</p><p>Deux</p><br/>Trois") == "Un Deux Trois"
+        assert clean_html("Bén<strong>in</strong><!-- note -->") == "Bénin"
+
+
+class TestExcerpt:
+    """Tests pour excerpt() et event_summary()"""
+    
+    def test_short_text_unchanged(self):
+        """Test texte court conservé"""
+        from services.formatter import excerpt
+        assert excerpt("Soirée jazz") == "Soirée jazz"
+    
+    def test_cut_at_word_boundary(self):
+        """Test coupure entre deux mots, 120 caractères au plus"""
+        from services.formatter import excerpt
+        text = "Rejoignez-nous pour une soirée inoubliable, " * 5
+        result = excerpt(text)
+        assert len(result) <= 120
+        assert result.endswith("...")
+        assert text.startswith(result[:-3])
+        assert text[len(result) - 3] in " ,"
+    
+    def test_long_word(self):
+        """Test mot démesuré (URL) coupé net"""
+        from services.formatter import excerpt
+        assert excerpt("x" * 200) == "x" * 117 + "..."
+    
+    def test_summary_from_ingest(self):
+        """Test que l'extrait calculé à l'ingestion est utilisé tel quel"""
+        from services.formatter import event_summary
+        assert event_summary({"summary": "Déjà prêt", "description": "<p>Autre</p>"}) == "Déjà prêt"
+        assert event_summary({"description": "<p>Autre</p>"}) == "Autre"
 
 
 class TestFormatDateShort:
@@ -190,6 +215,13 @@ class TestFormatEvents:
         assert "CONCERT DE JAZZ" in result
         assert "FESTIVAL VODOUN" in result
         assert "---" in result  # Séparateur
+
+    def test_encoded_markup_in_description(self, sample_event):
+        """Test qu'une description piégée reste inerte dans la réponse Markdown"""
+        sample_event["description"] = "Entrée &lt;img src=x onerror=alert(1)&gt; libre"
+        result = format_events([sample_event])
+        assert "<img" not in result
+        assert "&lt;img src=x onerror=alert(1)&gt;" in result
     
     def test_format_empty_list(self):
         """Test liste vide"""
@@ -224,3 +256,134 @@ class TestFormatEvents:
         """Test présence d'emojis"""
         result = format_events([sample_event])
         assert "⭐" in result or "📍" in result or "📅" in result
+
+
+class TestRenderCache:
+    """Tests du cache de rendu des blocs (cached_block)"""
+    
+    def setup_method(self):
+        from services.formatter import render_cache
+        render_cache.clear()
+    
+    def test_hit_for_same_revision(self):
+        """Test qu'un événement déjà rendu est servi depuis le cache"""
+        from unittest.mock import Mock
+        from services.formatter import cached_block, render_event
+        event = {"id": 1, "title": "Concert", "_rev": "r1"}
+        render = Mock(side_effect=render_event)
+        first, hit_first = cached_block(event, render=render)
+        second, hit_second = cached_block(event, render=render)
+        assert first == second
+        assert (hit_first, hit_second) == (False, True)
+        render.assert_called_once()
+    
+    def test_new_revision_rerenders(self):
+        """Test qu'une nouvelle révision de l'événement est rendue à nouveau"""
+        from services.formatter import cached_block
+        cached_block({"id": 1, "title": "Concert", "_rev": "r1"})
+        block, hit = cached_block({"id": 1, "title": "Festival", "_rev": "r2"})
+        assert not hit
+        assert "FESTIVAL" in block
+    
+    def test_without_revision_not_cached(self):
+        """Test qu'un événement sans révision n'est jamais mis en cache"""
+        from services.formatter import cached_block, render_cache
+        event = {"id": 1, "title": "Concert"}
+        cached_block(event)
+        assert cached_block(event)[1] is False
+        assert len(render_cache) == 0
+    
+    def test_same_output_as_uncached(self):
+        """Test que le rendu en cache est identique au rendu direct"""
+        event = {
+            "id": 7, "title": "Concert Jazz", "city": "Cotonou", "venue_name": "Institut Français",
+            "date_start": datetime(2026, 3, 15, 20, 0), "date_end": datetime(2026, 3, 15, 23, 0),
+            "category": "Musique", "price": 5000, "is_free": False, "image": "https://example.com/a.jpg",
+            "description": "<p>Soirée jazz</p>", "link": "https://lagenda.bj/e/7",
+        }
+        expected = format_events([event])
+        cached = dict(event, _rev="abc")
+        assert format_events([cached]) == expected
+        assert format_events([cached]) == expected
+
+
+class TestEventCard:
+    """Tests pour event_card() et les libellés sans emoji"""
+    
+    def test_labels_match_markdown(self):
+        """Test que les libellés des cartes sont ceux du rendu Markdown, sans emoji"""
+        start, end = datetime(2026, 3, 10), datetime(2026, 3, 12)
+        assert format_date_short(start, end) == f"📅 {date_label(start, end)}"
+        assert price_label({"price": 15000}) == "15 000 FCFA"
+        assert price_label({"is_free": True}) == "Gratuit"
+        assert price_label({"price": 0}) == ""
+    
+    def test_empty_fields_omitted(self):
+        """Test que les champs vides sont omis et les valeurs par défaut appliquées"""
+        card = event_card({"id": 3, "title": "Atelier", "city": "Ouidah", "venue_name": "Ouidah"})
+        assert card == {
+            "id": "3", "title": "Atelier", "city": "Ouidah",
+            "dates": "Date à confirmer", "link": "https://lagenda.bj",
+        }
+
+
+class TestCompiledLabels:
+    """Tests des libellés de dates et de prix calculés par tables"""
+    
+    @pytest.fixture
+    def fr_locale(self):
+        """Locale fr_FR.UTF-8 le temps du test (ignoré si l'hôte ne l'a pas)"""
+        import locale
+        saved = locale.setlocale(locale.LC_TIME)
+        try:
+            locale.setlocale(locale.LC_TIME, "fr_FR.UTF-8")
+        except locale.Error:
+            pytest.skip("locale fr_FR.UTF-8 absente")
+        yield
+        locale.setlocale(locale.LC_TIME, saved)
+    
+    def test_identical_to_strftime_fr(self, fr_locale):
+        """Test sortie identique à strftime sous fr_FR (ancienne sortie en production) sur deux ans de dates"""
+        from datetime import timedelta
+        day = datetime(2026, 1, 1)
+        for _ in range(730):
+            for end in (day, day + timedelta(days=3), day + timedelta(days=45)):
+                if day.date() == end.date():
+                    expected = day.strftime('%d %B %Y')
+                else:
+                    expected = f"Du {day.strftime('%d %b')} au {end.strftime('%d %b %Y')}"
+                assert date_label(day, end) == expected
+            day += timedelta(days=1)
+    
+    def test_french_months(self):
+        """Test des douze mois, complets et abrégés, quelle que soit la locale de l'hôte"""
+        full = [date_label(datetime(2026, m, 15), None) for m in range(1, 13)]
+        assert full == [
+            "15 janvier 2026", "15 février 2026", "15 mars 2026", "15 avril 2026",
+            "15 mai 2026", "15 juin 2026", "15 juillet 2026", "15 août 2026",
+            "15 septembre 2026", "15 octobre 2026", "15 novembre 2026", "15 décembre 2026",
+        ]
+        ranges = [date_label(datetime(2026, m, 1), datetime(2026, m, 2)) for m in range(1, 13)]
+        assert ranges == [
+            "Du 01 janv. au 02 janv. 2026", "Du 01 févr. au 02 févr. 2026",
+            "Du 01 mars au 02 mars 2026", "Du 01 avr. au 02 avr. 2026",
+            "Du 01 mai au 02 mai 2026", "Du 01 juin au 02 juin 2026",
+            "Du 01 juil. au 02 juil. 2026", "Du 01 août au 02 août 2026",
+            "Du 01 sept. au 02 sept. 2026", "Du 01 oct. au 02 oct. 2026",
+            "Du 01 nov. au 02 nov. 2026", "Du 01 déc. au 02 déc. 2026",
+        ]
+        assert date_label(datetime(2026, 2, 10), datetime(2026, 3, 12)) == "Du 10 févr. au 12 mars 2026"
+    
+    def test_no_strftime(self):
+        """Test que le formatage ne dépend pas de strftime (ni donc de la locale)"""
+        class NoStrftime(datetime):
+            def strftime(self, fmt):
+                raise AssertionError("strftime appelé")
+        assert date_label(NoStrftime(2026, 5, 1), None) == "01 mai 2026"
+        assert date_label(NoStrftime(2026, 12, 30), NoStrftime(2027, 1, 2)) == "Du 30 déc. au 02 janv. 2027"
+    
+    def test_fcfa(self):
+        """Test séparateur de milliers"""
+        from services.formatter import fcfa
+        assert fcfa(500) == "500 FCFA"
+        assert fcfa(1234567) == "1 234 567 FCFA"
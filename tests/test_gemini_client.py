@@ -0,0 +1,82 @@
+# tests/test_gemini_client.py
+"""
+Tests unitaires pour le module gemini_client.py (sans appel réseau)
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from services import metrics
+from services import gemini_client
+from services.conversation import ConversationState
+from services.gemini_client import coalescing_key
+from services.resilience import ResilientCaller
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    """Remise à zéro des métriques"""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestCoalescingKey:
+    """Tests pour la fonction coalescing_key()"""
+
+    def test_key_normalised(self):
+        """Test que casse, accents et espaces n'empêchent pas le partage"""
+        state = ConversationState()
+        assert coalescing_key("Concerts à  Cotonou", state) == coalescing_key("concerts a cotonou ", state)
+
+    def test_key_depends_on_state(self):
+        """Test que le contexte de conversation fait partie de la clé"""
+        other = ConversationState(last_filters={"city": "Parakou"})
+        assert coalescing_key("et demain ?", ConversationState()) != coalescing_key("et demain ?", other)
+
+
+class TestChatWithGeminiCoalescing:
+    """Tests de chat_with_gemini() avec des messages identiques concurrents"""
+
+    def test_identical_messages_one_model_call(self):
+        """Test qu'un pic de messages identiques ne fait qu'un appel au modèle"""
+        calls = []
+
+        async def fake_generate(prompt):
+            calls.append(prompt)
+            await asyncio.sleep(0.05)
+            return {"intent": "search", "filters": {"city": "Cotonou"}, "ai_reply": "Voici"}
+
+        async def run():
+            return await asyncio.gather(*[
+                gemini_client.chat_with_gemini("Concerts à Cotonou") for _ in range(5)
+            ])
+
+        with patch.object(gemini_client, "generate_json", side_effect=fake_generate):
+            with patch.object(gemini_client, "resilience", ResilientCaller("llm", deadline=1)):
+                results = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert all(r["filters"]["city"] == "Cotonou" for r in results)
+        assert metrics.get("llm_coalesced_total") == 4
+
+
+class TestBackendSelection:
+    """Tests du moteur d'extraction interchangeable"""
+
+    def test_chat_with_fake_backend(self):
+        """Test chat_with_gemini() de bout en bout avec le moteur local"""
+        from services.llm_backends import FakeBackend
+
+        backend = FakeBackend()
+        previous = gemini_client.backend
+        gemini_client.set_backend(backend)
+        try:
+            with patch.object(gemini_client, "resilience", ResilientCaller("llm", deadline=1)):
+                result = asyncio.run(gemini_client.chat_with_gemini("Festivals à Ouidah"))
+        finally:
+            gemini_client.set_backend(previous)
+
+        assert backend.calls == 1
+        assert result["filters"]["city"] == "Ouidah"
+        assert metrics.get("llm_fallbacks_total", reason="error") == 0
@@ -0,0 +1,110 @@
+# tests/test_llm_backends.py
+"""
+Tests unitaires pour le module llm_backends.py
+"""
+import asyncio
+import random
+import pytest
+from unittest.mock import patch, MagicMock
+
+from services.llm_backends import (
+    ExtractionBackend,
+    FakeBackend,
+    GeminiBackend,
+    create_backend,
+    parse_latency
+)
+
+
+class TestParseLatency:
+    """Tests pour la fonction parse_latency()"""
+    
+    def test_constant(self):
+        """Test latence constante"""
+        rng = random.Random(0)
+        assert parse_latency("0.2")(rng) == 0.2
+        assert parse_latency("constant:0.3")(rng) == 0.3
+    
+    def test_uniform(self):
+        """Test latence uniforme"""
+        sample = parse_latency("uniform:0.1,0.5")
+        rng = random.Random(0)
+        assert all(0.1 <= sample(rng) <= 0.5 for _ in range(100))
+    
+    def test_normal_never_negative(self):
+        """Test latence normale tronquée à zéro"""
+        sample = parse_latency("normal:0,1")
+        rng = random.Random(0)
+        assert all(sample(rng) >= 0 for _ in range(100))
+    
+    def test_invalid(self):
+        """Test distribution invalide"""
+        with pytest.raises(ValueError):
+            parse_latency("pareto:1")
+        with pytest.raises(ValueError):
+            parse_latency("uniform:abc")
+
+
+class TestFakeBackend:
+    """Tests pour FakeBackend"""
+    
+    def test_is_backend(self):
+        """Test que le moteur fake respecte l'interface"""
+        assert isinstance(FakeBackend(), ExtractionBackend)
+    
+    def test_answers_from_last_user_message(self):
+        """Test réponse issue de l'analyse locale du message"""
+        prompt = "Règles...\n\nContexte de la conversation: aucun\nUtilisateur: Concerts gratuits à Ouidah"
+        result = asyncio.run(FakeBackend().generate_json(prompt))
+        assert result["intent"] == "search"
+        assert result["filters"]["city"] == "Ouidah"
+        assert result["filters"]["is_free"] is True
+    
+    def test_deterministic(self):
+        """Test même graine, mêmes latences et mêmes erreurs"""
+        def draw(seed):
+            backend = FakeBackend("uniform:0,1", error_rate=0.5, seed=seed)
+            return [(backend.latency(backend.rng), backend.rng.random() < 0.5) for _ in range(20)]
+        
+        assert draw(1) == draw(1)
+        assert draw(1) != draw(2)
+    
+    def test_error_injection(self):
+        """Test injection d'erreurs"""
+        backend = FakeBackend(error_rate=1.0)
+        with pytest.raises(RuntimeError):
+            asyncio.run(backend.generate_json("Utilisateur: Bonjour"))
+    
+    def test_latency_injection(self):
+        """Test injection de latence"""
+        import time
+        backend = FakeBackend("0.05")
+        started = time.perf_counter()
+        asyncio.run(backend.generate_json("Utilisateur: Bonjour"))
+        assert time.perf_counter() - started >= 0.05
+
+
+class TestCreateBackend:
+    """Tests pour la fonction create_backend()"""
+    
+    def test_fake_from_env(self, monkeypatch):
+        """Test sélection du moteur fake par configuration"""
+        monkeypatch.setenv("LLM_BACKEND", "fake")
+        monkeypatch.setenv("FAKE_LLM_ERROR_RATE", "0.25")
+        backend = create_backend()
+        assert isinstance(backend, FakeBackend)
+        assert backend.error_rate == 0.25
+    
+    def test_gemini_default(self, monkeypatch):
+        """Test Gemini par défaut, configuré à la création et non à l'import"""
+        monkeypatch.delenv("LLM_BACKEND", raising=False)
+        mock_genai = MagicMock()
+        with patch('services.llm_backends.load_gemini_sdk', return_value=mock_genai):
+            backend = create_backend()
+        assert isinstance(backend, GeminiBackend)
+        mock_genai.configure.assert_called_once()
+    
+    def test_unknown(self):
+        """Test moteur inconnu"""
+        with pytest.raises(ValueError):
+            create_backend("gpt-17")
@@ -0,0 +1,114 @@
+# tests/test_local_parser.py
+"""
+Tests unitaires pour le module local_parser.py
+"""
+import pytest
+from datetime import datetime
+from services.local_parser import (
+    extract_city,
+    extract_dates,
+    extract_filters,
+    fallback_response
+)
+
+
+class TestExtractCity:
+    """Tests pour la fonction extract_city()"""
+    
+    def test_city_basic(self):
+        """Test ville simple"""
+        assert extract_city("Concerts à Cotonou ce soir") == "Cotonou"
+        assert extract_city("et à Parakou ?") == "Parakou"
+    
+    def test_city_accents(self):
+        """Test ville avec ou sans accents"""
+        assert extract_city("Sortir à Kétou") == "Kétou"
+        assert extract_city("sortir a ketou") == "Kétou"
+    
+    def test_city_longest_match(self):
+        """Test que le nom composé l'emporte"""
+        assert extract_city("Festival à Abomey-Calavi") == "Abomey-Calavi"
+        assert extract_city("Festival à Abomey") == "Abomey"
+    
+    def test_city_alias(self):
+        """Test variantes courantes"""
+        assert extract_city("Soirée à Calavi") == "Abomey-Calavi"
+    
+    def test_city_none(self):
+        """Test sans ville"""
+        assert extract_city("Quoi de neuf ?") is None
+        assert extract_city("") is None
+
+
+class TestExtractDates:
+    """Tests pour la fonction extract_dates()"""
+    
+    @pytest.fixture
+    def now(self):
+        """Mercredi 14 janvier 2026"""
+        return datetime(2026, 1, 14, 10, 0)
+    
+    def test_today(self, now):
+        """Test aujourd'hui / ce soir"""
+        assert extract_dates("Quoi faire ce soir ?", now) == ("2026-01-14", "2026-01-14")
+        assert extract_dates("aujourd'hui", now) == ("2026-01-14", "2026-01-14")
+    
+    def test_tomorrow(self, now):
+        """Test demain"""
+        assert extract_dates("Concerts demain", now) == ("2026-01-15", "2026-01-15")
+    
+    def test_weekend(self, now):
+        """Test ce week-end et le week-end prochain"""
+        assert extract_dates("ce week-end", now) == ("2026-01-16", "2026-01-18")
+        assert extract_dates("le week-end prochain", now) == ("2026-01-23", "2026-01-25")
+    
+    def test_no_date(self, now):
+        """Test sans date : événements à venir"""
+        assert extract_dates("Concerts à Cotonou", now) == ("2026-01-14", None)
+
+
+class TestExtractFilters:
+    """Tests pour la fonction extract_filters()"""
+    
+    def test_filters_format(self):
+        """Test que le format correspond à celui de Gemini"""
+        filters = extract_filters("Bonjour")
+        assert set(filters) == {"city", "date_start", "date_end", "category", "search_query", "is_free"}
+    
+    def test_filters_free(self):
+        """Test détection gratuit / payant"""
+        assert extract_filters("concerts gratuits")["is_free"] is True
+        assert extract_filters("entrée libre")["is_free"] is True
+        assert extract_filters("soirée payante")["is_free"] is False
+        assert extract_filters("soirée")["is_free"] is None
+    
+    def test_filters_category(self):
+        """Test détection de catégorie"""
+        assert extract_filters("un concert de jazz")["category"] == "musique"
+
+
+class TestFallbackResponse:
+    """Tests pour la fonction fallback_response()"""
+    
+    def test_fallback_search(self):
+        """Test recherche détectée localement"""
+        result = fallback_response("Concerts à Cotonou demain")
+        assert result["intent"] == "search"
+        assert result["filters"]["city"] == "Cotonou"
+        assert result["ai_reply"]
+    
+    def test_fallback_chat(self):
+        """Test simple discussion"""
+        result = fallback_response("Merci beaucoup")
+        assert result["intent"] == "chat"
+        assert result["filters"] == {}
+    
+    def test_fallback_follow_up(self):
+        """Test suite de conversation : "et à Parakou ?" reprend les filtres précédents"""
+        previous = {"city": "Cotonou", "category": "musique", "date_start": "2026-01-16", "date_end": "2026-01-18"}
+        result = fallback_response("et à Parakou ?", previous_filters=previous)
+        assert result["intent"] == "search"
+        assert result["filters"]["city"] == "Parakou"
+        assert result["filters"]["category"] == "musique"
+        assert result["filters"]["date_start"] == "2026-01-16"
+        assert result["filters"]["date_end"] == "2026-01-18"
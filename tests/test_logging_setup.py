@@ -0,0 +1,165 @@
+# tests/test_logging_setup.py
+"""
+Tests unitaires pour le module logging_setup.py
+"""
+import asyncio
+import io
+import json
+import logging
+import queue
+import pytest
+
+from services import logging_setup
+from services.logging_setup import (
+    DebugSamplingFilter, DeferredQueueHandler, JsonFormatter,
+    RequestContextFilter, RequestIdMiddleware, current_request_id,
+)
+from services.profiling import _timings
+
+
+def make_record(level=logging.INFO, msg="message %s", args=("ok",), **attrs):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(attrs)
+    return record
+
+
+class TestJsonFormatter:
+    """Tests pour JsonFormatter"""
+
+    def test_fields(self):
+        """Test des champs de base, de l'identifiant de requête, des durées et des extras"""
+        record = make_record(request_id="abc", timings_ms={"llm": 12.5}, intent="search")
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "test"
+        assert entry["msg"] == "message ok"
+        assert entry["request_id"] == "abc"
+        assert entry["timings_ms"] == {"llm": 12.5}
+        assert entry["intent"] == "search"
+
+    def test_exception(self):
+        """Test de la trace d'exception"""
+        try:
+            raise ValueError("boum")
+        except ValueError:
+            import sys
+            record = logging.LogRecord("test", logging.ERROR, __file__, 1, "erreur", (), sys.exc_info())
+        entry = json.loads(JsonFormatter().format(record))
+        assert "ValueError: boum" in entry["exc"]
+
+
+class TestRequestContextFilter:
+    """Tests pour RequestContextFilter"""
+
+    def test_captures_context(self):
+        """Test que l'identifiant et les durées de la requête en cours sont copiés"""
+        token_id = logging_setup._request_id.set("req-1")
+        token_timings = _timings.set({"llm": 3.14159})
+        try:
+            record = make_record()
+            RequestContextFilter().filter(record)
+        finally:
+            logging_setup._request_id.reset(token_id)
+            _timings.reset(token_timings)
+        assert record.request_id == "req-1"
+        assert record.timings_ms == {"llm": 3.1}
+
+    def test_outside_request(self):
+        """Test hors requête"""
+        record = make_record()
+        RequestContextFilter().filter(record)
+        assert record.request_id is None
+        assert record.timings_ms is None
+
+
+class TestDebugSamplingFilter:
+    """Tests pour DebugSamplingFilter"""
+
+    def test_info_always_kept(self):
+        """Test que les niveaux au-dessus de DEBUG ne sont jamais échantillonnés"""
+        assert DebugSamplingFilter(0).filter(make_record(logging.INFO, request_id="x"))
+
+    def test_rates(self):
+        """Test des taux 0 et 1"""
+        record = make_record(logging.DEBUG, request_id="x")
+        assert not DebugSamplingFilter(0).filter(record)
+        assert DebugSamplingFilter(1).filter(record)
+
+    def test_whole_request_kept(self):
+        """Test que la décision est la même pour toutes les lignes d'une requête"""
+        sampler = DebugSamplingFilter(0.5)
+        decisions = {rid: sampler.filter(make_record(logging.DEBUG, request_id=rid)) for rid in map(str, range(200))}
+        assert 50 < sum(decisions.values()) < 150
+        assert all(sampler.filter(make_record(logging.DEBUG, request_id=rid)) == kept for rid, kept in decisions.items())
+
+
+class TestDeferredQueueHandler:
+    """Tests pour DeferredQueueHandler"""
+
+    def test_no_formatting_in_caller(self):
+        """Test que le message n'est pas construit dans le thread appelant"""
+        q = queue.SimpleQueue()
+        handler = DeferredQueueHandler(q)
+
+        class Expensive:
+            calls = 0
+            def __str__(self):
+                Expensive.calls += 1
+                return "cher"
+
+        handler.handle(make_record(args=(Expensive(),)))
+        record = q.get_nowait()
+        assert Expensive.calls == 0
+        assert record.getMessage() == "message cher"
+
+
+class TestSetupLogging:
+    """Tests pour setup_logging()"""
+
+    def test_pipeline(self):
+        """Test de bout en bout : file, thread d'écriture, JSON"""
+        root = logging.getLogger()
+        saved = (root.level, list(root.handlers), logging_setup.listener)
+        stream = io.StringIO()
+        logging_setup.listener = None
+        try:
+            logging_setup.setup_logging(level="INFO", fmt="json", debug_sample_rate=0, stream=stream)
+            logging.getLogger("pipeline").info("bonjour %s", "Cotonou")
+            logging.getLogger("pipeline").debug("ignoré")
+            logging_setup.stop_logging()
+        finally:
+            root.handlers[:] = saved[1]
+            root.setLevel(saved[0])
+            logging_setup.listener = saved[2]
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["msg"] == "bonjour Cotonou"
+
+
+class TestRequestIdMiddleware:
+    """Tests pour RequestIdMiddleware"""
+
+    def run(self, headers):
+        seen = {}
+        sent = []
+
+        async def app(scope, receive, send):
+            seen["id"] = current_request_id()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(RequestIdMiddleware(app)({"type": "http", "headers": headers}, None, send))
+        return seen["id"], dict(sent[0]["headers"])[b"x-request-id"].decode()
+
+    def test_propagates_incoming(self):
+        """Test que l'identifiant reçu est repris et renvoyé"""
+        assert self.run([(b"x-request-id", b"abc-123")]) == ("abc-123", "abc-123")
+
+    def test_generates(self):
+        """Test qu'un identifiant est généré si absent ou invalide"""
+        generated, header = self.run([(b"x-request-id", b"a\nb")])
+        assert generated == header
+        assert len(generated) == 16
+        assert current_request_id() is None
@@ -0,0 +1,83 @@
+# tests/test_metrics.py
+"""
+Tests unitaires pour le module metrics.py
+"""
+import pytest
+
+from services import metrics
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    """Remise à zéro des métriques"""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestHistogram:
+    """Tests pour observe() et timer()"""
+    
+    def test_observe(self):
+        """Test nombre et somme des observations"""
+        metrics.observe("stage_seconds", 0.2, stage="llm")
+        metrics.observe("stage_seconds", 0.3, stage="llm")
+        count, total = metrics.get_histogram("stage_seconds", stage="llm")
+        assert count == 2
+        assert total == pytest.approx(0.5)
+        assert metrics.get_histogram("stage_seconds", stage="filter") == (0, 0.0)
+    
+    def test_timer(self):
+        """Test que timer() observe la durée du bloc, même en cas d'erreur"""
+        with pytest.raises(ValueError):
+            with metrics.timer("stage_seconds", stage="format"):
+                raise ValueError()
+        assert metrics.get_histogram("stage_seconds", stage="format")[0] == 1
+
+
+class TestRender:
+    """Tests pour l'export Prometheus render()"""
+    
+    def test_counters_and_gauges(self):
+        """Test lignes TYPE et séries étiquetées"""
+        metrics.inc("chat_intents_total", intent="search")
+        metrics.inc("chat_intents_total", intent="search")
+        metrics.set_gauge("sessions_active", 42)
+        text = metrics.render()
+        assert "# TYPE chat_intents_total counter" in text
+        assert 'chat_intents_total{intent="search"} 2' in text
+        assert "# TYPE sessions_active gauge" in text
+        assert "sessions_active 42" in text
+    
+    def test_histogram_buckets_cumulative(self):
+        """Test buckets cumulés, +Inf, _sum et _count"""
+        for value in (0, 3, 30, 1000):
+            metrics.observe("chat_results_matched", value, buckets=(0, 5, 50))
+        lines = metrics.render().splitlines()
+        assert "# TYPE chat_results_matched histogram" in lines
+        assert 'chat_results_matched_bucket{le="0"} 1' in lines
+        assert 'chat_results_matched_bucket{le="5"} 2' in lines
+        assert 'chat_results_matched_bucket{le="50"} 3' in lines
+        assert 'chat_results_matched_bucket{le="+Inf"} 4' in lines
+        assert "chat_results_matched_sum 1033" in lines
+        assert "chat_results_matched_count 4" in lines
+    
+    def test_label_escaping(self):
+        """Test échappement des guillemets dans les étiquettes"""
+        metrics.inc("errors_total", reason='a"b')
+        assert 'errors_total{reason="a\\"b"} 1' in metrics.render()
+    
+    def test_collector_called(self):
+        """Test que les collecteurs sont appelés avant l'export"""
+        calls = []
+        
+        def collector():
+            calls.append(1)
+            metrics.set_gauge("collected", len(calls))
+        
+        metrics.register_collector(collector)
+        metrics.register_collector(collector)
+        try:
+            assert "collected 1" in metrics.render()
+        finally:
+            metrics._collectors.remove(collector)
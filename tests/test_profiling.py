@@ -0,0 +1,113 @@
+# tests/test_profiling.py
+"""
+Tests unitaires pour le module profiling.py (Server-Timing et profilage opt-in)
+"""
+import pstats
+import random
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services import metrics
+from services.profiling import Profiler, ServerTimingMiddleware, server_timing_header, stage_timer
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    """Remise à zéro des métriques"""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def make_client(request_profiler):
+    """Petite application avec deux étapes mesurées"""
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware, paths=("/chat/",), request_profiler=request_profiler)
+    
+    @app.post("/chat/")
+    async def chat():
+        with stage_timer("llm"):
+            pass
+        with stage_timer("filter"):
+            sum(range(1000))
+        return {"reply": "ok"}
+    
+    @app.get("/other")
+    async def other():
+        return {}
+    
+    return TestClient(app)
+
+
+class TestServerTiming:
+    """Tests pour l'en-tête Server-Timing"""
+    
+    def test_header_format(self):
+        """Test format nom;dur=ms"""
+        assert server_timing_header({"llm": 12.345, "total": 20}) == "llm;dur=12.3, total;dur=20.0"
+    
+    def test_stages_in_header(self, tmp_path):
+        """Test étapes et total dans la réponse, histogramme alimenté"""
+        client = make_client(Profiler(directory=tmp_path))
+        response = client.post("/chat/")
+        header = response.headers["server-timing"]
+        assert header.startswith("llm;dur=")
+        assert "filter;dur=" in header and "total;dur=" in header
+        assert "x-profile-id" not in response.headers
+        assert metrics.get_histogram("chat_stage_seconds", stage="llm")[0] == 1
+    
+    def test_other_paths_untouched(self, tmp_path):
+        """Test pas d'en-tête hors des chemins suivis"""
+        client = make_client(Profiler(directory=tmp_path))
+        assert "server-timing" not in client.get("/other").headers
+    
+    def test_stage_timer_outside_request(self):
+        """Test stage_timer hors requête : seulement la métrique"""
+        with stage_timer("format"):
+            pass
+        assert metrics.get_histogram("chat_stage_seconds", stage="format")[0] == 1
+
+
+class TestProfiler:
+    """Tests pour le profilage opt-in"""
+    
+    def test_token_required(self, tmp_path):
+        """Test profil seulement avec le bon jeton"""
+        request_profiler = Profiler(token="secret", directory=tmp_path)
+        client = make_client(request_profiler)
+        assert "x-profile-id" not in client.post("/chat/", headers={"X-Profile": "faux"}).headers
+        assert list(tmp_path.glob("*.prof")) == []
+        
+        response = client.post("/chat/", headers={"X-Profile": "secret"})
+        assert response.json() == {"reply": "ok"}
+        name = response.headers["x-profile-id"]
+        assert (tmp_path / name).exists()
+        assert "server-timing" in response.headers
+        # Fichier lisible par pstats (snakeviz, flameprof)
+        assert pstats.Stats(str(tmp_path / name)).total_calls > 0
+    
+    def test_no_token_configured(self, tmp_path):
+        """Test qu'un jeton vide ne donne jamais accès au profilage"""
+        assert Profiler(token="", directory=tmp_path).wants("") is False
+        assert Profiler(token="", directory=tmp_path).wants(None) is False
+    
+    def test_sampling(self, tmp_path):
+        """Test échantillonnage déterministe"""
+        always = Profiler(sample_rate=1.0, directory=tmp_path, rng=random.Random(0))
+        never = Profiler(sample_rate=0.0, directory=tmp_path, rng=random.Random(0))
+        assert always.wants(None) is True
+        assert never.wants(None) is False
+    
+    def test_one_profile_at_a_time(self, tmp_path):
+        """Test qu'un seul profil est actif à la fois"""
+        request_profiler = Profiler(sample_rate=1.0, directory=tmp_path)
+        request_profiler.active = True
+        assert request_profiler.wants(None) is False
+    
+    def test_max_files(self, tmp_path):
+        """Test rotation des profils au-delà de max_files"""
+        client = make_client(Profiler(sample_rate=1.0, directory=tmp_path, max_files=2))
+        for _ in range(4):
+            client.post("/chat/")
+        assert len(list(tmp_path.glob("*.prof"))) == 2
@@ -0,0 +1,251 @@
+# tests/test_rate_limit.py
+"""
+Tests unitaires pour le module rate_limit.py (seau à jetons partagé)
+"""
+import asyncio
+import multiprocessing
+import os
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from typing import Optional
+
+from services.rate_limit import MemoryBucketStore, RateLimiter, Rule, SharedBucketStore
+
+
+class FakeClock:
+    """Horloge manipulable"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def drain(store, key, rule, now, n):
+    """Nombre de jetons accordés sur n tentatives au même instant"""
+    return sum(store.take(key, rule, now)[0] for _ in range(n))
+
+
+def hammer(path, n, queue):
+    """Un worker : n tentatives sur la même clé"""
+    store = SharedBucketStore(path, slots=64)
+    queue.put(drain(store, "chat:ip:1.2.3.4", Rule.parse("10/minute"), 1000.0, n))
+
+
+class TestRule:
+    """Tests pour Rule.parse()"""
+    
+    def test_parse(self):
+        """Test formats acceptés"""
+        rule = Rule.parse("10/minute")
+        assert (rule.limit, rule.period) == (10, 60)
+        assert Rule.parse("5/second").period == 1
+        assert Rule.parse("100/2 hours").period == 7200
+    
+    def test_invalid(self):
+        """Test format invalide"""
+        with pytest.raises(ValueError):
+            Rule.parse("dix par minute")
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path: MemoryBucketStore(),
+    lambda tmp_path: SharedBucketStore(str(tmp_path / "buckets"), slots=64),
+], ids=["memory", "shared"])
+class TestBucketStores:
+    """Tests communs aux stockages mémoire et partagé"""
+    
+    def test_burst_then_refill(self, make_store, tmp_path):
+        """Test capacité initiale puis remplissage continu"""
+        store = make_store(tmp_path)
+        rule = Rule.parse("10/minute")
+        assert drain(store, "k", rule, 1000.0, 15) == 10
+        allowed, retry_after = store.take("k", rule, 1000.0)
+        assert not allowed and retry_after == pytest.approx(6.0)
+        # 6 secondes plus tard : un jeton de plus
+        assert drain(store, "k", rule, 1006.0, 3) == 1
+        # Longtemps après : capacité pleine, pas davantage
+        assert drain(store, "k", rule, 5000.0, 20) == 10
+    
+    def test_keys_independent(self, make_store, tmp_path):
+        """Test seaux distincts par clé"""
+        store = make_store(tmp_path)
+        rule = Rule.parse("2/minute")
+        assert drain(store, "a", rule, 0.0, 5) == 2
+        assert drain(store, "b", rule, 0.0, 5) == 2
+    
+    def test_cost(self, make_store, tmp_path):
+        """Test plusieurs jetons par requête : refus sans consommation si le seau est insuffisant"""
+        store = make_store(tmp_path)
+        rule = Rule.parse("10/minute")
+        assert store.take("k", rule, 0.0, cost=6)[0]
+        allowed, retry_after = store.take("k", rule, 0.0, cost=6)
+        assert not allowed and retry_after == pytest.approx(12.0)
+        assert drain(store, "k", rule, 0.0, 10) == 4
+    
+    def test_reset(self, make_store, tmp_path):
+        """Test remise à zéro"""
+        store = make_store(tmp_path)
+        rule = Rule.parse("1/minute")
+        store.take("k", rule, 0.0)
+        store.reset()
+        assert store.take("k", rule, 0.0)[0]
+    
+    def test_refund(self, make_store, tmp_path):
+        """Test coût négatif : jetons rendus, plafonnés à la capacité"""
+        store = make_store(tmp_path)
+        rule = Rule.parse("3/minute")
+        assert drain(store, "k", rule, 0.0, 3) == 3
+        store.take("k", rule, 0.0, cost=-1)
+        assert drain(store, "k", rule, 0.0, 3) == 1
+        store.take("k", rule, 0.0, cost=-10)
+        assert drain(store, "k", rule, 0.0, 5) == 3
+
+
+class TestMemoryBucketStore:
+    """Tests propres au stockage mémoire"""
+    
+    def test_bounded(self):
+        """Test identifiants renouvelés sans fin : nombre de seaux borné"""
+        store = MemoryBucketStore(maxsize=100)
+        rule = Rule.parse("2/minute")
+        for i in range(1000):
+            store.take(f"chat:session:{i}", rule, 0.0)
+        assert len(store._buckets) == 100
+
+
+class TestSharedBucketStore:
+    """Tests propres au stockage partagé entre workers"""
+    
+    def test_file_created_on_first_take(self, tmp_path):
+        """Test aucun fichier créé à la construction (import de main)"""
+        path = tmp_path / "buckets"
+        store = SharedBucketStore(str(path), slots=64)
+        assert not path.exists()
+        store.take("k", Rule.parse("1/minute"), 0.0)
+        assert path.exists()
+    
+    def test_shared_between_instances(self, tmp_path):
+        """Test deux workers (deux ouvertures du fichier) partagent le seau"""
+        path = str(tmp_path / "buckets")
+        rule = Rule.parse("10/minute")
+        first, second = SharedBucketStore(path, slots=64), SharedBucketStore(path, slots=64)
+        assert drain(first, "k", rule, 0.0, 6) + drain(second, "k", rule, 0.0, 6) == 10
+    
+    def test_group_full_reuses_oldest(self, tmp_path):
+        """Test groupe plein : la case la plus ancienne est reprise"""
+        store = SharedBucketStore(str(tmp_path / "buckets"), slots=4, ways=4)
+        rule = Rule.parse("1/minute")
+        for i in range(4):
+            store.take(f"k{i}", rule, float(i))
+        # Nouvelle clé : remplace k0, les autres restent limitées
+        assert store.take("k4", rule, 10.0)[0]
+        assert not store.take("k3", rule, 10.0)[0]
+    
+    @pytest.mark.skipif(os.name != "posix", reason="fcntl requis")
+    def test_limit_holds_across_processes(self, tmp_path):
+        """Test 4 processus : 10 jetons au total, pas 4 x 10"""
+        path = str(tmp_path / "buckets")
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        processes = [ctx.Process(target=hammer, args=(path, 10, queue)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=10)
+        assert sum(queue.get(timeout=1) for _ in processes) == 10
+
+
+class TestRateLimiter:
+    """Tests pour le décorateur RateLimiter.limit()"""
+    
+    class Body(BaseModel):
+        message: str
+        session_id: Optional[str] = None
+    
+    @pytest.fixture
+    def limiter(self):
+        return RateLimiter(MemoryBucketStore(), clock=FakeClock())
+    
+    @pytest.fixture
+    def client(self, limiter):
+        """Application avec une route limitée par IP et par session"""
+        app = FastAPI()
+        Body = self.Body
+        
+        @app.post("/chat/")
+        @limiter.limit("3/minute", per_session="2/minute")
+        async def chat(request: Request, req: Body):
+            return {"ok": True}
+        
+        @app.post("/batch")
+        @limiter.limit("3/minute", scope="chat", cost=lambda req: len(req.message))
+        async def batch(request: Request, req: Body):
+            return {"ok": True}
+        
+        @app.get("/search")
+        @limiter.limit("1/minute")
+        async def search(request: Request):
+            return {"ok": True}
+        
+        return TestClient(app)
+    
+    def test_429_with_retry_after(self, client):
+        """Test dépassement : 429 et Retry-After"""
+        assert client.get("/search").status_code == 200
+        response = client.get("/search")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "60"
+    
+    def test_routes_independent(self, client):
+        """Test une limite par route"""
+        client.get("/search")
+        assert client.post("/chat/", json={"message": "a"}).status_code == 200
+    
+    def test_per_session(self, client):
+        """Test limite par session en plus de la limite par IP"""
+        statuses = [client.post("/chat/", json={"message": "a", "session_id": "session-1"}).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        # Autre session, même IP : reste 1 jeton IP sur 3
+        assert client.post("/chat/", json={"message": "a", "session_id": "session-2"}).status_code == 200
+        assert client.post("/chat/", json={"message": "a", "session_id": "session-3"}).status_code == 429
+    
+    def test_ip_refusal_keeps_session_tokens(self, client, limiter):
+        """Test refus par IP : le jeton de la session est rendu"""
+        for session_id in ("a", "b", "c"):
+            client.post("/chat/", json={"message": "a", "session_id": session_id})
+        # IP épuisée : les refus ne doivent pas vider la session "d"
+        for _ in range(3):
+            assert client.post("/chat/", json={"message": "a", "session_id": "d"}).status_code == 429
+        limiter.clock.now += 20  # Un jeton IP de plus, la session "d" a toujours ses 2 jetons
+        assert client.post("/chat/", json={"message": "a", "session_id": "d"}).status_code == 200
+        limiter.clock.now += 20
+        assert client.post("/chat/", json={"message": "a", "session_id": "d"}).status_code == 200
+    
+    def test_session_header(self, client, limiter):
+        """Test session transmise par l'en-tête X-Session-Id"""
+        headers = {"X-Session-Id": "session-h"}
+        statuses = [client.post("/chat/", json={"message": "a"}, headers=headers).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+    
+    def test_cost_shared_scope(self, client):
+        """Test route à coût variable partageant le seau de /chat/"""
+        assert client.post("/batch", json={"message": "ab"}).status_code == 200
+        assert client.post("/chat/", json={"message": "a"}).status_code == 200
+        assert client.post("/chat/", json={"message": "a"}).status_code == 429
+        # Coût supérieur à la capacité : refus immédiat
+        assert client.post("/batch", json={"message": "abcd"}).status_code == 429
+    
+    def test_disabled(self, client, limiter):
+        """Test limiteur désactivé (tests de charge)"""
+        limiter.enabled = False
+        assert all(client.get("/search").status_code == 200 for _ in range(5))
+    
+    def test_refill_with_clock(self, client, limiter):
+        """Test nouveau jeton après la période"""
+        client.get("/search")
+        limiter.clock.now += 60
+        assert client.get("/search").status_code == 200
@@ -0,0 +1,88 @@
+# tests/test_refresher.py
+"""
+Tests unitaires pour le module refresher.py
+"""
+import asyncio
+import random
+import pytest
+
+from services.refresher import PeriodicRefresher
+
+
+class RecordingSleep:
+    """Faux sleep : note les délais et arrête la boucle après n appels"""
+
+    def __init__(self, n):
+        self.delays = []
+        self.n = n
+
+    async def __call__(self, delay):
+        self.delays.append(delay)
+        if len(self.delays) > self.n:
+            raise asyncio.CancelledError()
+
+
+def run_until_cancelled(refresher, succeeded=True):
+    async def run():
+        with pytest.raises(asyncio.CancelledError):
+            await refresher.run(succeeded)
+    asyncio.run(run())
+
+
+class TestPeriodicRefresher:
+    """Tests pour PeriodicRefresher"""
+    
+    def test_jitter_bounds(self):
+        """Test délai dans [interval × (1 - jitter), interval × (1 + jitter)]"""
+        refresher = PeriodicRefresher("test", None, 300, jitter=0.1, rng=random.Random(1))
+        delays = [refresher.next_delay(True) for _ in range(200)]
+        assert all(270 <= d <= 330 for d in delays)
+        assert len(set(delays)) > 1
+    
+    def test_retry_sooner_after_failure(self):
+        """Test nouvel essai plus tôt après un échec, puis retour à l'intervalle"""
+        results = iter([False, True, True])
+        
+        async def refresh():
+            return next(results)
+        
+        sleep = RecordingSleep(3)
+        refresher = PeriodicRefresher("test", refresh, 300, jitter=0, retry_interval=30, sleep=sleep)
+        run_until_cancelled(refresher)
+        assert sleep.delays == [300, 30, 300, 300]
+    
+    def test_exception_counts_as_failure(self):
+        """Test une exception ne tue pas la boucle"""
+        calls = []
+        
+        async def refresh():
+            calls.append(1)
+            raise RuntimeError("API indisponible")
+        
+        sleep = RecordingSleep(2)
+        refresher = PeriodicRefresher("test", refresh, 300, jitter=0, retry_interval=30, sleep=sleep)
+        run_until_cancelled(refresher, succeeded=False)
+        assert sleep.delays == [30, 30, 30]
+        assert len(calls) == 2
+    
+    def test_start_stop(self):
+        """Test arrêt propre de la tâche de fond"""
+        calls = []
+        
+        async def refresh():
+            calls.append(1)
+            return True
+        
+        async def run():
+            refresher = PeriodicRefresher("test", refresh, 0.01, jitter=0)
+            refresher.start()
+            await asyncio.sleep(0.05)
+            await refresher.stop()
+            count = len(calls)
+            await asyncio.sleep(0.03)
+            return count, len(calls), refresher.task
+        
+        count, later, task = asyncio.run(run())
+        assert count >= 2
+        assert later == count
+        assert task is None
@@ -0,0 +1,437 @@
+# tests/test_resilience.py
+"""
+Tests unitaires pour le module resilience.py, contre un faux LLM local
+qui injecte latence et erreurs.
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from services import metrics
+from services.resilience import (
+    AdmissionController,
+    AdmissionRejected,
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    RequestCoalescer,
+    ResilientCaller,
+    CLOSED,
+    OPEN,
+    HALF_OPEN
+)
+
+
+class FakeLLM:
+    """Faux LLM : chaque appel consomme le prochain (latence, erreur) du script."""
+
+    def __init__(self, script, result=None):
+        self.script = list(script)
+        self.result = result or {"intent": "chat", "filters": {}, "ai_reply": "ok"}
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self):
+        latency, error = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if error:
+            raise error
+        return dict(self.result, call=self.calls)
+
+
+class FakeClock:
+    """Horloge manipulable pour le disjoncteur"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    """Remise à zéro des métriques"""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestLatencyTracker:
+    """Tests pour LatencyTracker"""
+
+    def test_percentile_needs_samples(self):
+        """Test pas de percentile sans assez d'échantillons"""
+        tracker = LatencyTracker(min_samples=5)
+        tracker.record(0.1)
+        assert tracker.percentile(95) is None
+
+    def test_percentile(self):
+        """Test calcul du percentile"""
+        tracker = LatencyTracker(min_samples=5)
+        for i in range(1, 101):
+            tracker.record(i / 100)
+        assert tracker.percentile(50) == pytest.approx(0.5, abs=0.02)
+        assert tracker.percentile(95) == pytest.approx(0.95, abs=0.02)
+
+
+class TestCircuitBreaker:
+    """Tests pour CircuitBreaker"""
+
+    def test_opens_after_threshold(self):
+        """Test ouverture après N échecs consécutifs"""
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=10, clock=FakeClock())
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert metrics.get("test_breaker_state") == 2
+
+    def test_success_resets_count(self):
+        """Test qu'un succès remet le compteur à zéro"""
+        breaker = CircuitBreaker("test", failure_threshold=2, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_single_trial(self):
+        """Test un seul appel d'essai après le délai"""
+        clock = FakeClock()
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 11
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_half_open_failure_reopens(self):
+        """Test que l'échec de l'essai rouvre le disjoncteur"""
+        clock = FakeClock()
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 11
+        breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+
+class TestResilientCaller:
+    """Tests pour ResilientCaller contre le faux LLM"""
+
+    def test_success(self):
+        """Test appel réussi"""
+        llm = FakeLLM([(0, None)])
+        caller = ResilientCaller("test", deadline=1)
+        result = asyncio.run(caller.call(llm.generate))
+        assert result["ai_reply"] == "ok"
+        assert metrics.get("test_calls_total", outcome="success") == 1
+
+    def test_deadline(self):
+        """Test échéance dépassée : l'appel lent est annulé"""
+        llm = FakeLLM([(5, None)])
+        caller = ResilientCaller("test", deadline=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(caller.call(llm.generate))
+        assert llm.cancelled == 1
+        assert metrics.get("test_calls_total", outcome="timeout") == 1
+
+    def test_error_propagates(self):
+        """Test erreur du service"""
+        llm = FakeLLM([(0, ValueError("boom"))])
+        caller = ResilientCaller("test", deadline=1)
+        with pytest.raises(ValueError):
+            asyncio.run(caller.call(llm.generate))
+        assert metrics.get("test_calls_total", outcome="error") == 1
+
+    def test_breaker_short_circuits(self):
+        """Test qu'un disjoncteur ouvert évite l'appel"""
+        llm = FakeLLM([(0, RuntimeError("down"))])
+        caller = ResilientCaller("test", deadline=1, breaker=CircuitBreaker("test", failure_threshold=2))
+
+        async def run():
+            for _ in range(2):
+                with pytest.raises(RuntimeError):
+                    await caller.call(llm.generate)
+            with pytest.raises(CircuitOpenError):
+                await caller.call(llm.generate)
+
+        asyncio.run(run())
+        assert llm.calls == 2
+        assert metrics.get("test_calls_total", outcome="short_circuit") == 1
+
+    def test_hedge_wins_over_slow_primary(self):
+        """Test requête de couverture plus rapide qu'une première requête lente"""
+        tracker = LatencyTracker(min_samples=1)
+        tracker.record(0.01)
+        llm = FakeLLM([(2, None), (0, None)])
+        caller = ResilientCaller("test", deadline=1, hedge_percentile=95, tracker=tracker)
+
+        result = asyncio.run(caller.call(llm.generate))
+
+        assert result["call"] == 2
+        assert llm.cancelled == 1
+        assert metrics.get("test_hedges_total", outcome="launched") == 1
+        assert metrics.get("test_hedges_total", outcome="won") == 1
+
+    def test_hedge_survives_primary_error(self):
+        """Test que l'échec d'une requête laisse sa chance à l'autre"""
+        tracker = LatencyTracker(min_samples=1)
+        tracker.record(0.01)
+        llm = FakeLLM([(0.05, RuntimeError("boom")), (0.1, None)])
+        caller = ResilientCaller("test", deadline=1, hedge_percentile=95, tracker=tracker)
+
+        result = asyncio.run(caller.call(llm.generate))
+        assert result["call"] == 2
+
+    def test_no_hedge_without_history(self):
+        """Test pas de couverture tant que le percentile est inconnu"""
+        llm = FakeLLM([(0.05, None)])
+        caller = ResilientCaller("test", deadline=1, hedge_percentile=95)
+        asyncio.run(caller.call(llm.generate))
+        assert llm.calls == 1
+
+
+class TestAdmissionController:
+    """Tests pour AdmissionController (file bornée, délestage)"""
+
+    def test_bounded_concurrency(self):
+        """Test au plus max_concurrent appels simultanés, les autres attendent"""
+        controller = AdmissionController("test", max_concurrent=3, max_queue=10, max_wait=1)
+        active = {"now": 0, "max": 0}
+
+        async def call():
+            async with controller.admit():
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+                await asyncio.sleep(0.01)
+                active["now"] -= 1
+
+        async def run():
+            await asyncio.gather(*(call() for _ in range(10)))
+
+        asyncio.run(run())
+        assert active["max"] == 3
+        assert metrics.get("test_admission_total", outcome="admitted") == 10
+        assert metrics.get("test_admission_queue_depth") == 0
+        assert metrics.get_histogram("test_admission_wait_seconds")[0] == 10
+
+    def test_queue_full(self):
+        """Test file pleine : refus immédiat"""
+        controller = AdmissionController("test", max_concurrent=1, max_queue=1, max_wait=1)
+
+        async def hold():
+            async with controller.admit():
+                await asyncio.sleep(0.05)
+
+        async def run():
+            holder = asyncio.create_task(hold())
+            queued = asyncio.create_task(hold())
+            await asyncio.sleep(0.01)
+            assert controller.waiting == 1
+            with pytest.raises(AdmissionRejected) as excinfo:
+                async with controller.admit():
+                    pass
+            await asyncio.gather(holder, queued)
+            return excinfo.value.reason
+
+        assert asyncio.run(run()) == "queue_full"
+        assert metrics.get("test_admission_total", outcome="queue_full") == 1
+        assert metrics.get("test_admission_total", outcome="admitted") == 2
+
+    def test_queue_timeout(self):
+        """Test attente au-delà de max_wait : refus, la place n'est pas perdue"""
+        controller = AdmissionController("test", max_concurrent=1, max_queue=5, max_wait=0.02)
+
+        async def run():
+            async def hold():
+                async with controller.admit():
+                    await asyncio.sleep(0.1)
+
+            holder = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejected) as excinfo:
+                async with controller.admit():
+                    pass
+            await holder
+            # La place libérée reste utilisable
+            async with controller.admit():
+                pass
+            return excinfo.value.reason
+
+        assert asyncio.run(run()) == "queue_timeout"
+        assert controller.active == 0 and controller.waiting == 0
+        assert metrics.get("test_admission_total", outcome="queue_timeout") == 1
+
+
+class TestRequestCoalescer:
+    """Tests pour RequestCoalescer"""
+
+    def test_concurrent_calls_share_one_task(self):
+        """Test que N appels identiques concurrents ne font qu'un appel"""
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"filters": {"city": "Cotonou"}}
+
+        async def run():
+            coalescer = RequestCoalescer("test")
+            results = await asyncio.gather(*[coalescer.run("k", work) for _ in range(10)])
+            assert coalescer._inflight == {}
+            return results
+
+        results = asyncio.run(run())
+        assert len(calls) == 1
+        assert all(r == {"filters": {"city": "Cotonou"}} for r in results)
+        # Chaque appelant reçoit sa propre copie
+        results[0]["filters"]["city"] = "Parakou"
+        assert results[1]["filters"]["city"] == "Cotonou"
+        assert metrics.get("test_coalesced_total") == 9
+
+    def test_different_keys_not_shared(self):
+        """Test que des clés différentes font des appels séparés"""
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 1
+
+        async def run():
+            coalescer = RequestCoalescer("test")
+            await asyncio.gather(coalescer.run("a", work), coalescer.run("b", work))
+
+        asyncio.run(run())
+        assert len(calls) == 2
+
+    def test_sequential_calls_not_shared(self):
+        """Test pas de cache : un appel terminé n'est pas réutilisé"""
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return 1
+
+        async def run():
+            coalescer = RequestCoalescer("test")
+            await coalescer.run("k", work)
+            await coalescer.run("k", work)
+
+        asyncio.run(run())
+        assert len(calls) == 2
+
+    def test_error_propagates_to_all(self):
+        """Test que l'erreur est transmise à tous les appelants"""
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        async def run():
+            coalescer = RequestCoalescer("test")
+            return await asyncio.gather(*[coalescer.run("k", work) for _ in range(3)], return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_cancelling_one_waiter_keeps_others(self):
+        """Test que l'annulation d'un appelant n'affecte pas les autres"""
+        async def work():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        async def run():
+            coalescer = RequestCoalescer("test")
+            first = asyncio.ensure_future(coalescer.run("k", work))
+            second = asyncio.ensure_future(coalescer.run("k", work))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            assert await second == "ok"
+            with pytest.raises(asyncio.CancelledError):
+                await first
+
+        asyncio.run(run())
+
+    def test_cancelling_all_waiters_cancels_task(self):
+        """Test que la tâche partagée est annulée quand plus personne n'attend"""
+        cancelled = []
+
+        async def work():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def run():
+            coalescer = RequestCoalescer("test")
+            waiters = [asyncio.ensure_future(coalescer.run("k", work)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            for w in waiters:
+                w.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            await asyncio.sleep(0)
+            assert coalescer._inflight == {}
+
+        asyncio.run(run())
+        assert cancelled == [True]
+
+
+class TestGeminiFallback:
+    """Tests du repli local de chat_with_gemini()"""
+
+    def test_fallback_on_error(self):
+        """Test repli sur l'analyse locale quand le LLM échoue"""
+        from services import gemini_client
+
+        async def failing(prompt):
+            raise RuntimeError("Gemini indisponible")
+
+        with patch.object(gemini_client, "generate_json", side_effect=failing):
+            with patch.object(gemini_client, "resilience", ResilientCaller("llm", deadline=1)):
+                result = asyncio.run(gemini_client.chat_with_gemini("Concerts gratuits à Parakou"))
+
+        assert result["intent"] == "search"
+        assert result["filters"]["city"] == "Parakou"
+        assert result["filters"]["is_free"] is True
+        assert metrics.get("llm_fallbacks_total", reason="error") == 1
+
+    def test_fallback_chat_intent(self):
+        """Test repli sans critère : simple discussion"""
+        from services import gemini_client
+
+        breaker = CircuitBreaker("llm", failure_threshold=1)
+        breaker.record_failure()
+        with patch.object(gemini_client, "resilience", ResilientCaller("llm", breaker=breaker)):
+            result = asyncio.run(gemini_client.chat_with_gemini("Bonjour"))
+
+        assert result["intent"] == "chat"
+        assert metrics.get("llm_fallbacks_total", reason="circuit_open") == 1
+
+    def test_fallback_when_shed(self):
+        """Test surcharge : repli local immédiat, sans appel au modèle"""
+        from services import gemini_client
+
+        class Full:
+            def admit(self):
+                raise AdmissionRejected("llm", "queue_full")
+
+        with patch.object(gemini_client, "admission", Full()):
+            with patch.object(gemini_client, "generate_json") as mock_generate:
+                result = asyncio.run(gemini_client.chat_with_gemini("Concerts à Cotonou"))
+
+        mock_generate.assert_not_called()
+        assert result["intent"] == "search"
+        assert result["filters"]["city"] == "Cotonou"
+        assert metrics.get("llm_fallbacks_total", reason="shed_queue_full") == 1
@@ -0,0 +1,130 @@
+# tests/test_responses.py
+"""
+Tests unitaires pour le module responses.py (JSON rapide et compression)
+"""
+import gzip
+import json
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from services import responses
+from services.responses import CompressionMiddleware, FastJSONResponse, dumps, negotiate_encoding
+
+PAYLOAD = {"reply": "🎵 **Concert** à Cotonou " * 100, "history": [{"role": "user", "content": "é"}]}
+
+
+class TestDumps:
+    """Tests pour la fonction dumps()"""
+    
+    def test_same_bytes_as_stdlib(self):
+        """Test que orjson et json produisent les mêmes octets"""
+        with patch.object(responses, "JSON_ENCODER", "json"):
+            stdlib = dumps(PAYLOAD)
+        with patch.object(responses, "JSON_ENCODER", "orjson"):
+            fast = dumps(PAYLOAD)
+        assert stdlib == fast
+        assert json.loads(fast) == PAYLOAD
+    
+    def test_without_orjson(self):
+        """Test repli sur json si orjson est absent"""
+        with patch.object(responses, "orjson", None):
+            assert json.loads(dumps(PAYLOAD)) == PAYLOAD
+
+
+class TestNegotiateEncoding:
+    """Tests pour la fonction negotiate_encoding()"""
+    
+    def test_gzip(self):
+        """Test gzip accepté"""
+        assert negotiate_encoding("gzip, deflate") == "gzip"
+    
+    def test_brotli_preferred(self):
+        """Test br préféré à gzip quand brotli est installé"""
+        with patch.object(responses, "brotli", object()):
+            assert negotiate_encoding("gzip, br") == "br"
+    
+    def test_brotli_unavailable(self):
+        """Test br ignoré si brotli n'est pas installé"""
+        with patch.object(responses, "brotli", None):
+            assert negotiate_encoding("br") is None
+    
+    def test_refused(self):
+        """Test q=0, en-tête absent ou codage inconnu"""
+        assert negotiate_encoding("gzip;q=0") is None
+        assert negotiate_encoding(None) is None
+        assert negotiate_encoding("identity") is None
+    
+    def test_wildcard(self):
+        """Test joker *"""
+        assert negotiate_encoding("*") in ("br", "gzip")
+
+
+class TestCompressionMiddleware:
+    """Tests pour CompressionMiddleware"""
+    
+    @pytest.fixture
+    def client(self):
+        """Petite application : grande, petite réponse et flux"""
+        app = FastAPI(default_response_class=FastJSONResponse)
+        app.add_middleware(CompressionMiddleware, minimum_size=500)
+        
+        @app.get("/chat/big")
+        async def big():
+            return PAYLOAD
+        
+        @app.get("/chat/small")
+        async def small():
+            return {"reply": "ok"}
+        
+        @app.get("/chat/stream")
+        async def stream():
+            async def lines():
+                for i in range(3):
+                    yield dumps({"index": i, "pad": "x" * 400}) + b"\n"
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+        
+        @app.get("/other")
+        async def other():
+            return PAYLOAD
+        
+        return TestClient(app)
+    
+    def test_large_response_compressed(self, client):
+        """Test compression gzip au-delà du seuil"""
+        response = client.get("/chat/big", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(dumps(PAYLOAD))
+        assert response.json() == PAYLOAD
+    
+    def test_small_response_untouched(self, client):
+        """Test pas de compression sous le seuil"""
+        response = client.get("/chat/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.json() == {"reply": "ok"}
+    
+    def test_client_without_gzip(self, client):
+        """Test client qui n'accepte pas la compression"""
+        response = client.get("/chat/big", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.json() == PAYLOAD
+    
+    def test_stream_passthrough(self, client):
+        """Test réponse en flux transmise sans compression"""
+        response = client.get("/chat/stream", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert len(response.text.splitlines()) == 3
+    
+    def test_other_paths_untouched(self, client):
+        """Test chemins hors /chat/ et /events/"""
+        response = client.get("/other", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+    
+    def test_gzip_roundtrip(self):
+        """Test compress() gzip déterministe"""
+        body = dumps(PAYLOAD)
+        assert gzip.decompress(responses.compress(body, "gzip")) == body
+        assert responses.compress(body, "gzip") == responses.compress(body, "gzip")
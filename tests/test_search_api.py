@@ -0,0 +1,79 @@
+# tests/test_search_api.py
+"""
+Tests unitaires pour le module search_api.py
+"""
+import pytest
+from datetime import datetime
+from services.search_api import (
+    PUBLIC_FIELDS,
+    InvalidFields,
+    compute_etag,
+    etag_matches,
+    paginate,
+    parse_fields,
+    serialize_event
+)
+
+
+class TestParseFields:
+    """Tests pour la fonction parse_fields()"""
+    
+    def test_default_all_fields(self):
+        """Test sans sélection : tous les champs publics"""
+        assert parse_fields(None) == PUBLIC_FIELDS
+        assert parse_fields("") == PUBLIC_FIELDS
+    
+    def test_selection(self):
+        """Test sélection de champs"""
+        assert parse_fields("title, city") == ["title", "city"]
+    
+    def test_unknown_field(self):
+        """Test champ inconnu ou privé"""
+        with pytest.raises(InvalidFields):
+            parse_fields("title,_match_reasons")
+
+
+class TestSerializeEvent:
+    """Tests pour la fonction serialize_event()"""
+    
+    def test_dates_iso(self):
+        """Test dates au format ISO 8601"""
+        event = {"title": "A", "date_start": datetime(2026, 1, 20, 20, 0), "_match_reasons": ["x"]}
+        item = serialize_event(event, ["title", "date_start"])
+        assert item == {"title": "A", "date_start": "2026-01-20T20:00:00"}
+    
+    def test_private_fields_hidden(self):
+        """Test que les champs internes ne sortent pas"""
+        item = serialize_event({"title": "A", "_match_reasons": ["x"]})
+        assert "_match_reasons" not in item
+
+
+class TestPaginate:
+    """Tests pour la fonction paginate()"""
+    
+    def test_pages(self):
+        """Test découpage en pages"""
+        items = list(range(45))
+        assert paginate(items, 1, 20) == list(range(20))
+        assert paginate(items, 3, 20) == list(range(40, 45))
+        assert paginate(items, 4, 20) == []
+
+
+class TestEtag:
+    """Tests pour compute_etag() et etag_matches()"""
+    
+    def test_etag_depends_on_version_and_params(self):
+        """Test que l'ETag change avec la version ou la requête"""
+        base = compute_etag("v1", {"city": "Cotonou", "page": 1})
+        assert base == compute_etag("v1", {"page": 1, "city": "Cotonou"})
+        assert base != compute_etag("v2", {"city": "Cotonou", "page": 1})
+        assert base != compute_etag("v1", {"city": "Parakou", "page": 1})
+    
+    def test_etag_matches(self):
+        """Test comparaison avec If-None-Match"""
+        etag = compute_etag("v1", {})
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"autre", {etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches(None, etag)
+        assert not etag_matches('"autre"', etag)
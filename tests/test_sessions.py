@@ -0,0 +1,191 @@
+# tests/test_sessions.py
+"""
+Tests unitaires pour le module sessions.py
+"""
+import asyncio
+import pytest
+
+from services.conversation import ConversationState
+from services.sessions import (
+    FileSessionBackend,
+    MemorySessionBackend,
+    SessionStore,
+    create_store,
+    MAX_HISTORY
+)
+
+
+class FakeClock:
+    """Horloge manipulable pour les expirations"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemorySessionBackend:
+    """Tests pour MemorySessionBackend"""
+    
+    def test_get_set(self):
+        """Test écriture puis lecture"""
+        backend = MemorySessionBackend()
+        asyncio.run(backend.set("abc", {"x": 1}, ttl=60))
+        assert asyncio.run(backend.get("abc")) == {"x": 1}
+        assert asyncio.run(backend.get("inconnue")) is None
+    
+    def test_ttl_eviction(self):
+        """Test expiration après le TTL"""
+        clock = FakeClock()
+        backend = MemorySessionBackend(clock=clock)
+        asyncio.run(backend.set("abc", {"x": 1}, ttl=60))
+        clock.now = 59
+        assert asyncio.run(backend.get("abc")) == {"x": 1}
+        clock.now = 61
+        assert asyncio.run(backend.get("abc")) is None
+        assert len(backend) == 0
+    
+    def test_lru_bound(self):
+        """Test éviction de la session la moins récemment utilisée"""
+        backend = MemorySessionBackend(maxsize=2)
+        
+        async def run():
+            await backend.set("a", {}, 60)
+            await backend.set("b", {}, 60)
+            await backend.get("a")  # "a" redevient récente
+            await backend.set("c", {}, 60)
+            return await backend.get("a"), await backend.get("b"), await backend.get("c")
+        
+        assert asyncio.run(run()) == ({}, None, {})
+    
+    def test_delete(self):
+        """Test suppression"""
+        backend = MemorySessionBackend()
+        asyncio.run(backend.set("abc", {}, ttl=60))
+        asyncio.run(backend.delete("abc"))
+        assert asyncio.run(backend.get("abc")) is None
+
+
+class TestFileSessionBackend:
+    """Tests pour FileSessionBackend (sessions partagées entre workers)"""
+    
+    def test_shared_between_workers(self, tmp_path):
+        """Test une session écrite par un worker est lue par un autre"""
+        first, second = FileSessionBackend(str(tmp_path)), FileSessionBackend(str(tmp_path))
+        asyncio.run(first.set("abc", {"x": 1}, ttl=60))
+        assert asyncio.run(second.get("abc")) == {"x": 1}
+        asyncio.run(second.delete("abc"))
+        assert asyncio.run(first.get("abc")) is None
+    
+    def test_ttl(self, tmp_path):
+        """Test expiration après le TTL, fichier supprimé"""
+        clock = FakeClock()
+        backend = FileSessionBackend(str(tmp_path), clock=clock)
+        asyncio.run(backend.set("abc", {"x": 1}, ttl=60))
+        clock.now = 59
+        assert asyncio.run(backend.get("abc")) == {"x": 1}
+        clock.now = 61
+        assert asyncio.run(backend.get("abc")) is None
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_sweep(self, tmp_path):
+        """Test purge des sessions expirées puis des plus anciennes au-delà de maxsize"""
+        clock = FakeClock()
+        backend = FileSessionBackend(str(tmp_path), maxsize=2, sweep_interval=0, clock=clock)
+        
+        async def run():
+            await backend.set("expiree", {}, 5)
+            clock.now = 10
+            for name in ("a", "b", "c"):
+                await backend.set(name, {}, 60)
+                clock.now += 1
+            return [await backend.get(name) for name in ("expiree", "a", "b", "c")]
+        
+        assert asyncio.run(run()) == [None, None, {}, {}]
+        assert len(list(tmp_path.iterdir())) == 2
+    
+    def test_directory_created_on_first_write(self, tmp_path):
+        """Test aucun répertoire créé à la construction (import de main)"""
+        backend = FileSessionBackend(str(tmp_path / "sessions"), sweep_interval=0)
+        assert not (tmp_path / "sessions").exists()
+        assert asyncio.run(backend.get("abc")) is None
+        asyncio.run(backend.set("abc", {}, ttl=60))
+        assert asyncio.run(backend.get("abc")) == {}
+    
+    def test_client_id_is_not_a_path(self, tmp_path):
+        """Test identifiant hostile : fichier toujours dans le répertoire"""
+        backend = FileSessionBackend(str(tmp_path / "sessions"))
+        asyncio.run(backend.set("../../evil", {}, ttl=60))
+        assert [p.parent for p in (tmp_path / "sessions").iterdir()] == [tmp_path / "sessions"]
+        assert not (tmp_path / "evil.json").exists()
+
+
+class TestSessionStore:
+    """Tests pour SessionStore"""
+    
+    def test_roundtrip(self):
+        """Test sauvegarde puis chargement d'une conversation"""
+        store = SessionStore()
+        state = ConversationState(last_filters={"city": "Cotonou"}, turns=["Concerts"])
+        history = [{"role": "user", "content": str(i)} for i in range(10)]
+        
+        async def run():
+            await store.save("session-1", state, history)
+            return await store.load("session-1")
+        
+        loaded_state, loaded_history = asyncio.run(run())
+        assert loaded_state == state
+        assert len(loaded_history) == MAX_HISTORY
+    
+    def test_unknown_session(self):
+        """Test session inconnue : conversation vide"""
+        state, history = asyncio.run(SessionStore().load("inconnue"))
+        assert state == ConversationState()
+        assert history == []
+    
+    def test_backend_errors_are_tolerated(self):
+        """Test qu'une panne du stockage ne casse pas la conversation"""
+        class BrokenBackend(MemorySessionBackend):
+            async def get(self, session_id):
+                raise ConnectionError("down")
+            
+            async def set(self, session_id, data, ttl):
+                raise ConnectionError("down")
+        
+        store = SessionStore(BrokenBackend())
+        asyncio.run(store.save("abcdefgh", ConversationState(), []))
+        assert asyncio.run(store.load("abcdefgh")) == (ConversationState(), [])
+    
+    def test_session_ids(self):
+        """Test génération et validation des identifiants"""
+        assert SessionStore.is_valid_id(SessionStore.new_session_id())
+        assert SessionStore.is_valid_id("0b7f3a2e-8c1d-4f6a-9e2b-5d4c3b2a1f0e")
+        assert not SessionStore.is_valid_id("court")
+        assert not SessionStore.is_valid_id("../../etc/passwd")
+        assert not SessionStore.is_valid_id(None)
+
+
+class TestCreateStore:
+    """Tests pour la fonction create_store()"""
+    
+    def test_shared_default(self, monkeypatch, tmp_path):
+        """Test stockage partagé entre workers par défaut"""
+        monkeypatch.delenv("SESSION_BACKEND", raising=False)
+        monkeypatch.setenv("SESSION_DIR", str(tmp_path))
+        monkeypatch.setenv("SESSION_TTL", "120")
+        store = create_store()
+        assert isinstance(store.backend, FileSessionBackend)
+        assert store.backend.directory == str(tmp_path)
+        assert store.ttl == 120
+    
+    def test_memory(self, monkeypatch):
+        """Test stockage mémoire du processus"""
+        monkeypatch.setenv("SESSION_BACKEND", "memory")
+        assert isinstance(create_store().backend, MemorySessionBackend)
+    
+    def test_unknown(self, monkeypatch):
+        """Test stockage inconnu"""
+        monkeypatch.setenv("SESSION_BACKEND", "floppy")
+        with pytest.raises(ValueError):
+            create_store()
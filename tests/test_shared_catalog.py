@@ -0,0 +1,178 @@
+# tests/test_shared_catalog.py
+"""
+Tests unitaires pour le module shared_catalog.py (catalogue partagé entre workers)
+"""
+import asyncio
+import multiprocessing
+import os
+import pytest
+from datetime import datetime
+
+from services.shared_catalog import SharedCatalog, create_shared_catalog, decode_snapshot, encode_snapshot
+from services.tools import build_snapshot, empty_snapshot
+
+EVENTS = [
+    {"id": 1, "title": "Concert Jazz", "city": "Cotonou", "date_start": datetime(2026, 1, 20, 20), "date_end": None},
+    {"id": 2, "title": "Festival", "city": "Ouidah", "date_start": datetime(2026, 1, 10), "date_end": datetime(2026, 1, 12)},
+]
+
+
+def counting_fetch(log_path, delay=0.0):
+    """Récupération simulée qui note chaque appel dans un fichier"""
+    async def fetch():
+        with open(log_path, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        await asyncio.sleep(delay)
+        return build_snapshot([dict(e) for e in EVENTS])
+    return fetch
+
+
+def worker(directory, log_path, queue):
+    """Un worker : lit ou récupère le catalogue partagé"""
+    shared = SharedCatalog(directory, poll_interval=0.01)
+    snapshot = asyncio.run(shared.get(counting_fetch(log_path, delay=0.2)))
+    queue.put(snapshot.version)
+
+
+class TestEncoding:
+    """Tests pour encode_snapshot() / decode_snapshot()"""
+    
+    def test_roundtrip(self):
+        """Test dates restaurées et version conservée"""
+        snapshot = build_snapshot([dict(e) for e in EVENTS])
+        decoded = decode_snapshot(encode_snapshot(snapshot))
+        assert decoded.version == snapshot.version
+        assert decoded.events == EVENTS
+        assert isinstance(decoded.events[0]["date_start"], datetime)
+
+
+class TestSharedCatalog:
+    """Tests pour SharedCatalog"""
+    
+    def test_leader_publishes(self, tmp_path):
+        """Test premier appel : récupération puis publication"""
+        log = tmp_path / "fetch.log"
+        shared = SharedCatalog(tmp_path / "shared")
+        snapshot = asyncio.run(shared.get(counting_fetch(log)))
+        assert len(snapshot.events) == 2
+        assert shared.path.exists()
+        assert log.read_text().count("\n") == 1
+    
+    def test_second_worker_reads_file(self, tmp_path):
+        """Test un autre worker lit le fichier sans récupérer"""
+        log = tmp_path / "fetch.log"
+        asyncio.run(SharedCatalog(tmp_path / "shared").get(counting_fetch(log)))
+        other = SharedCatalog(tmp_path / "shared")
+        snapshot = asyncio.run(other.get(counting_fetch(log)))
+        assert snapshot.events == EVENTS
+        assert log.read_text().count("\n") == 1
+        # Fichier inchangé : pas de nouveau décodage
+        assert other.read() is snapshot
+    
+    def test_stale_file_refreshed(self, tmp_path):
+        """Test fichier trop vieux : nouvelle récupération"""
+        log = tmp_path / "fetch.log"
+        now = [0.0]
+        shared = SharedCatalog(tmp_path / "shared", max_age=60, clock=lambda: now[0])
+        asyncio.run(shared.get(counting_fetch(log)))
+        now[0] = os.stat(shared.path).st_mtime + 30
+        asyncio.run(shared.get(counting_fetch(log)))
+        assert log.read_text().count("\n") == 1
+        now[0] = os.stat(shared.path).st_mtime + 120
+        asyncio.run(shared.get(counting_fetch(log)))
+        assert log.read_text().count("\n") == 2
+    
+    def test_failed_fetch_keeps_old_file(self, tmp_path):
+        """Test API en erreur : l'ancienne version publiée est conservée"""
+        log = tmp_path / "fetch.log"
+        now = [0.0]
+        shared = SharedCatalog(tmp_path / "shared", max_age=60, clock=lambda: now[0])
+        asyncio.run(shared.get(counting_fetch(log)))
+        version = shared.read().version
+        now[0] = os.stat(shared.path).st_mtime + 120
+        
+        async def failing_fetch():
+            return empty_snapshot()
+        
+        snapshot = asyncio.run(shared.get(failing_fetch))
+        assert snapshot.version == version
+    
+    def test_lock_timeout(self, tmp_path):
+        """Test verrou tenu trop longtemps : lecture de ce qui existe"""
+        shared = SharedCatalog(tmp_path / "shared", lock_timeout=0.05, poll_interval=0.01)
+        fd = shared._try_lock()
+        try:
+            other = SharedCatalog(tmp_path / "shared", lock_timeout=0.05, poll_interval=0.01)
+            assert asyncio.run(other.get(counting_fetch(tmp_path / "fetch.log"))) is None
+        finally:
+            shared._unlock(fd)
+    
+    def test_update_applies_to_latest_file(self, tmp_path):
+        """Test correction appliquée au fichier publié, pas à la copie périmée d'un worker"""
+        first = SharedCatalog(tmp_path / "shared")
+        asyncio.run(first.get(counting_fetch(tmp_path / "fetch.log")))
+        stale = SharedCatalog(tmp_path / "shared")
+        stale.read()
+        mtime = os.stat(first.path).st_mtime_ns
+        
+        def add(title):
+            return lambda snapshot: build_snapshot(snapshot.events + [{"id": len(snapshot.events) + 1, "title": title}])
+        
+        asyncio.run(first.update(add("A")))
+        patched = asyncio.run(stale.update(add("B")))
+        assert [e["title"] for e in patched.events][-2:] == ["A", "B"]
+        assert first.read().version == patched.version
+        # Date de publication conservée : pas de rechargement complet repoussé
+        assert os.stat(first.path).st_mtime_ns == mtime
+    
+    def test_update_waits_for_lock(self, tmp_path):
+        """Test correction sans fichier publié, ou verrou tenu trop longtemps : rien n'est écrit"""
+        shared = SharedCatalog(tmp_path / "shared", lock_timeout=0.05, poll_interval=0.01)
+        assert asyncio.run(shared.update(lambda snapshot: snapshot)) is None
+        asyncio.run(shared.get(counting_fetch(tmp_path / "fetch.log")))
+        fd = shared._try_lock()
+        try:
+            with pytest.raises(TimeoutError):
+                asyncio.run(shared.update(lambda snapshot: empty_snapshot()))
+        finally:
+            shared._unlock(fd)
+        assert len(shared.read().events) == 2
+    
+    @pytest.mark.skipif(os.name != "posix", reason="fcntl requis")
+    def test_one_fetch_across_processes(self, tmp_path):
+        """Test plusieurs processus : une seule récupération, même version partout"""
+        log = tmp_path / "fetch.log"
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        processes = [ctx.Process(target=worker, args=(str(tmp_path / "shared"), str(log), queue)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=10)
+        versions = {queue.get(timeout=1) for _ in processes}
+        assert len(versions) == 1
+        assert log.read_text().count("\n") == 1
+
+
+class TestCreateSharedCatalog:
+    """Tests pour create_shared_catalog()"""
+    
+    def test_shared_by_default(self, tmp_path, monkeypatch):
+        """Test catalogue partagé par défaut, dans SHARED_CATALOG_DIR s'il est défini"""
+        monkeypatch.delenv("CATALOG_BACKEND", raising=False)
+        monkeypatch.setenv("SHARED_CATALOG_DIR", str(tmp_path))
+        shared = create_shared_catalog()
+        assert isinstance(shared, SharedCatalog)
+        assert shared.path == tmp_path / "catalog.json"
+        assert not shared.path.exists()  # Rien n'est écrit avant la première publication
+    
+    def test_memory(self, monkeypatch):
+        """Test CATALOG_BACKEND=memory : cache propre au worker"""
+        monkeypatch.setenv("CATALOG_BACKEND", "memory")
+        assert create_shared_catalog() is None
+    
+    def test_unknown(self, monkeypatch):
+        """Test stockage inconnu refusé"""
+        monkeypatch.setenv("CATALOG_BACKEND", "disque")
+        with pytest.raises(ValueError):
+            create_shared_catalog()
@@ -0,0 +1,160 @@
+# tests/test_startup.py
+"""
+Tests unitaires pour le module startup.py et le démarrage de l'application
+"""
+import os
+import subprocess
+import sys
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+
+from services.startup import StartupReport, parse_importtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestParseImporttime:
+    """Tests pour la fonction parse_importtime()"""
+    
+    def test_parse(self):
+        """Test décodage de la sortie -X importtime"""
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:      5000 |       9000 | main\n"
+            "quelque chose d'autre\n"
+        )
+        rows = parse_importtime(output)
+        assert rows == [("main", 5.0, 9.0), ("json.decoder", 0.12, 0.12)]
+
+
+class TestStartupReport:
+    """Tests pour StartupReport"""
+    
+    def test_stage(self):
+        """Test chronométrage d'une étape"""
+        report = StartupReport()
+        with report.stage("warmup"):
+            time.sleep(0.01)
+        assert report.stages["warmup"] >= 10
+    
+    def test_budget(self):
+        """Test dépassement de budget"""
+        report = StartupReport(budget_ms=1, origin=time.perf_counter() - 1)
+        report.mark_ready()
+        assert report.over_budget()
+        assert StartupReport(budget_ms=None).over_budget() is False
+    
+    def test_first_request_only_once(self):
+        """Test que seule la première requête est notée"""
+        report = StartupReport()
+        report.mark_first_request()
+        first = report.first_request_ms
+        time.sleep(0.01)
+        report.mark_first_request()
+        assert report.first_request_ms == first
+
+
+class TestLazySdkImport:
+    """Tests de l'import tardif du SDK Gemini"""
+    
+    def test_import_main_skips_sdk(self):
+        """Test que l'import de main ne charge pas google.generativeai"""
+        code = "import sys, main; print('google.generativeai' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+        assert result.stdout.strip() == "False"
+    
+    def test_import_main_writes_nothing(self, tmp_path):
+        """Test que l'import de main ne crée aucun fichier partagé (limitation, sessions, catalogue)"""
+        env = dict(os.environ, RATE_LIMIT_BACKEND="shared", SESSION_BACKEND="shared", CATALOG_BACKEND="shared",
+                   RATE_LIMIT_FILE=str(tmp_path / "ratelimit"), SESSION_DIR=str(tmp_path / "sessions"),
+                   SHARED_CATALOG_DIR=str(tmp_path / "catalog"))
+        result = subprocess.run([sys.executable, "-c", "import main"], capture_output=True, text=True, cwd=ROOT, env=env)
+        assert result.returncode == 0, result.stderr
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestLifespan:
+    """Tests du lifespan FastAPI"""
+    
+    def test_lifespan_records_report(self):
+        """Test que le lifespan initialise le moteur, préchauffe le catalogue et remplit le rapport"""
+        from main import app
+        from services.startup import report
+        from services.tools import empty_snapshot
+        
+        with patch('main.get_backend') as mock_backend:
+            with patch('main.refresh_snapshot', new_callable=AsyncMock) as mock_refresh:
+                mock_refresh.return_value = empty_snapshot()
+                with TestClient(app) as client:
+                    data = client.get("/health/startup").json()
+        
+        mock_backend.assert_called_once()
+        mock_refresh.assert_awaited_once()
+        assert "llm_backend" in data["stages_ms"]
+        assert "catalog_warmup" in data["stages_ms"]
+        assert data["ready_ms"] is not None
+        assert report.first_request_ms is not None
+
+    def test_refresher_started_and_stopped(self):
+        """Test que le rafraîchisseur tourne pendant la vie du worker puis s'arrête"""
+        from main import app
+        from services.tools import build_snapshot
+        
+        with patch.dict(os.environ, {"CATALOG_REFRESH_INTERVAL": "0.01", "CATALOG_REFRESH_JITTER": "0"}):
+            with patch('main.get_backend'):
+                with patch('main.refresh_snapshot', new_callable=AsyncMock) as mock_refresh:
+                    mock_refresh.return_value = build_snapshot([{"id": 1}])
+                    with TestClient(app):
+                        time.sleep(0.1)
+                    calls = mock_refresh.await_count
+                    time.sleep(0.05)
+        
+        # Préchauffage + plusieurs rafraîchissements, plus rien après l'arrêt
+        assert calls >= 3
+        assert mock_refresh.await_count == calls
+        assert mock_refresh.await_args.kwargs == {"max_age": 0.01}
+
+
+class TestReadiness:
+    """Tests pour GET /health/ready"""
+    
+    def test_not_ready_without_snapshot(self):
+        """Test 503 tant qu'aucun instantané n'est chargé"""
+        from main import app
+        from services.tools import cache
+        cache.clear()
+        response = TestClient(app).get("/health/ready")
+        assert response.status_code == 503
+        assert response.json() == {"ready": False}
+    
+    def test_ready_with_snapshot(self):
+        """Test 200 avec version, taille et âge de l'instantané"""
+        from main import app
+        from services.tools import build_snapshot, cache
+        snapshot = build_snapshot([{"id": 1}, {"id": 2}])
+        cache['snapshot'] = snapshot
+        try:
+            data = TestClient(app).get("/health/ready").json()
+        finally:
+            cache.clear()
+        assert data["ready"] is True
+        assert data["version"] == snapshot.version
+        assert data["events"] == 2
+        assert data["stale"] is False
+    
+    def test_ready_during_outage(self):
+        """Test catalogue expiré mais déjà chargé (API en panne) : toujours prêt, signalé périmé"""
+        from main import app
+        from services.tools import CATALOG_TTL, build_snapshot, cache, store
+        snapshot = build_snapshot([{"id": 1}])
+        snapshot.loaded_at = time.time() - 2 * CATALOG_TTL
+        store(snapshot)
+        try:
+            response = TestClient(app).get("/health/ready")
+        finally:
+            cache.clear()
+        assert response.status_code == 200
+        assert response.json()["stale"] is True
@@ -0,0 +1,184 @@
+# tests/test_thumbnails.py
+"""
+Tests unitaires pour le module thumbnails.py, avec un faux serveur d'affiches local
+"""
+import asyncio
+import io
+import os
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from services import thumbnails
+from services.thumbnails import ThumbnailCache, ThumbnailError, Thumbnailer, is_allowed, poster_url
+
+try:
+    import PIL
+except ImportError:  # Dépendance optionnelle
+    PIL = None
+
+
+class PosterServer:
+    """Faux serveur d'affiches : sert `images[path]` et compte les requêtes."""
+
+    def __init__(self, images):
+        self.images = images
+        self.hits = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits.append(self.path)
+                body = server.images.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                time.sleep(0.05)  # Laisse le temps aux requêtes concurrentes d'arriver
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def truncate(data, width, quality):
+    """Conversion de test : les `width` premiers octets"""
+    return data[:width]
+
+
+def make_thumbnailer(tmp_path, max_bytes=10_000, transform=truncate):
+    return Thumbnailer(ThumbnailCache(tmp_path, max_bytes=max_bytes), allowed_hosts={"127.0.0.1"}, transform=transform)
+
+
+class TestPosterUrl:
+    """Tests pour is_allowed() et poster_url()"""
+
+    def test_allowed_hosts(self):
+        """Test que seules les URL http(s) des hôtes autorisés sont acceptées"""
+        assert is_allowed("https://back.lagenda.bj/media/a.jpg")
+        assert not is_allowed("https://evil.example/a.jpg")
+        assert not is_allowed("file:///etc/passwd")
+        assert not is_allowed("http://[invalide")
+
+    def test_rewrite(self):
+        """Test réécriture vers l'endpoint, URL d'origine sinon"""
+        with patch("services.thumbnails.pillow_available", return_value=True):
+            assert poster_url("https://back.lagenda.bj/media/a b.jpg") == \
+                "/images/poster?w=480&src=https://back.lagenda.bj/media/a%20b.jpg"
+            assert poster_url("https://evil.example/a.jpg") == "https://evil.example/a.jpg"
+            assert poster_url(None) is None
+
+    def test_original_without_pillow(self):
+        """Test sans Pillow : URL d'origine, pas de redirection à chaque affiche"""
+        with patch("services.thumbnails.pillow_available", return_value=False):
+            assert poster_url("https://back.lagenda.bj/media/a.jpg") == "https://back.lagenda.bj/media/a.jpg"
+
+
+class TestThumbnailCache:
+    """Tests pour ThumbnailCache"""
+
+    def test_eviction_oldest_first(self, tmp_path):
+        """Test éviction des miniatures les moins récemment servies"""
+        cache = ThumbnailCache(tmp_path, max_bytes=350)
+        paths = [cache.path_for(f"https://x/{i}.jpg", 320) for i in range(3)]
+        for age, path in zip((300, 200, 100), paths):
+            cache.put(path, b"x" * 100)
+            os.utime(path, (time.time() - age, time.time() - age))
+        # La plus ancienne est servie : elle redevient récente
+        os.utime(paths[0], (time.time() - 4000, time.time() - 4000))
+        assert cache.lookup(paths[0])
+        cache.put(cache.path_for("https://x/3.jpg", 320), b"x" * 100)
+        assert [p.exists() for p in paths] == [True, False, True]
+        assert sum(p.stat().st_size for p in tmp_path.glob("*.jpg")) <= 350
+
+
+class TestThumbnailer:
+    """Tests pour Thumbnailer avec le faux serveur d'affiches"""
+
+    def test_fetched_once(self, tmp_path):
+        """Test une seule récupération par affiche, y compris pour des requêtes concurrentes"""
+        with PosterServer({"/a.jpg": b"A" * 1000}) as server:
+            thumbnailer = make_thumbnailer(tmp_path)
+            url = f"{server.url}/a.jpg"
+
+            async def scenario():
+                return await asyncio.gather(*(thumbnailer.get(url, 320) for _ in range(5)))
+
+            paths = asyncio.run(scenario())
+            again = asyncio.run(thumbnailer.get(url, 320))
+        assert server.hits == ["/a.jpg"]
+        assert len(set(paths + [again])) == 1
+        assert again.read_bytes() == b"A" * 320
+
+    def test_errors(self, tmp_path):
+        """Test affiche absente ou hôte non autorisé"""
+        with PosterServer({}) as server:
+            thumbnailer = make_thumbnailer(tmp_path)
+            with pytest.raises(ThumbnailError):
+                asyncio.run(thumbnailer.get(f"{server.url}/absente.jpg", 320))
+        with pytest.raises(ThumbnailError):
+            asyncio.run(thumbnailer.get("https://evil.example/a.jpg", 320))
+
+    @pytest.mark.skipif(PIL is None, reason="Pillow requis")
+    def test_resize(self, tmp_path):
+        """Test réduction réelle d'une image avec Pillow"""
+        from PIL import Image
+        source = io.BytesIO()
+        Image.new("RGB", (2000, 3000), "red").save(source, "PNG")
+        with PosterServer({"/grand.png": source.getvalue()}) as server:
+            thumbnailer = make_thumbnailer(tmp_path, max_bytes=10**7, transform=thumbnails.resize)
+            path = asyncio.run(thumbnailer.get(f"{server.url}/grand.png", 480))
+        with Image.open(path) as thumb:
+            assert thumb.format == "JPEG"
+            assert thumb.size == (480, 720)
+
+
+class TestPosterEndpoint:
+    """Tests pour GET /images/poster"""
+
+    @pytest.fixture
+    def client(self):
+        from main import app
+        return TestClient(app)
+
+    def test_serves_thumbnail(self, client, tmp_path):
+        """Test miniature servie avec un Cache-Control long"""
+        with PosterServer({"/a.jpg": b"A" * 1000}) as server:
+            with patch("main.thumbnailer", make_thumbnailer(tmp_path)), \
+                    patch("services.thumbnails.pillow_available", return_value=True):
+                response = client.get("/images/poster", params={"src": f"{server.url}/a.jpg", "w": 320})
+        assert response.status_code == 200
+        assert response.content == b"A" * 320
+        assert response.headers["cache-control"] == thumbnails.CACHE_CONTROL
+        assert response.headers["content-type"] == "image/jpeg"
+
+    def test_redirects_on_failure(self, client, tmp_path):
+        """Test redirection vers l'original si la miniature est impossible"""
+        with PosterServer({}) as server:
+            with patch("main.thumbnailer", make_thumbnailer(tmp_path)), \
+                    patch("services.thumbnails.pillow_available", return_value=True):
+                response = client.get("/images/poster", params={"src": f"{server.url}/x.jpg"}, follow_redirects=False)
+        assert response.status_code == 307
+        assert response.headers["location"] == f"{server.url}/x.jpg"
+
+    def test_rejects_unknown_host_and_width(self, client):
+        """Test refus d'un hôte non autorisé ou d'une largeur arbitraire"""
+        assert client.get("/images/poster", params={"src": "https://evil.example/a.jpg"}).status_code == 400
+        assert client.get("/images/poster", params={"src": "https://lagenda.bj/a.jpg", "w": 5000}).status_code == 400
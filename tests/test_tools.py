@@ -6,6 +6,7 @@ import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from datetime import datetime
 import asyncio
+import time
 
 # Import du module à tester
 import sys
@@ -245,3 +246,264 @@ class TestSearchEventsSync:
                 assert result == []
         
         asyncio.run(run_test())
+
+
+class TestCatalogSnapshot:
+    """Tests pour l'instantané versionné du catalogue"""
+    
+    def test_version_stable(self):
+        """Test même contenu, même version"""
+        from services.tools import catalog_version
+        events = [{"id": 1, "title": "A", "date_start": datetime(2026, 1, 20)}]
+        assert catalog_version(events) == catalog_version([dict(events[0])])
+    
+    def test_version_changes(self):
+        """Test que la version change avec le contenu"""
+        from services.tools import catalog_version
+        assert catalog_version([{"id": 1, "title": "A"}]) != catalog_version([{"id": 1, "title": "B"}])
+    
+    def test_get_snapshot_cached(self):
+        """Test que get_snapshot et search_events partagent le cache"""
+        from services.tools import build_snapshot, get_snapshot
+        snapshot = build_snapshot([{"id": 1}])
+        cache.clear()
+        cache['snapshot'] = snapshot
+        try:
+            assert asyncio.run(get_snapshot()) is snapshot
+            assert asyncio.run(search_events()) is snapshot.events
+        finally:
+            cache.clear()
+
+
+class TestCatalogMetrics:
+    """Tests pour les métriques du cache et du catalogue"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_state(self):
+        """Vider le cache et les métriques"""
+        from services import metrics
+        cache.clear()
+        metrics.reset()
+        yield
+        cache.clear()
+        metrics.reset()
+    
+    def test_cache_hit_miss_and_error(self):
+        """Test compteurs hit/miss et erreur de récupération"""
+        from services import metrics
+        async def run_test():
+            with patch('services.tools.httpx.AsyncClient') as mock_client:
+                mock_client_instance = AsyncMock()
+                mock_client_instance.get.side_effect = Exception("API Error")
+                mock_client_instance.__aenter__.return_value = mock_client_instance
+                mock_client_instance.__aexit__.return_value = None
+                mock_client.return_value = mock_client_instance
+                await search_events()
+        
+        asyncio.run(run_test())
+        from services.tools import build_snapshot
+        cache['snapshot'] = build_snapshot([{"id": 1}])
+        asyncio.run(search_events())
+        
+        assert metrics.get("catalog_cache_total", outcome="miss") == 1
+        assert metrics.get("catalog_cache_total", outcome="hit") == 1
+        assert metrics.get("catalog_fetch_errors_total", reason="other") == 1
+    
+    def test_size_and_age_gauges(self):
+        """Test taille et âge de l'instantané à l'export"""
+        import time
+        from services import metrics
+        from services.tools import CatalogSnapshot
+        cache['snapshot'] = CatalogSnapshot(events=[{"id": 1}, {"id": 2}], version="v", loaded_at=time.time() - 30)
+        text = metrics.render()
+        assert "catalog_events 2" in text
+        assert 29 <= metrics.get("catalog_snapshot_age_seconds") < 60
+
+
+class TestSharedCatalogIntegration:
+    """Tests pour get_snapshot() avec SHARED_CATALOG_DIR"""
+    
+    def test_reads_published_file(self, tmp_path):
+        """Test qu'un worker lit l'instantané publié par un autre, sans appel API"""
+        from services import tools
+        from services.shared_catalog import SharedCatalog
+        from services.tools import build_snapshot, get_snapshot
+        shared = SharedCatalog(tmp_path)
+        shared.publish(build_snapshot([{"id": 1, "title": "A", "date_start": datetime(2026, 1, 20)}]))
+        cache.clear()
+        try:
+            with patch.object(tools, "shared_catalog", SharedCatalog(tmp_path)):
+                with patch('services.tools.httpx.AsyncClient') as mock_client:
+                    snapshot = asyncio.run(get_snapshot())
+            mock_client.assert_not_called()
+            assert snapshot.events[0]["date_start"] == datetime(2026, 1, 20)
+            assert cache['snapshot'] is snapshot
+        finally:
+            cache.clear()
+    
+    def test_cache_hit_picks_up_published_change(self, tmp_path):
+        """Test qu'un worker voit le fichier republié par un autre (webhook) sans attendre le TTL"""
+        from services import tools
+        from services.shared_catalog import SharedCatalog
+        from services.tools import build_snapshot, get_snapshot
+        cache.clear()
+        cache['snapshot'] = build_snapshot([{"id": 1, "title": "A"}])
+        try:
+            with patch.object(tools, "shared_catalog", SharedCatalog(tmp_path)):
+                SharedCatalog(tmp_path).publish(build_snapshot([{"id": 1, "title": "A2"}]))
+                snapshot = asyncio.run(get_snapshot())
+            assert snapshot.events[0]["title"] == "A2"
+        finally:
+            cache.clear()
+    
+    def test_outage_keeps_published_file(self, tmp_path):
+        """Test fichier publié plus vieux que CATALOG_TTL et API en panne : servi puis mis en cache"""
+        from services import tools
+        from services.shared_catalog import SharedCatalog
+        from services.tools import CATALOG_TTL, build_snapshot, empty_snapshot, get_snapshot
+        old = build_snapshot([{"id": 1, "title": "A"}])
+        old.loaded_at = time.time() - 2 * CATALOG_TTL
+        shared = SharedCatalog(tmp_path)
+        shared.publish(old)
+        os.utime(shared.path, (old.loaded_at, old.loaded_at))
+        cache.clear()
+        try:
+            with patch.object(tools, "shared_catalog", SharedCatalog(tmp_path)):
+                with patch('services.tools.fetch_snapshot', new_callable=AsyncMock) as mock_fetch:
+                    mock_fetch.return_value = empty_snapshot()
+                    first = asyncio.run(get_snapshot())
+                    second = asyncio.run(get_snapshot())
+            assert first.version == old.version
+            assert second is first
+            assert mock_fetch.await_count == 1
+        finally:
+            cache.clear()
+
+
+class TestRefreshSnapshot:
+    """Tests pour refresh_snapshot()"""
+    
+    def test_refresh_replaces_cache(self):
+        """Test rechargement même si le cache est encore valide"""
+        from services.tools import build_snapshot, refresh_snapshot
+        cache.clear()
+        cache['snapshot'] = build_snapshot([{"id": 1}])
+        fresh = build_snapshot([{"id": 2}])
+        try:
+            with patch('services.tools.fetch_snapshot', new_callable=AsyncMock) as mock_fetch:
+                mock_fetch.return_value = fresh
+                assert asyncio.run(refresh_snapshot()) is fresh
+            assert cache['snapshot'] is fresh
+        finally:
+            cache.clear()
+    
+    def test_failed_refresh_keeps_cache(self):
+        """Test échec : l'instantané en cache est conservé"""
+        from services.tools import build_snapshot, empty_snapshot, refresh_snapshot
+        cache.clear()
+        current = build_snapshot([{"id": 1}])
+        cache['snapshot'] = current
+        try:
+            with patch('services.tools.fetch_snapshot', new_callable=AsyncMock) as mock_fetch:
+                mock_fetch.return_value = empty_snapshot()
+                assert asyncio.run(refresh_snapshot()) is current
+            assert cache['snapshot'] is current
+        finally:
+            cache.clear()
+    
+    def test_outage_longer_than_ttl(self):
+        """Test panne au-delà de CATALOG_TTL : le dernier instantané reste servi et en cache"""
+        from services.tools import (CATALOG_TTL, build_snapshot, current_snapshot, empty_snapshot,
+                                    get_snapshot, loaded_snapshot, refresh_snapshot, store)
+        cache.clear()
+        last = build_snapshot([{"id": 1}])
+        last.loaded_at = time.time() - 2 * CATALOG_TTL  # Chargé avant la panne
+        store(last)
+        assert current_snapshot() is None
+        assert loaded_snapshot() is last
+        try:
+            with patch('services.tools.fetch_snapshot', new_callable=AsyncMock) as mock_fetch:
+                mock_fetch.return_value = empty_snapshot()
+                assert asyncio.run(refresh_snapshot()) is last
+                assert current_snapshot() is last
+                # Les requêtes suivantes n'attendent pas l'API
+                assert asyncio.run(get_snapshot()) is last
+            assert mock_fetch.await_count == 1
+        finally:
+            cache.clear()
+    
+    def test_miss_during_outage(self):
+        """Test sans rafraîchissement de fond : une seule tentative, puis le dernier instantané en cache"""
+        from services.tools import CATALOG_TTL, build_snapshot, empty_snapshot, get_snapshot, store
+        cache.clear()
+        last = build_snapshot([{"id": 1}])
+        last.loaded_at = time.time() - 2 * CATALOG_TTL
+        store(last)
+        try:
+            with patch('services.tools.fetch_snapshot', new_callable=AsyncMock) as mock_fetch:
+                mock_fetch.return_value = empty_snapshot()
+                assert asyncio.run(get_snapshot()) is last
+                assert asyncio.run(get_snapshot()) is last
+            assert mock_fetch.await_count == 1
+        finally:
+            cache.clear()
+    
+    def test_nothing_loaded_yet(self):
+        """Test panne avant tout chargement : instantané vide, non mis en cache"""
+        from services.tools import empty_snapshot, loaded_snapshot, refresh_snapshot
+        cache.clear()
+        with patch('services.tools.fetch_snapshot', new_callable=AsyncMock) as mock_fetch:
+            mock_fetch.return_value = empty_snapshot()
+            assert asyncio.run(refresh_snapshot()).fallback
+        assert loaded_snapshot() is None
+
+
+class TestPatchSnapshot:
+    """Tests pour patch_snapshot()"""
+    
+    def test_original_untouched(self):
+        """Test copie à l'écriture : l'instantané d'origine ne change pas"""
+        from services.tools import build_snapshot, patch_snapshot
+        original = build_snapshot([{"id": 1, "title": "A"}, {"id": 2, "title": "B"}])
+        patched = patch_snapshot(original, "updated", 1, {"id": 1, "title": "A2"})
+        assert [e["title"] for e in original.events] == ["A", "B"]
+        assert sorted(e["title"] for e in patched.events) == ["A2", "B"]
+        assert patched.version != original.version
+    
+    def test_delete_unknown_id(self):
+        """Test suppression d'un identifiant absent : même contenu"""
+        from services.tools import build_snapshot, patch_snapshot
+        original = build_snapshot([{"id": 1, "title": "A"}])
+        assert patch_snapshot(original, "deleted", 99).version == original.version
+    
+    def test_updated_event_gets_new_revision(self):
+        """Test qu'un événement modifié change de révision (clé du cache de rendu)"""
+        from services.tools import build_snapshot, normalize_event, patch_snapshot
+        original = build_snapshot([normalize_event({"id": 1, "title": "A"})])
+        patched = patch_snapshot(original, "updated", 1, {"id": 1, "title": "A2"})
+        assert patched.events[0]["_rev"] != original.events[0]["_rev"]
+        assert normalize_event({"id": 1, "title": "A"})["_rev"] == original.events[0]["_rev"]
+
+
+class TestNormalizeEventText:
+    """Tests de l'extrait texte calculé à l'ingestion"""
+    
+    def test_summary(self):
+        """Test extrait nettoyé et tronqué stocké sur l'événement"""
+        from services.tools import normalize_event
+        event = normalize_event({"id": 1, "description": "<p>Concert &agrave; Cotonou</p>" + "<p>suite</p>" * 40})
+        assert event["summary"].startswith("Concert à Cotonou suite")
+        assert len(event["summary"]) <= 120
+    
+    def test_normalized_fields(self):
+        """Test ville, titre et description normalisés une fois à l'ingestion"""
+        from services.tools import normalize_event
+        event = normalize_event({"id": 1, "title": "Fête", "city": " Abomey-Calavi ", "description": "À Cotonou"})
+        assert (event["_title_norm"], event["_city_norm"], event["_description_norm"]) == \
+            ("fete", "abomey-calavi", "a cotonou")
+    
+    def test_free_detected_through_entities(self):
+        """Test gratuité détectée dans une description encodée en entités"""
+        from services.tools import normalize_event
+        event = normalize_event({"id": 1, "price": 2000, "description": "Entr&eacute;e libre"})
+        assert event["is_free"] is True
@@ -0,0 +1,240 @@
+# tests/test_webhooks.py
+"""
+Tests du webhook d'invalidation (module webhooks.py et POST /webhooks/events),
+contre un simulateur local du backend lagenda.bj.
+"""
+import copy
+import json
+import time
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from main import app
+from services import webhooks
+from services.tools import CATALOG_TTL, build_snapshot, cache, current_snapshot, normalize_event
+
+SECRET = "secret-de-test"
+
+
+class BackendSimulator:
+    """
+    Faux back.lagenda.bj : tient son catalogue brut, le modifie et appelle
+    le webhook signé comme le ferait le vrai backend.
+    """
+
+    def __init__(self, client, events, secret=SECRET):
+        self.client = client
+        self.events = {str(e["id"]): copy.deepcopy(e) for e in events}
+        self.secret = secret
+
+    def full_snapshot(self):
+        """Ce qu'un rechargement complet produirait"""
+        return build_snapshot([normalize_event(copy.deepcopy(e)) for e in self.events.values()])
+
+    def send(self, payload, secret=None, timestamp=None):
+        body = json.dumps(payload).encode("utf-8")
+        timestamp = str(int(time.time()) if timestamp is None else timestamp)
+        return self.client.post("/webhooks/events", content=body, headers={
+            "Content-Type": "application/json",
+            "X-Lagenda-Timestamp": timestamp,
+            "X-Lagenda-Signature": webhooks.sign(secret or self.secret, timestamp, body),
+        })
+
+    def create(self, event):
+        self.events[str(event["id"])] = copy.deepcopy(event)
+        return self.send({"action": "created", "event": event})
+
+    def update(self, event_id, **changes):
+        self.events[str(event_id)].update(changes)
+        return self.send({"action": "updated", "event": self.events[str(event_id)]})
+
+    def delete(self, event_id):
+        del self.events[str(event_id)]
+        return self.send({"action": "deleted", "id": event_id})
+
+
+RAW_EVENTS = [
+    {"id": 1, "title": "Concert Jazz", "city": "Cotonou", "description": "Live",
+     "dates": [{"date": "2026-01-20T20:00:00Z"}], "category": {"name": "Musique"}, "price": 5000},
+    {"id": 2, "title": "Festival Vodoun", "city": "Ouidah", "description": "Festival gratuit",
+     "recurring_dates": [{"start_date": "2026-01-10", "end_date": "2026-01-12"}], "category": "Culture"},
+]
+
+
+def by_id(snapshot):
+    return {str(e["id"]): e for e in snapshot.events}
+
+
+class TestSignature:
+    """Tests pour sign() / verify()"""
+    
+    def test_valid(self):
+        """Test signature correcte"""
+        body = b'{"action": "deleted", "id": 1}'
+        webhooks.verify(SECRET, "1000", body, webhooks.sign(SECRET, "1000", body), now=1010)
+    
+    def test_wrong_secret(self):
+        """Test mauvais secret"""
+        body = b"{}"
+        with pytest.raises(webhooks.InvalidWebhook):
+            webhooks.verify(SECRET, "1000", body, webhooks.sign("autre", "1000", body), now=1000)
+    
+    def test_tampered_body(self):
+        """Test corps modifié après signature"""
+        signature = webhooks.sign(SECRET, "1000", b'{"id": 1}')
+        with pytest.raises(webhooks.InvalidWebhook):
+            webhooks.verify(SECRET, "1000", b'{"id": 2}', signature, now=1000)
+    
+    def test_replay(self):
+        """Test horodatage trop ancien (rejeu)"""
+        signature = webhooks.sign(SECRET, "1000", b"{}")
+        with pytest.raises(webhooks.InvalidWebhook):
+            webhooks.verify(SECRET, "1000", b"{}", signature, now=1000 + 301)
+    
+    def test_missing_headers(self):
+        """Test en-têtes absents"""
+        with pytest.raises(webhooks.InvalidWebhook):
+            webhooks.verify(SECRET, None, b"{}", None)
+
+
+class TestParseChange:
+    """Tests pour parse_change()"""
+    
+    def test_created(self):
+        """Test création"""
+        assert webhooks.parse_change({"action": "created", "event": {"id": 3}}) == ("created", "3", {"id": 3})
+    
+    def test_deleted(self):
+        """Test suppression par identifiant seul"""
+        assert webhooks.parse_change({"action": "deleted", "id": 3}) == ("deleted", "3", None)
+    
+    def test_invalid(self):
+        """Test action inconnue ou événement manquant"""
+        with pytest.raises(webhooks.InvalidWebhook):
+            webhooks.parse_change({"action": "purged", "id": 3})
+        with pytest.raises(webhooks.InvalidWebhook):
+            webhooks.parse_change({"action": "updated", "id": 3})
+
+
+class TestEventsWebhook:
+    """Tests de POST /webhooks/events contre le simulateur"""
+    
+    @pytest.fixture
+    def simulator(self):
+        """Simulateur dont le catalogue est déjà chargé dans l'application"""
+        simulator = BackendSimulator(TestClient(app), RAW_EVENTS)
+        cache.clear()
+        cache['snapshot'] = simulator.full_snapshot()
+        with patch('main.WEBHOOK_SECRET', SECRET):
+            yield simulator
+        cache.clear()
+    
+    def test_create_update_delete(self, simulator):
+        """Test que chaque changement poussé donne le même catalogue qu'un rechargement complet"""
+        new_event = {"id": 3, "title": "Atelier danse", "city": "Parakou", "description": "Entrée libre",
+                     "dates": [{"date": "2026-02-01T10:00:00Z"}], "category": "Danse"}
+        
+        response = simulator.create(new_event)
+        assert response.status_code == 202
+        assert response.json()["applied"] is True
+        assert by_id(cache['snapshot']) == by_id(simulator.full_snapshot())
+        assert by_id(cache['snapshot'])["3"]["is_free"] is True
+        
+        simulator.update(1, title="Concert Jazz (annulé)", price=0)
+        assert by_id(cache['snapshot'])["1"]["title"] == "Concert Jazz (annulé)"
+        assert by_id(cache['snapshot']) == by_id(simulator.full_snapshot())
+        
+        response = simulator.delete(2)
+        assert response.json()["events"] == 2
+        assert by_id(cache['snapshot']) == by_id(simulator.full_snapshot())
+        assert cache['snapshot'].version == response.json()["version"]
+    
+    def test_search_sees_change_immediately(self, simulator):
+        """Test /events/search reflète la suppression sans attendre l'expiration"""
+        client = simulator.client
+        app.state.limiter.reset()
+        before = client.get("/events/search", params={"city": "Ouidah"}).json()
+        simulator.delete(2)
+        after = client.get("/events/search", params={"city": "Ouidah"}).json()
+        app.state.limiter.reset()
+        assert before["total"] == 1
+        assert after["total"] == 0
+        assert before["version"] != after["version"]
+    
+    def test_expiry_kept(self, simulator):
+        """Test qu'une correction ne repousse pas l'expiration du catalogue en cache"""
+        # Catalogue chargé il y a presque CATALOG_TTL secondes
+        snapshot = cache['snapshot']
+        snapshot.loaded_at = time.time() - CATALOG_TTL + 0.3
+        cache['snapshot'] = snapshot
+        simulator.delete(2)
+        assert cache['snapshot'].loaded_at == snapshot.loaded_at
+        time.sleep(0.4)
+        assert current_snapshot() is None
+    
+    def test_shared_catalog_between_workers(self, simulator, tmp_path):
+        """Test deux webhooks reçus par deux workers : aucun changement perdu"""
+        from services import tools
+        from services.shared_catalog import SharedCatalog
+        worker_a, worker_b = SharedCatalog(tmp_path), SharedCatalog(tmp_path)
+        worker_a.publish(cache['snapshot'])
+        worker_a.read()  # Copie du worker A, bientôt périmée
+        with patch.object(tools, "shared_catalog", worker_b):
+            simulator.create({"id": 3, "title": "Atelier", "city": "Parakou", "description": "",
+                              "dates": [{"date": "2026-02-01T10:00:00Z"}]})
+        with patch.object(tools, "shared_catalog", worker_a):
+            simulator.delete(1)
+        assert set(by_id(worker_a.read())) == set(by_id(worker_b.read())) == {"2", "3"}
+        assert by_id(worker_a.read()) == by_id(simulator.full_snapshot())
+    
+    def test_locked_catalog_asks_for_retry(self, simulator, tmp_path):
+        """Test verrou partagé tenu trop longtemps : 503 pour que le backend renvoie le changement"""
+        from services import tools
+        from services.shared_catalog import SharedCatalog
+        worker = SharedCatalog(tmp_path, lock_timeout=0.05, poll_interval=0.01)
+        worker.publish(cache['snapshot'])
+        version = worker.read().version
+        fd = SharedCatalog(tmp_path)._try_lock()  # Rechargement en cours dans un autre worker
+        try:
+            with patch.object(tools, "shared_catalog", worker):
+                response = simulator.delete(1)
+        finally:
+            SharedCatalog._unlock(fd)
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "5"
+        assert worker.read().version == version
+        # Renvoyé plus tard, le changement est appliqué
+        simulator.events["1"] = copy.deepcopy(RAW_EVENTS[0])
+        with patch.object(tools, "shared_catalog", worker):
+            response = simulator.delete(1)
+        assert response.status_code == 202
+        assert set(by_id(worker.read())) == {"2"}
+    
+    def test_bad_signature_rejected(self, simulator):
+        """Test signature invalide : 401, catalogue inchangé"""
+        version = cache['snapshot'].version
+        response = simulator.send({"action": "deleted", "id": 1}, secret="faux")
+        assert response.status_code == 401
+        assert cache['snapshot'].version == version
+    
+    def test_replayed_request_rejected(self, simulator):
+        """Test requête trop ancienne : 401"""
+        response = simulator.send({"action": "deleted", "id": 1}, timestamp=int(time.time()) - 3600)
+        assert response.status_code == 401
+    
+    def test_invalid_payload(self, simulator):
+        """Test corps signé mais invalide : 422"""
+        assert simulator.send({"action": "purged", "id": 1}).status_code == 422
+    
+    def test_no_snapshot_loaded(self, simulator):
+        """Test sans catalogue chargé : rien à corriger"""
+        cache.clear()
+        response = simulator.delete(1)
+        assert response.status_code == 202
+        assert response.json() == {"applied": False}
+    
+    def test_disabled_without_secret(self):
+        """Test webhook désactivé sans WEBHOOK_SECRET"""
+        with patch('main.WEBHOOK_SECRET', ""):
+            assert TestClient(app).post("/webhooks/events", json={}).status_code == 404